@@ -5,7 +5,7 @@ Final2 图像处理算法模块
 """
 
 # 导出主要的API函数
-from .api_integration import process_images
+from .api_integration import process_images, iter_process_images, aiter_process_images
 from .algorithm_wrappers import (
     imagehash_algorithm,
     opencv1_algorithm,
@@ -13,12 +13,19 @@ from .algorithm_wrappers import (
     opencv3_algorithm,
     openai_algorithm,
     anomaly_data_algorithm,
-    comprehensive_algorithm
+    comprehensive_algorithm,
+    imagehash_algorithm_batch,
+    opencv1_algorithm_batch,
+    opencv2_algorithm_batch,
+    opencv3_algorithm_batch,
+    comprehensive_algorithm_batch
 )
 from .report_generator import generate_html_report, quick_report_generation
 
 __all__ = [
     'process_images',
+    'iter_process_images',
+    'aiter_process_images',
     'imagehash_algorithm',
     'opencv1_algorithm', 
     'opencv2_algorithm',
@@ -26,6 +33,11 @@ __all__ = [
     'openai_algorithm',
     'anomaly_data_algorithm',
     'comprehensive_algorithm',
+    'imagehash_algorithm_batch',
+    'opencv1_algorithm_batch',
+    'opencv2_algorithm_batch',
+    'opencv3_algorithm_batch',
+    'comprehensive_algorithm_batch',
     'generate_html_report',
     'quick_report_generation'
 ]
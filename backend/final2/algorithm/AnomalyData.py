@@ -1,41 +1,209 @@
 from PIL import Image, ImageDraw
+import argparse
+import json
 import os
 import random
-def generate_anomaly_images(output_dir):
-    # 基础参数配置
-    anomalies = [
-        ("corrupted_header", lambda img: img.tobytes()[:50] + b'\x00' * 50),#文件头损坏
-        ("oversized", lambda img: img.resize((10000, 10000))),#大尺寸
-        ("invalid_format", lambda img: img.convert('RGB')),#无效格式修复为RGB
-        ("empty_canvas", lambda img: Image.new('RGB', (1, 1), (255, 255, 255))),#空文件修复为1x1
-        ("pixelated", lambda img: img.resize((10, 10)).resize((512, 512)))#图像模糊的-纯白
-    ]
-    # 创建输出目录
-    os.makedirs(output_dir, exist_ok=True)
-    # 生成基础服装图像
-    def create_base_image():
-        img = Image.new('RGB', (512, 512), (255, 255, 255))
-        draw = ImageDraw.Draw(img)
+from concurrent.futures import ProcessPoolExecutor
+
+# 异常变换（模块级函数，便于多进程序列化）：输入基础图像和随机数生成器，返回图像或原始字节
+
+
+def corrupted_header(img, rng):
+    """文件头损坏"""
+    return img.tobytes()[:50] + b'\x00' * 50
+
+
+def oversized(img, rng):
+    """大尺寸"""
+    return img.resize((10000, 10000))
+
+
+def invalid_format(img, rng):
+    """无效格式修复为RGB"""
+    return img.convert('RGB')
+
+
+def empty_canvas(img, rng):
+    """空文件修复为1x1"""
+    return Image.new('RGB', (1, 1), (255, 255, 255))
+
+
+def pixelated(img, rng):
+    """图像模糊的-纯白"""
+    return img.resize((10, 10)).resize(img.size)
+
+
+def normal(img, rng):
+    """正常图像（不做变换）"""
+    return img
+
+
+ANOMALIES = {
+    'corrupted_header': corrupted_header,
+    'oversized': oversized,
+    'invalid_format': invalid_format,
+    'empty_canvas': empty_canvas,
+    'pixelated': pixelated,
+}
+TRANSFORMS = dict(ANOMALIES, normal=normal)
+
+# 语料库默认参数
+DEFAULT_SIZES = [((512, 512), 0.5), ((1024, 768), 0.3), ((2048, 1536), 0.2)]  # ((宽, 高), 权重)
+DEFAULT_ANOMALY_MIX = {  # 类型 -> 权重
+    'normal': 0.8,
+    'corrupted_header': 0.05,
+    'oversized': 0.005,
+    'invalid_format': 0.05,
+    'empty_canvas': 0.045,
+    'pixelated': 0.05,
+}
+DEFAULT_JPEG_RATIO = 0.5
+CHUNK_SIZE = 64  # 每个进程任务生成的图片数
+MANIFEST_NAME = 'manifest.json'
+
+
+def create_base_image(size=(512, 512), rng=None):
+    """生成基础服装图像；给定rng时随机化轮廓位置和颜色"""
+    width, height = size
+    img = Image.new('RGB', size, (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    if rng is None:
+        # 与原实现一致：512x512画布上的固定矩形
         draw.rectangle([100, 100, 412, 312], outline="black")
         return img
-    # 批量生成异常图片
-    for i in range(50):
-        base_img = create_base_image()
-        try:
-            anomaly_type, transform = random.choice(anomalies)
-            if callable(transform):
-                img = transform(base_img)
+    left = rng.randint(0, width // 4)
+    top = rng.randint(0, height // 4)
+    right = rng.randint(width * 3 // 4, width - 1)
+    bottom = rng.randint(height * 3 // 4, height - 1)
+    fill = tuple(rng.randint(0, 255) for _ in range(3))
+    draw.rectangle([left, top, right, bottom], fill=fill, outline="black", width=max(1, width // 256))
+    # 领口
+    neck = (right - left) // 6
+    center = (left + right) // 2
+    draw.ellipse([center - neck, top - neck // 2, center + neck, top + neck // 2], fill=(255, 255, 255), outline="black")
+    return img
+
+
+def _weighted_choice(rng, items):
+    """items为[(值, 权重), ...]"""
+    values = [value for value, _ in items]
+    weights = [weight for _, weight in items]
+    return rng.choices(values, weights=weights)[0]
+
+
+def _generate_one(output_dir, index, spec):
+    """
+    生成第index张图片并返回其清单条目
+
+    每张图片使用由(seed, index)确定的独立随机数生成器，结果与进程数和调度顺序无关。
+    """
+    if spec['seed'] is None:
+        rng = None
+        size = spec['sizes'][0][0]
+        anomaly_type = random.choice(list(spec['anomaly_mix']))
+        image_format = 'png'
+    else:
+        rng = random.Random(f"{spec['seed']}:{index}")
+        size = tuple(_weighted_choice(rng, spec['sizes']))
+        anomaly_type = _weighted_choice(rng, list(spec['anomaly_mix'].items()))
+        image_format = 'jpg' if rng.random() < spec['jpeg_ratio'] else 'png'
+
+    filename = f"{anomaly_type}_{index}.{image_format}"
+    entry = {'file': filename, 'anomaly': anomaly_type, 'format': image_format,
+             'width': None, 'height': None}
+    try:
+        img = TRANSFORMS[anomaly_type](create_base_image(size, rng), rng)
+        save_path = os.path.join(output_dir, filename)
+        if isinstance(img, Image.Image):
+            if image_format == 'jpg':
+                img.convert('RGB').save(save_path, quality=spec['jpeg_quality'])
             else:
-                img = transform
-            # 保存异常图片
-            filename = f"{anomaly_type}_{i}.png"
-            save_path = os.path.join(output_dir, filename)
-            if isinstance(img, Image.Image):
                 img.save(save_path)
-            else:
-                with open(save_path, 'wb') as f:
-                    f.write(img)
-        except Exception as e:
-            print(f"Error generating {anomaly_type}: {str(e)}")
+            entry['width'], entry['height'] = img.size
+        else:
+            with open(save_path, 'wb') as f:
+                f.write(img)
+    except Exception as e:
+        print(f"Error generating {anomaly_type}: {str(e)}")
+        entry['error'] = str(e)
+    return entry
+
+
+def _generate_chunk(output_dir, start, stop, spec):
+    return [_generate_one(output_dir, index, spec) for index in range(start, stop)]
+
+
+def generate_corpus(output_dir, count=1000, sizes=None, anomaly_mix=None, jpeg_ratio=DEFAULT_JPEG_RATIO,
+                    seed=0, workers=None, jpeg_quality=90, write_manifest=True):
+    """
+    生成可复现的合成图片语料库（用于压测和基准测试）
+
+    Args:
+        output_dir: 输出目录
+        count: 图片数量
+        sizes: 尺寸分布[((宽, 高), 权重), ...]，默认DEFAULT_SIZES
+        anomaly_mix: 异常类型分布{类型: 权重}，'normal'为正常图像，默认DEFAULT_ANOMALY_MIX
+        jpeg_ratio: 保存为JPEG的比例，其余为PNG
+        seed: 随机种子，相同参数和种子生成完全相同的语料库；None时沿用旧版的非确定性生成
+        workers: 进程数，默认为CPU核数；1表示在当前进程中串行生成
+        jpeg_quality: JPEG质量
+        write_manifest: 是否写出清单文件manifest.json
+
+    Returns:
+        list: 清单条目[{'file', 'anomaly', 'format', 'width', 'height'}, ...]，按序号排列
+    """
+    sizes = sizes or DEFAULT_SIZES
+    anomaly_mix = anomaly_mix or DEFAULT_ANOMALY_MIX
+    unknown = set(anomaly_mix) - set(TRANSFORMS)
+    if unknown:
+        raise ValueError(f"未知的异常类型: {sorted(unknown)}")
+    spec = {
+        'sizes': [(tuple(size), weight) for size, weight in sizes],
+        'anomaly_mix': dict(anomaly_mix),
+        'jpeg_ratio': jpeg_ratio,
+        'jpeg_quality': jpeg_quality,
+        'seed': seed,
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    chunks = [(start, min(count, start + CHUNK_SIZE)) for start in range(0, count, CHUNK_SIZE)]
+    entries = []
+    if workers == 1 or len(chunks) <= 1:
+        for start, stop in chunks:
+            entries.extend(_generate_chunk(output_dir, start, stop, spec))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_generate_chunk, output_dir, start, stop, spec) for start, stop in chunks]
+            for future in futures:
+                entries.extend(future.result())
+
+    if write_manifest:
+        manifest = {
+            'count': count,
+            'seed': seed,
+            'sizes': [[list(size), weight] for size, weight in spec['sizes']],
+            'anomaly_mix': spec['anomaly_mix'],
+            'jpeg_ratio': jpeg_ratio,
+            'images': entries,
+        }
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return entries
+
+
+def generate_anomaly_images(output_dir):
+    """生成50张512x512的异常PNG图片（原有行为：五种异常随机选择，不写清单）"""
+    generate_corpus(output_dir, count=50, sizes=[((512, 512), 1)],
+                    anomaly_mix={name: 1 for name in ANOMALIES}, jpeg_ratio=0,
+                    seed=None, workers=1, write_manifest=False)
 
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='生成合成图片语料库')
+    parser.add_argument('output_dir')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jpeg-ratio', type=float, default=DEFAULT_JPEG_RATIO)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    generate_corpus(args.output_dir, args.count, jpeg_ratio=args.jpeg_ratio, seed=args.seed, workers=args.workers)
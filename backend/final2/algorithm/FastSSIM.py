@@ -0,0 +1,174 @@
+import math
+import threading
+
+import cv2
+import numpy as np
+
+# 与skimage.metrics.structural_similarity默认参数一致
+K1 = 0.01
+K2 = 0.03
+# 每个线程的工作区最多保留的缓冲区字节数；更大的图像每次调用单独分配，用完即释放，
+# 否则一张1亿像素的图像会让每个线程常驻约3GB的缓冲区
+WORKSPACE_MAX_BYTES = 64 * 1024 * 1024
+
+_local = threading.local()
+
+
+class SSIMWorkspace:
+    """
+    SSIM计算的float32工作缓冲区
+
+    按图像尺寸分配一次，之后同尺寸的图像直接复用，避免每次计算都分配多幅整图中间结果。
+    缓冲区总大小超过max_bytes时不保留，每次调用单独分配。
+    """
+
+    _NAMES = ('x', 'y', 'tmp', 'ux', 'uy', 'uxx', 'uyy', 'uxy')
+
+    def __init__(self, max_bytes=WORKSPACE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.shape = None
+        self.buffers = {}
+
+    def get(self, shape):
+        if shape != self.shape:
+            self.release()
+            buffers = {name: np.empty(shape, dtype=np.float32) for name in self._NAMES}
+            if len(self._NAMES) * 4 * math.prod(shape) > self.max_bytes:
+                return buffers
+            self.buffers = buffers
+            self.shape = shape
+        return self.buffers
+
+    def release(self):
+        self.shape = None
+        self.buffers = {}
+
+
+def _thread_workspace():
+    workspace = getattr(_local, 'workspace', None)
+    if workspace is None:
+        workspace = _local.workspace = SSIMWorkspace()
+    return workspace
+
+
+def _to_proxy(im1, im2, max_side):
+    """长边超过max_side时，将两幅图像等比缩小到代理分辨率"""
+    h, w = im1.shape
+    longest = max(h, w)
+    if not max_side or longest <= max_side:
+        return im1, im2
+    scale = max_side / longest
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    return (cv2.resize(im1, size, interpolation=cv2.INTER_AREA),
+            cv2.resize(im2, size, interpolation=cv2.INTER_AREA))
+
+
+def structural_similarity(im1, im2, data_range, win_size=7, workspace=None, max_side=None):
+    """
+    基于盒式滤波的SSIM（与skimage默认参数的结果一致）
+
+    全程使用float32并复用工作缓冲区；计算前先减去全局均值，方差和协方差
+    不受平移影响，这样可以避免float32下E[x^2]-E[x]^2的精度损失。
+
+    Args:
+        im1, im2: 尺寸相同的单通道图像
+        data_range: 像素取值范围（最大值-最小值）
+        win_size: 滑动窗口边长（奇数）
+        workspace: SSIMWorkspace，默认使用当前线程的工作区
+        max_side: 长边超过该值时在缩小后的代理图像上计算
+
+    Returns:
+        float: 平均SSIM
+    """
+    if im1.shape != im2.shape:
+        raise ValueError("输入图像尺寸必须一致")
+    if win_size % 2 != 1:
+        raise ValueError("win_size必须为奇数")
+    im1, im2 = _to_proxy(im1, im2, max_side)
+    h, w = im1.shape
+    if h < win_size or w < win_size:
+        raise ValueError(f"图像尺寸({w}x{h})小于窗口大小{win_size}")
+
+    shift = float(np.mean(im1, dtype=np.float64))
+    ssim_map = _ssim_map(im1, im2, shift, data_range, win_size, workspace)
+
+    pad = (win_size - 1) // 2
+    cropped = ssim_map[pad:h - pad, pad:w - pad]
+    return math.fsum(row_sums(cropped)) / cropped.size
+
+
+def row_sums(ssim_map):
+    """
+    SSIM图逐行的float64和
+
+    最终均值用math.fsum对逐行和做精确求和，结果与行的分组方式无关，
+    因此按条带计算（见TiledEvaluator）与整图计算的结果完全一致。
+    """
+    return ssim_map.sum(axis=1, dtype=np.float64).tolist()
+
+
+def _ssim_map(im1, im2, shift, data_range, win_size=7, workspace=None):
+    """
+    计算逐像素SSIM图（返回工作区中的缓冲区，下次调用会被覆盖）
+
+    shift为im1的全局均值，按条带计算时须传入整图的均值
+    """
+    buf = (workspace or _thread_workspace()).get(im1.shape)
+    x, y, tmp = buf['x'], buf['y'], buf['tmp']
+    ux, uy, uxx, uyy, uxy = buf['ux'], buf['uy'], buf['uxx'], buf['uyy'], buf['uxy']
+    ksize = (win_size, win_size)
+    border = cv2.BORDER_REFLECT
+
+    np.subtract(im1, shift, out=x, dtype=np.float32)
+    np.subtract(im2, shift, out=y, dtype=np.float32)
+
+    cv2.boxFilter(x, -1, ksize, dst=ux, borderType=border)
+    cv2.boxFilter(y, -1, ksize, dst=uy, borderType=border)
+    np.multiply(x, x, out=tmp)
+    cv2.boxFilter(tmp, -1, ksize, dst=uxx, borderType=border)
+    np.multiply(y, y, out=tmp)
+    cv2.boxFilter(tmp, -1, ksize, dst=uyy, borderType=border)
+    np.multiply(x, y, out=tmp)
+    cv2.boxFilter(tmp, -1, ksize, dst=uxy, borderType=border)
+
+    # 样本协方差归一化（与skimage的use_sample_covariance=True一致）
+    np_ = win_size * win_size
+    cov_norm = np_ / (np_ - 1)
+    c1 = (K1 * data_range) ** 2
+    c2 = (K2 * data_range) ** 2
+
+    # vx, vy, vxy（原地写回uxx, uyy, uxy）
+    np.multiply(ux, ux, out=tmp)
+    np.subtract(uxx, tmp, out=uxx)
+    uxx *= cov_norm
+    np.multiply(uy, uy, out=tmp)
+    np.subtract(uyy, tmp, out=uyy)
+    uyy *= cov_norm
+    np.multiply(ux, uy, out=tmp)
+    np.subtract(uxy, tmp, out=uxy)
+    uxy *= cov_norm
+
+    # 还原均值: ux, uy
+    ux += shift
+    uy += shift
+
+    # A1 = 2*ux*uy + C1 -> x ; B1 = ux^2 + uy^2 + C1 -> y
+    np.multiply(ux, uy, out=x)
+    x *= 2
+    x += c1
+    np.multiply(ux, ux, out=y)
+    np.multiply(uy, uy, out=tmp)
+    y += tmp
+    y += c1
+    # A2 = 2*vxy + C2 -> uxy ; B2 = vx + vy + C2 -> uxx
+    uxy *= 2
+    uxy += c2
+    uxx += uyy
+    uxx += c2
+
+    # S = (A1 * A2) / (B1 * B2)
+    x *= uxy
+    y *= uxx
+    np.divide(x, y, out=tmp)
+
+    return tmp
@@ -0,0 +1,220 @@
+import io
+import os
+from collections import Counter
+from functools import cached_property
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# 缩小解码：JPEG在解码阶段按1/2、1/4、1/8直接输出（其他格式由OpenCV解码后缩小）。
+# 统一加上IMREAD_IGNORE_ORIENTATION，与全分辨率路径的cv2.imdecode(..., -1)保持相同朝向
+REDUCED_DECODE_FLAGS = {
+    ('color', 1): cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION,
+    ('color', 2): cv2.IMREAD_REDUCED_COLOR_2 | cv2.IMREAD_IGNORE_ORIENTATION,
+    ('color', 4): cv2.IMREAD_REDUCED_COLOR_4 | cv2.IMREAD_IGNORE_ORIENTATION,
+    ('color', 8): cv2.IMREAD_REDUCED_COLOR_8 | cv2.IMREAD_IGNORE_ORIENTATION,
+    ('gray', 1): cv2.IMREAD_GRAYSCALE | cv2.IMREAD_IGNORE_ORIENTATION,
+    ('gray', 2): cv2.IMREAD_REDUCED_GRAYSCALE_2 | cv2.IMREAD_IGNORE_ORIENTATION,
+    ('gray', 4): cv2.IMREAD_REDUCED_GRAYSCALE_4 | cv2.IMREAD_IGNORE_ORIENTATION,
+    ('gray', 8): cv2.IMREAD_REDUCED_GRAYSCALE_8 | cv2.IMREAD_IGNORE_ORIENTATION,
+}
+
+
+def reduction_factor(size, target_side):
+    """
+    选择缩小解码倍数：解码结果的长边不小于target_side的最大倍数（1、2、4、8）
+
+    Args:
+        size: 原图尺寸（宽, 高）
+        target_side: 解码后长边的下限（像素）
+    """
+    longest = max(size)
+    for factor in (8, 4, 2):
+        if -(-longest // factor) >= target_side:
+            return factor
+    return 1
+
+
+def combine_requirements(requirements):
+    """
+    合并多个算法的REQUIREMENTS声明
+
+    任一算法需要彩色图时按彩色解码；min_side取最大值。
+    """
+    channels = 'gray'
+    min_side = 0
+    for requirement in requirements:
+        if requirement['channels'] == 'color':
+            channels = 'color'
+        min_side = max(min_side, requirement['min_side'])
+    return {'channels': channels, 'min_side': min_side}
+
+
+class ImageContext:
+    """
+    单张图像的解码上下文
+
+    文件读取、解码以及BGR/RGB/灰度/float32等转换都按需惰性执行，且每种只执行一次。
+    ImageHash、Opencv1、Opencv2、Opencv3的算法函数都可以直接接收该对象代替图像路径，
+    这样同一张图在一次评估中只会被读取和解码一次。
+    """
+
+    def __init__(self, path, data=None, reduce=1, channels=None):
+        self.path = path
+        # 相对原图的缩放比例，代理分辨率上下文小于1，供算法校准分辨率相关指标
+        self.scale = 1.0
+        # 缩小解码设置：reduce为1/2/4/8倍，channels为'gray'时直接解码为灰度图。
+        # 默认(1, None)按原样全分辨率解码
+        self.reduce = reduce
+        self.channels = channels
+        # 已计算的图像特征（如拉普拉斯方差、Brenner和），可由TiledEvaluator按条带预先填充
+        self.features = {}
+        # 调试计数：每种解码/转换/特征实际计算的次数（同一上下文内应均为1）
+        self.compute_counts = Counter()
+        if data is not None:
+            # 调用方已读取过文件字节时直接复用
+            self.data = data
+
+    def __repr__(self):
+        return f"ImageContext({self.path!r})"
+
+    @classmethod
+    def from_array(cls, path, image, scale=1.0):
+        """由已解码的图像数组构造上下文（如代理分辨率的缩小副本）"""
+        context = cls(path)
+        context.image = image
+        context.scale = scale
+        return context
+
+    @classmethod
+    def open_reduced(cls, path, target_side, channels='color', data=None):
+        """
+        按需缩小解码：根据文件头中的尺寸选择缩小倍数，使解码后的长边不小于target_side
+
+        Args:
+            path: 图像路径
+            target_side: 解码后长边的下限（像素）
+            channels: 'color'或'gray'，各算法REQUIREMENTS合并后的通道需求
+            data: 已读取的文件字节（可选）
+        """
+        context = cls(path, data=data, channels=channels)
+        context.reduce = reduction_factor(context.original_size, target_side)
+        return context
+
+    @cached_property
+    def original_size(self):
+        """原图尺寸（宽, 高）；缩小解码时从文件头读取，不解码像素"""
+        if self.reduce == 1 and self.channels is None:
+            h, w = self.image.shape[:2]
+            return w, h
+        with Image.open(io.BytesIO(self.data)) as img:
+            return img.size
+
+    @cached_property
+    def data(self):
+        """原始文件字节（np.uint8数组，兼容中文路径）"""
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"文件不存在: {self.path}")
+        return np.fromfile(self.path, dtype=np.uint8)
+
+    @cached_property
+    def image(self):
+        """按原样解码的图像（等价于cv2.imdecode(..., -1)）；设置了缩小解码时按reduce和channels解码"""
+        self.compute_counts['decode'] += 1
+        if self.reduce == 1 and self.channels is None:
+            img = cv2.imdecode(self.data, -1)
+        else:
+            img = cv2.imdecode(self.data, REDUCED_DECODE_FLAGS[(self.channels or 'color', self.reduce)])
+        if img is None:
+            raise ValueError(f"无法读取图像: {self.path}")
+        if self.reduce != 1:
+            self.scale = img.shape[1] / self.original_size[0]
+        return img
+
+    @cached_property
+    def bgr(self):
+        """三通道BGR图像"""
+        self.compute_counts['bgr'] += 1
+        img = self.image
+        if img.ndim == 2:
+            return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        if img.shape[2] == 4:
+            return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+        return img
+
+    @cached_property
+    def rgb(self):
+        """三通道RGB图像"""
+        self.compute_counts['rgb'] += 1
+        img = self.image
+        if img.ndim == 2:
+            return cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    @cached_property
+    def gray(self):
+        """uint8灰度图像"""
+        self.compute_counts['gray'] += 1
+        img = self.image
+        if img.ndim == 2:
+            return img
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def gray_float32(self):
+        """float32灰度图像"""
+        self.compute_counts['gray_float32'] += 1
+        return self.gray.astype(np.float32)
+
+    @cached_property
+    def pil_gray(self):
+        """
+        灰度PIL图像（供imagehash使用），由gray包装而成
+
+        不是PIL打开文件后convert('L')的结果：两者的亮度系数相同（ITU-R 601-2），但OpenCV的定点舍入
+        与PIL不同，个别像素可能相差1；缩小解码时（open_reduced）像素来自缩小后的图像。
+        pHash因此可能与直接对文件调用imagehash.phash有微小差异。
+        """
+        self.compute_counts['pil_gray'] += 1
+        return Image.fromarray(self.gray)
+
+    def feature(self, key, compute):
+        """取已计算的特征；尚未计算时调用compute()计算并记录"""
+        if key not in self.features:
+            self.compute_counts[key] += 1
+            self.features[key] = compute()
+        return self.features[key]
+
+    def release(self):
+        """释放所有已解码/转换的数据"""
+        for name in ('data', 'image', 'original_size', 'bgr', 'rgb', 'gray', 'gray_float32', 'pil_gray'):
+            self.__dict__.pop(name, None)
+
+
+def as_context(image):
+    """将图像路径包装为ImageContext；已是ImageContext则原样返回"""
+    if isinstance(image, ImageContext):
+        return image
+    return ImageContext(image)
+
+
+def gray_feature(image, key, compute):
+    """
+    基于灰度图的特征：ImageContext按key记录结果，同一张图只计算一次；BGR数组则即时计算
+
+    Args:
+        image: ImageContext或BGR数组
+        key: 特征名（与TiledEvaluator填充的键一致）
+        compute: 以uint8灰度图为参数的计算函数
+    """
+    if isinstance(image, ImageContext):
+        return image.feature(key, lambda: compute(image.gray))
+    return compute(to_gray(image))
+
+
+def to_gray(image):
+    """获取灰度图：ImageContext直接复用已转换的灰度图，BGR数组则即时转换"""
+    if isinstance(image, ImageContext):
+        return image.gray
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
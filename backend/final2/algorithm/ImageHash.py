@@ -1,12 +1,23 @@
-from PIL import Image
 import imagehash
+import numpy as np
+import scipy.fftpack
+from .ImageContext import as_context
+from .TemplateCache import get_template_fingerprint
+
+# 解码需求：pHash(hash_size=32)在128x128的灰度图上计算
+REQUIREMENTS = {'channels': 'gray', 'min_side': 128}
+# 算法版本：输出结果的计算方式变化时递增，使结果缓存中的旧结果失效
+VERSION = 2
+
 def is_similar(image_path1, image_path2, threshold=10):
-    # 加载图像并计算哈希
-    image1 = Image.open(image_path1)
-    image2 = Image.open(image_path2)
+    # image_path1为模板：路径形式时从模板缓存取pHash，同一模板每个进程只计算一次
+    # image_path2可以是图像路径或ImageContext，复用已解码的灰度图（OpenCV灰度转换，见ImageContext.pil_gray）
     # 使用感知哈希（pHash）
-    hash1 = imagehash.phash(image1, hash_size=32)  # hash_size越大，精度越高
-    hash2 = imagehash.phash(image2, hash_size=32)
+    if isinstance(image_path1, str):
+        hash1 = get_template_fingerprint(image_path1).phash
+    else:
+        hash1 = imagehash.phash(as_context(image_path1).pil_gray, hash_size=32)  # hash_size越大，精度越高
+    hash2 = imagehash.phash(as_context(image_path2).pil_gray, hash_size=32)
     # 计算汉明距离
     hamming_distance = hash1 - hash2
     #print(f"汉明距离: {hamming_distance}")
@@ -22,6 +33,50 @@ def is_similar(image_path1, image_path2, threshold=10):
     return result
 
 
+# 与imagehash.phash(hash_size=32)一致：在128x128（hash_size*4）的灰度图上做二维DCT
+HASH_SIZE = 32
+PHASH_PIXELS = HASH_SIZE * 4
+
+
+def phash_pixels(image):
+    """pHash的输入：缩放到128x128的灰度像素（uint8），与imagehash.phash内部的缩放一致"""
+    pil_gray = as_context(image).pil_gray
+    return np.asarray(pil_gray.resize((PHASH_PIXELS, PHASH_PIXELS), imagehash.ANTIALIAS))
+
+
+def phash_bits_batch(pixels):
+    """
+    一批图片的pHash位矩阵（向量化）
+
+    Args:
+        pixels: 形状为(N, 128, 128)的phash_pixels()结果
+
+    Returns:
+        np.ndarray: (N, 32, 32)布尔数组，每张图片与imagehash.phash(..., hash_size=32).hash逐位相同
+    """
+    dct = scipy.fftpack.dct(scipy.fftpack.dct(pixels, axis=1), axis=2)[:, :HASH_SIZE, :HASH_SIZE]
+    median = np.median(dct.reshape(len(dct), -1), axis=1)
+    return dct > median[:, None, None]
+
+
+def is_similar_batch(template_path, pixels, threshold=10):
+    """
+    is_similar的批量版本：模板pHash取一次，DCT、中值和汉明距离对整批一起计算
+
+    Args:
+        template_path: 模板图像路径
+        pixels: phash_pixels()结果的列表
+
+    Returns:
+        list: 与pixels一一对应的结果字典，与is_similar相同
+    """
+    if not pixels:
+        return []
+    template_bits = get_template_fingerprint(template_path).phash.hash
+    distances = (phash_bits_batch(np.stack(pixels)) != template_bits).sum(axis=(1, 2))
+    return [{"distance": int(distance), "similar": bool(distance <= threshold)} for distance in distances]
+
+
 # 示例调用
 #image1 = r"C:\Users\Administrator\Desktop\test\1.jpg"
 #image2 = r"C:\Users\Administrator\Desktop\test\2.jpg"
@@ -0,0 +1,167 @@
+import threading
+
+import cv2
+import numpy as np
+
+# 每个线程的工作区中单个缓冲区最多保留的字节数；更大的缓冲区每次调用单独分配，用完即释放
+WORKSPACE_MAX_BYTES = 64 * 1024 * 1024
+# 方差第二遍求和时单段的最大元素数（每段临时float64缓冲区为其8倍字节）
+PAIRWISE_SEGMENT = 1 << 16
+
+_local = threading.local()
+
+
+class MetricWorkspace:
+    """
+    Opencv1指标计算的可复用缓冲区
+
+    颜色差和拉普拉斯响应都写入按尺寸缓存的缓冲区，同尺寸的图像直接复用，
+    单张图像的峰值内存约为原始uint8数据的常数倍（而不是逐步生成float64整图）。
+    超过max_bytes的缓冲区不保留，每次调用单独分配。
+    """
+
+    def __init__(self, max_bytes=WORKSPACE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.buffers = {}
+
+    def get(self, name, shape, dtype):
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            self.buffers.pop(name, None)
+            buf = np.empty(shape, dtype=dtype)
+            if buf.nbytes <= self.max_bytes:
+                self.buffers[name] = buf
+        return buf
+
+    def release(self):
+        self.buffers = {}
+
+
+def _thread_workspace():
+    workspace = getattr(_local, 'workspace', None)
+    if workspace is None:
+        workspace = _local.workspace = MetricWorkspace()
+    return workspace
+
+
+def _pairwise_leaves(n, segment):
+    """numpy成对求和把长度n的数组二分到不超过segment个元素时的各段长度（按顺序）"""
+    if n <= segment:
+        yield n
+        return
+    half = n // 2
+    half -= half % 8
+    yield from _pairwise_leaves(half, segment)
+    yield from _pairwise_leaves(n - half, segment)
+
+
+def _pairwise_combine(n, segment, sums):
+    """按与_pairwise_leaves相同的二分方式合并各段的和"""
+    if n <= segment:
+        return next(sums)
+    half = n // 2
+    half -= half % 8
+    return _pairwise_combine(half, segment, sums) + _pairwise_combine(n - half, segment, sums)
+
+
+class SquaredDeviationSum:
+    """
+    sum((x - mean) ** 2)，与np.var/np.std对整个数组的第二遍求和逐位相同
+
+    numpy对连续float64数组的求和是成对求和（每次二分，左半长度取n//2向下对齐到8的倍数），
+    这里按同样的方式把数组切成不超过PAIRWISE_SEGMENT个元素的段，每段用np.add.reduce求和，
+    再按同样的树合并。数据可以按C顺序分块依次传入（如按条带），每次只为一段分配float64缓冲区。
+
+    Args:
+        n: 数组的总元素数
+        mean: 整个数组的均值（与numpy相同：float64的元素和除以n）
+    """
+
+    def __init__(self, n, mean, segment=PAIRWISE_SEGMENT):
+        self.n = n
+        self.mean = mean
+        self.segment = segment
+        self._leaves = _pairwise_leaves(n, segment)
+        self._remaining = next(self._leaves)
+        self._pending = []
+        self._sums = []
+
+    def add(self, values):
+        """按C顺序传入下一块数据"""
+        flat = values.reshape(-1)
+        while flat.size:
+            take = min(self._remaining, flat.size)
+            piece = np.subtract(flat[:take], self.mean, dtype=np.float64)
+            piece *= piece
+            self._pending.append(piece)
+            self._remaining -= take
+            flat = flat[take:]
+            if self._remaining == 0:
+                leaf = self._pending[0] if len(self._pending) == 1 else np.concatenate(self._pending)
+                self._sums.append(np.add.reduce(leaf))
+                self._pending = []
+                self._remaining = next(self._leaves, 0)
+
+    def total(self):
+        """全部数据传入后的和"""
+        return _pairwise_combine(self.n, self.segment, iter(self._sums))
+
+
+def mean_color_diff(bgr, target_color, workspace=None):
+    """
+    BGR图像与目标RGB颜色的平均绝对差（等价于np.mean(cv2.absdiff(rgb, np.full_like(rgb, target))))
+
+    直接在BGR数据上与反序的目标颜色比较，不生成RGB副本和目标颜色整图。
+    非8位图像（如16位PNG）按原公式计算。
+    """
+    if bgr.dtype != np.uint8:
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        return np.mean(cv2.absdiff(rgb, np.full_like(rgb, target_color)))
+    workspace = workspace or _thread_workspace()
+    diff = workspace.get('color_diff', bgr.shape, np.uint8)
+    r, g, b = target_color
+    cv2.absdiff(bgr, (b, g, r, 0), dst=diff)
+    total = int(diff.sum(dtype=np.int64))
+    return np.float64(total / diff.size)
+
+
+def laplacian_variance(gray, workspace=None):
+    """
+    拉普拉斯响应的方差（与cv2.Laplacian(gray, cv2.CV_64F).var()逐位相同）
+
+    8位灰度图的拉普拉斯响应在[-1020, 1020]内，写入复用的int16缓冲区；均值由精确整数和得到，
+    第二遍求和见SquaredDeviationSum，不生成float64整图。其他位深（int16容纳不下）按原公式计算。
+    """
+    if gray.dtype != np.uint8:
+        return cv2.Laplacian(gray, cv2.CV_64F).var()
+    workspace = workspace or _thread_workspace()
+    lap = workspace.get('laplacian', gray.shape, np.int16)
+    cv2.Laplacian(gray, cv2.CV_16S, dst=lap)
+    deviations = SquaredDeviationSum(lap.size, int(lap.sum(dtype=np.int64)) / lap.size)
+    deviations.add(lap)
+    return deviations.total() / lap.size
+
+
+def gray_std(gray):
+    """灰度标准差（与gray.std()逐位相同），8位图像不分配任何整图数组"""
+    if gray.dtype != np.uint8 or not gray.flags.c_contiguous:
+        return gray.std()
+    deviations = SquaredDeviationSum(gray.size, int(gray.sum(dtype=np.int64)) / gray.size)
+    deviations.add(gray)
+    return np.sqrt(deviations.total() / gray.size)
+
+
+def gray_histogram(gray):
+    """
+    256级灰度直方图（int64计数）
+
+    cv2.calcHist以float32输出计数，单个bin超过2^24时不再精确；这里按行分块统计，
+    每块像素数小于2^24，再以整数累加。
+    """
+    histogram = np.zeros(256, dtype=np.int64)
+    block_rows = max(1, (1 << 24) // max(1, gray.shape[1]))
+    for start in range(0, gray.shape[0], block_rows):
+        block = gray[start:start + block_rows]
+        histogram += cv2.calcHist([block], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+    return histogram
+
@@ -1,11 +1,24 @@
+import logging
+
 import cv2
 import numpy as np
+from .ImageContext import as_context, gray_feature, to_gray
+from .MetricKernels import gray_histogram, gray_std, laplacian_variance
+from .TemplateCache import get_template_fingerprint
+from .ProxyResolution import calibrate
+
+# 解码需求：全部基于灰度图；模板匹配的模板会随图像缩放，图像过小时粗匹配失效
+REQUIREMENTS = {'channels': 'gray', 'min_side': 512}
+# 算法版本：输出结果的计算方式变化时递增，使结果缓存中的旧结果失效
+VERSION = 4
+
+logger = logging.getLogger(__name__)
 
 
 def calculate_texture_complexity(image):
     """计算图像纹理复杂度（基于灰度共生矩阵）"""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+    # 与cv2.calcHist相同的float32计数；ImageContext上的直方图与其他算法共享
+    hist = gray_feature(image, 'histogram', gray_histogram).astype(np.float32)
     hist /= hist.sum()
 
     contrast = np.sum((hist * np.arange(256)) ** 2)
@@ -15,54 +28,231 @@ def calculate_texture_complexity(image):
     return min(texture_score, 1.0)
 
 
-def check_element_completeness(image, template_path=None):
-    """检查服装元素完整性（使用模板匹配）"""
-    if template_path:
-        template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-        if template is None:
-            return 0.0
-        
-        # 转换图像为灰度
-        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # 检查尺寸，确保模板不大于图像
-        img_h, img_w = gray_image.shape
-        temp_h, temp_w = template.shape
-        
-        # 如果模板比图像大，调整模板尺寸
-        if temp_h > img_h or temp_w > img_w:
-            # 计算缩放比例，保持宽高比
-            scale_h = img_h / temp_h if temp_h > img_h else 1.0
-            scale_w = img_w / temp_w if temp_w > img_w else 1.0
-            scale = min(scale_h, scale_w, 0.8)  # 最大缩放到80%
-            
-            new_w = int(temp_w * scale)
-            new_h = int(temp_h * scale)
-            template = cv2.resize(template, (new_w, new_h))
-        
-        # 如果调整后的模板仍然太大或太小，返回默认值
-        temp_h, temp_w = template.shape
-        if temp_h > img_h or temp_w > img_w or temp_h < 10 or temp_w < 10:
-            return 0.5  # 返回中等完整性分数
-        
+# 模板匹配配置
+MATCH_MODE = 'pyramid'  # 'pyramid': 金字塔由粗到精搜索；'exhaustive': 全分辨率穷举匹配（参考模式）
+TEMPLATE_SCALES = (1.0,)  # 搜索的模板相对尺度，报告得分最高的尺度；多尺度搜索需显式传入scales
+PYRAMID_MIN_TEMPLATE_SIDE = 32  # 最粗一层模板最短边不小于该值
+PYRAMID_CANDIDATES = 3  # 粗层保留的候选位置数
+PYRAMID_REFINE_RADIUS = 2  # 逐层精化时，在上一层位置（放大2倍后）周围搜索的半径（像素）
+MATCH_TOLERANCE = 0.05  # 金字塔匹配的默认容差（config中的template_match_tolerance），见match_template_pyramid
+
+
+def match_tolerance(config):
+    """config中的模板匹配容差（未配置时为MATCH_TOLERANCE）"""
+    return config.get('template_match_tolerance', MATCH_TOLERANCE) if config else MATCH_TOLERANCE
+
+
+def _pyramid_levels(template_shape):
+    """根据模板尺寸确定金字塔层数"""
+    levels = 0
+    side = min(template_shape)
+    while side // 2 >= PYRAMID_MIN_TEMPLATE_SIDE:
+        side //= 2
+        levels += 1
+    return levels
+
+
+def _coarse_candidates(result, count, suppress_h, suppress_w):
+    """在粗层匹配结果中取得分最高的若干个互不重叠的位置"""
+    result = result.copy()
+    candidates = []
+    for _ in range(count):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+        if not np.isfinite(max_val) or max_val <= -1:
+            break
+        candidates.append((x, y, max_val))
+        result[max(0, y - suppress_h):y + suppress_h + 1, max(0, x - suppress_w):x + suppress_w + 1] = -1
+    return candidates
+
+
+def _refine(image, template, x, y, radius):
+    """在(x, y)周围radius像素内匹配，返回(最佳x, 最佳y, 得分)"""
+    img_h, img_w = image.shape
+    temp_h, temp_w = template.shape
+    left, top = max(0, x - radius), max(0, y - radius)
+    right = min(img_w, x + radius + temp_w)
+    bottom = min(img_h, y + radius + temp_h)
+    window = image[top:bottom, left:right]
+    if window.shape[0] < temp_h or window.shape[1] < temp_w:
+        return x, y, -1.0
+    _, score, _, (dx, dy) = cv2.minMaxLoc(cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED))
+    return left + dx, top + dy, float(score)
+
+
+def _exhaustive(gray_image, template):
+    """全分辨率穷举匹配的最高得分"""
+    return float(cv2.matchTemplate(gray_image, template, cv2.TM_CCOEFF_NORMED).max())
+
+
+def match_template_pyramid(gray_image, template, image_pyramid=None, template_pyramid=None,
+                           radius=PYRAMID_REFINE_RADIUS, tolerance=MATCH_TOLERANCE):
+    """
+    金字塔由粗到精的TM_CCOEFF_NORMED模板匹配
+
+    先在最粗层上找出候选位置，再逐层向下：每层只在上一层位置（坐标放大2倍）周围
+    radius像素的小窗口内匹配，直到全分辨率。每层的计算量与模板大小相当，与图像大小无关。
+    匹配位置很少（模板与图像尺寸接近）时直接穷举。
+
+    tolerance不为None时校验结果，以下任一情况视为精化不可靠，退回全分辨率穷举：
+    1. 第1层（半分辨率）穷举匹配的最高分（开销约为全分辨率穷举的1/16）比精化得到的位置高出
+       tolerance以上：粗层把搜索引向了错误的区域；
+    2. 全分辨率得分比该位置的第1层得分低tolerance以上：两层的得分分布差异大，第1层的位置不可信。
+    返回值总是某个真实位置的全分辨率得分，不会高于穷举得分（不计float32舍入误差）；tolerance为0时只有两层得分完全一致
+    才不退回穷举，结果与穷举相同。校验是启发式的：两项都通过时，与穷举得分的偏差通常在tolerance以内，
+    但不是严格的上界。tolerance为None时不校验。
+
+    Returns:
+        float: 最佳匹配得分
+    """
+    levels = _pyramid_levels(template.shape)
+    img_h, img_w = gray_image.shape
+    temp_h, temp_w = template.shape
+    positions = (img_h - temp_h + 1) * (img_w - temp_w + 1)
+    if levels == 0 or positions <= (2 * radius + 1) ** 2:
+        return _exhaustive(gray_image, template)
+
+    if image_pyramid is None:
+        image_pyramid = [gray_image]
+    while len(image_pyramid) <= levels:
+        image_pyramid.append(cv2.pyrDown(image_pyramid[-1]))
+    if template_pyramid is None:
+        template_pyramid = [template]
+        for _ in range(levels):
+            template_pyramid.append(cv2.pyrDown(template_pyramid[-1]))
+
+    coarse_image = image_pyramid[levels]
+    coarse_template = template_pyramid[levels]
+    if (coarse_template.shape[0] > coarse_image.shape[0] or
+            coarse_template.shape[1] > coarse_image.shape[1]):
+        return _exhaustive(gray_image, template)
+
+    coarse = cv2.matchTemplate(coarse_image, coarse_template, cv2.TM_CCOEFF_NORMED)
+    candidates = _coarse_candidates(coarse, PYRAMID_CANDIDATES,
+                                    max(1, coarse_template.shape[0] // 2),
+                                    max(1, coarse_template.shape[1] // 2))
+
+    # 各候选逐层精化到第1层（pyrDown取整会造成1像素偏差，半径加1）；
+    # 全分辨率层的窗口与模板一样大、开销最高，只精化第1层得分最高的候选
+    best_x, best_y, best_score = 0, 0, -np.inf
+    for x, y, score in candidates:
+        for level in range(levels - 1, 0, -1):
+            x, y, score = _refine(image_pyramid[level], template_pyramid[level], 2 * x, 2 * y, radius + 1)
+        if score > best_score:
+            best_x, best_y, best_score = x, y, score
+
+    # 只有一层时粗层匹配本身就是第1层的穷举
+    if tolerance is not None and levels > 1:
+        level1_best = float(cv2.matchTemplate(image_pyramid[1], template_pyramid[1], cv2.TM_CCOEFF_NORMED).max())
+        if best_score < level1_best - tolerance:
+            logger.debug(f"金字塔精化得分{best_score:.4f}低于第1层最高分{level1_best:.4f}，退回穷举匹配")
+            return _exhaustive(gray_image, template)
+    score = _refine(gray_image, template, 2 * best_x, 2 * best_y, radius + 1)[2]
+    if tolerance is not None and score < best_score - tolerance:
+        logger.debug(f"全分辨率得分{score:.4f}低于第1层得分{best_score:.4f}，退回穷举匹配")
+        return _exhaustive(gray_image, template)
+    return score
+
+
+def check_element_completeness(image, template_path=None, mode=None, scales=None, return_scale=False,
+                               tolerance=MATCH_TOLERANCE):
+    """
+    检查服装元素完整性（使用模板匹配）
+
+    Args:
+        image: BGR图像数组或ImageContext
+        template_path: 模板图像路径
+        mode: 'pyramid'（默认，见MATCH_MODE）或'exhaustive'（全分辨率穷举，作为参考）
+        scales: 搜索的模板相对尺度，默认TEMPLATE_SCALES（只用原尺度）；如(0.9, 1.0, 1.1)开启多尺度搜索，
+            得分取各尺度最高者，可能高于单尺度得分
+        return_scale: 为True时返回(得分, 最佳尺度)
+        tolerance: 金字塔匹配的容差，见match_template_pyramid
+
+    Returns:
+        float: 完整性得分；return_scale为True时返回(float, float或None)
+    """
+    score, best_scale = _element_completeness(image, template_path, mode or MATCH_MODE,
+                                              scales or TEMPLATE_SCALES, tolerance)
+    if return_scale:
+        return score, best_scale
+    return score
+
+
+def _element_completeness(image, template_path, mode, scales, tolerance):
+    if not template_path:
+        return 1.0, None
+
+    # 模板灰度图及其缩放版本来自进程级模板缓存，不再为每张图片重复读取
+    try:
+        fingerprint = get_template_fingerprint(template_path)
+    except OSError:
+        return 0.0, None
+    template = fingerprint.gray
+    if template is None:
+        return 0.0, None
+
+    # 转换图像为灰度
+    gray_image = to_gray(image)
+
+    # 检查尺寸，确保模板不大于图像
+    img_h, img_w = gray_image.shape
+    temp_h, temp_w = template.shape
+
+    # 代理分辨率的图像上，模板按相同比例缩小
+    image_scale = getattr(image, 'scale', 1.0)
+    if image_scale < 1.0:
+        temp_w = int(round(temp_w * image_scale))
+        temp_h = int(round(temp_h * image_scale))
+
+    # 如果模板比图像大，调整模板尺寸
+    if temp_h > img_h or temp_w > img_w:
+        # 计算缩放比例，保持宽高比
+        scale_h = img_h / temp_h if temp_h > img_h else 1.0
+        scale_w = img_w / temp_w if temp_w > img_w else 1.0
+        scale = min(scale_h, scale_w, 0.8)  # 最大缩放到80%
+
+        temp_w = int(temp_w * scale)
+        temp_h = int(temp_h * scale)
+
+    # 如果调整后的模板仍然太大或太小，返回默认值
+    if temp_h > img_h or temp_w > img_w or temp_h < 10 or temp_w < 10:
+        return 0.5, None  # 返回中等完整性分数
+
+    best_score, best_scale = None, None
+    image_pyramid = [gray_image]  # 各尺度共享同一图像金字塔
+    for relative_scale in scales:
+        new_w = int(round(temp_w * relative_scale))
+        new_h = int(round(temp_h * relative_scale))
+        if new_h > img_h or new_w > img_w or new_h < 10 or new_w < 10:
+            continue
+        scaled_template = fingerprint.resized((new_w, new_h))
         try:
-            res = cv2.matchTemplate(gray_image, template, cv2.TM_CCOEFF_NORMED)
-            return float(res.max())
+            if mode == 'exhaustive':
+                res = cv2.matchTemplate(gray_image, scaled_template, cv2.TM_CCOEFF_NORMED)
+                score = float(res.max())
+            else:
+                score = match_template_pyramid(gray_image, scaled_template, image_pyramid,
+                                               fingerprint.pyramid((new_w, new_h), _pyramid_levels((new_h, new_w))),
+                                               tolerance=tolerance)
         except cv2.error as e:
-            print(f"模板匹配错误: {e}")
-            return 0.5  # 返回中等完整性分数
-    return 1.0
+            logger.warning(f"模板匹配错误: {e}")
+            continue
+        if best_score is None or score > best_score:
+            best_score, best_scale = score, relative_scale
+
+    if best_score is None:
+        return 0.5, None  # 返回中等完整性分数
+    return best_score, best_scale
 
 def calculate_quality_metrics(image):
     """计算图像质量指标（清晰度、噪声）优化版"""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-    # 清晰度计算（调整基准值）
-    laplacian = cv2.Laplacian(gray, cv2.CV_64F).var()
+    # 清晰度计算（调整基准值，代理分辨率下换算为全分辨率等效值）
+    # 拉普拉斯方差和灰度标准差与Opencv1共享，同一张图只计算一次
+    laplacian = gray_feature(image, 'laplacian_var', laplacian_variance)
+    laplacian = calibrate('laplacian_var', laplacian, getattr(image, 'scale', 1.0))
     clarity_base = laplacian / 150  # 基准值从150调整为50
 
     # 噪声水平计算（逻辑反转）
-    noise_level = gray.std()
+    noise_level = gray_feature(image, 'gray_std', gray_std)
     noise_factor = min(noise_level / 30, 1.0)  # 噪声越大得分越高
 
     # 质量得分改进（防止乘积归零）
@@ -85,11 +275,13 @@ def calculate_quality_metrics(image):
     #return min(max(quality_score, 0), 1)
 
 
-def evaluate_fashion_image(template_path,image_path):
-    """综合评估函数（四级质量等级）"""
-    img = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), -1)
-    if img is None:
-        raise FileNotFoundError(f"Image not found: {image_path}")
+def evaluate_fashion_image(template_path, image_path, match_tolerance=MATCH_TOLERANCE):
+    """综合评估函数（四级质量等级）
+
+    image_path可以是图像路径，也可以是已共享解码结果的ImageContext；
+    match_tolerance为模板匹配的容差（config中的template_match_tolerance），见match_template_pyramid
+    """
+    img = as_context(image_path)
 
     # 初始化评分字典
     scores = {
@@ -100,7 +292,8 @@ def evaluate_fashion_image(template_path,image_path):
 
     # 计算各维度得分
     scores['texture'] = calculate_texture_complexity(img)
-    scores['completeness'] = check_element_completeness(img, template_path)
+    scores['completeness'], completeness_scale = check_element_completeness(img, template_path, return_scale=True,
+                                                                            tolerance=match_tolerance)
     scores['quality'] = calculate_quality_metrics(img)
 
     # 加权综合评分
@@ -165,6 +358,7 @@ def evaluate_fashion_image(template_path,image_path):
     return {
         'texture': scores['texture'],
         'completeness': scores['completeness'],
+        'completeness_scale': completeness_scale,  # 模板匹配的最佳尺度
         'quality': scores['quality'],
         'overall': overall,
         'quality_grade': quality_grade,
@@ -1,6 +1,13 @@
 import cv2
 import numpy as np
-from skimage.metrics import structural_similarity as ssim
+from .FastSSIM import structural_similarity
+from .ImageContext import as_context
+from .ProxyResolution import calibrate
+
+# 解码需求：Brenner和SSIM都基于灰度图，在代理分辨率下经过校准
+REQUIREMENTS = {'channels': 'gray', 'min_side': 256}
+# 算法版本：输出结果的计算方式变化时递增，使结果缓存中的旧结果失效
+VERSION = 1
 
 # 特征权重（总和=1）
 WEIGHTS = {
@@ -9,53 +16,95 @@ WEIGHTS = {
 }
 
 def load_image_gray(image_path):
-    """读取图像并转换为灰度"""
-    #img = cv2.imread(image_path)
-    img = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), -1)
-    if img is None:
-        raise FileNotFoundError(f"无法找到图像文件: {image_path}")
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    return gray.astype(np.float32)
+    """读取图像并转换为灰度（image_path可以是路径或ImageContext）"""
+    return as_context(image_path).gray_float32
+
+def _brenner_pairs(gray_img, step, full_resolution):
+    """取出Brenner梯度的上下像素对（采样模式与原双重循环的取点完全一致）"""
+    h = gray_img.shape[-2]
+    if full_resolution:
+        upper = gray_img[..., :h - step, :]
+        lower = gray_img[..., step:, :]
+    else:
+        # 原实现: i in range(0, h - step, step), j in range(0, w, step)
+        upper = gray_img[..., 0:h - step:step, ::step]
+        lower = gray_img[..., step:h:step, ::step][..., :upper.shape[-2], :]
+    return upper, lower
+
+def _sum_squared_diff(upper, lower, block_rows=512):
+    """按行块累加差值平方和，避免一次性分配整幅float64差值图"""
+    total = 0.0
+    for start in range(0, upper.shape[-2], block_rows):
+        diff = np.subtract(upper[..., start:start + block_rows, :],
+                           lower[..., start:start + block_rows, :],
+                           dtype=np.float64)
+        total = total + np.einsum('...ij,...ij->...', diff, diff)
+    return total
+
+def brenner_gradient(gray_img, full_resolution=False):
+    """Brenner梯度法计算图像清晰度
 
-def brenner_gradient(gray_img):
-    """Brenner梯度法计算图像清晰度"""
+    默认按原算法每隔step个像素采样；full_resolution=True时使用全部像素，
+    并除以step**2，使得分与采样模式处于同一量级，阈值无需调整。
+    """
     step = 3
     h, w = gray_img.shape
-    brenner = 0.0
-    for i in range(0, h - step, step):
-        for j in range(0, w, step):
-            diff = gray_img[i, j] - gray_img[i + step, j]
-            brenner += diff ** 2
+    upper, lower = _brenner_pairs(gray_img, step, full_resolution)
+    brenner = float(_sum_squared_diff(upper, lower))
+    if full_resolution:
+        brenner /= step * step
     return (brenner / (h * w)) * 100
 
-def ssim_contrast(gray_img):
-    """使用SSIM计算图像对比度"""
+def brenner_gradient_batch(gray_imgs, full_resolution=False):
+    """批量计算Brenner梯度
+
+    Args:
+        gray_imgs: 形状为(N, H, W)的灰度图像栈，或尺寸不同的灰度图像列表
+        full_resolution: 是否使用全分辨率模式
+
+    Returns:
+        np.ndarray: 长度为N的得分数组
+    """
+    if isinstance(gray_imgs, np.ndarray) and gray_imgs.ndim == 3:
+        step = 3
+        _, h, w = gray_imgs.shape
+        upper, lower = _brenner_pairs(gray_imgs, step, full_resolution)
+        brenner = np.asarray(_sum_squared_diff(upper, lower), dtype=np.float64)
+        if full_resolution:
+            brenner /= step * step
+        return (brenner / (h * w)) * 100
+    return np.array([brenner_gradient(img, full_resolution) for img in gray_imgs],
+                    dtype=np.float64)
+
+def ssim_contrast(gray_img, max_side=None):
+    """使用SSIM计算图像对比度（max_side不为空时在缩小的代理图像上计算）"""
     window = 7
     blurred = cv2.GaussianBlur(gray_img, (window, window), 0)
-    data_range = np.max(gray_img) - np.min(gray_img)
+    data_range = float(np.max(gray_img) - np.min(gray_img))
     if data_range == 0:
         return 0.0
-    contrast = ssim(gray_img, blurred, data_range=data_range, win_size=window)
+    contrast = structural_similarity(gray_img, blurred, data_range=data_range,
+                                     win_size=window, max_side=max_side)
     return contrast * 100
 
 def calculate_composite_score(image_path):
-    """计算图像清晰度综合得分"""
-    try:
-        gray = load_image_gray(image_path)
-        scores = {
-            'brenner': brenner_gradient(gray),
-            'ssim': ssim_contrast(gray)
-        }
-        composite = sum(scores[k] * WEIGHTS[k] for k in scores)
-        return {
-            'raw_scores': scores,
-            'composite': np.clip(composite, 0, 100),
-            'initial_brenner': scores['brenner'],
-            'initial_ssim': scores['ssim']
-        }
-    except Exception as e:
-        print(f"分析失败: {str(e)}")
-        return None
+    """计算图像清晰度综合得分（出错时抛出异常，由调用方记录错误类型和信息）"""
+    context = as_context(image_path)
+    # 特征已由TiledEvaluator按条带算好时直接取用，不生成整图float32灰度
+    brenner = context.feature('brenner', lambda: brenner_gradient(context.gray_float32))
+    ssim = context.feature('ssim_contrast', lambda: ssim_contrast(context.gray_float32))
+    # 代理分辨率下换算为全分辨率等效值（全分辨率时原样返回）
+    scores = {
+        'brenner': calibrate('brenner', brenner, context.scale),
+        'ssim': calibrate('ssim', ssim, context.scale)
+    }
+    composite = sum(scores[k] * WEIGHTS[k] for k in scores)
+    return {
+        'raw_scores': scores,
+        'composite': np.clip(composite, 0, 100),
+        'initial_brenner': scores['brenner'],
+        'initial_ssim': scores['ssim']
+    }
 
 if __name__ == "__main__":
     test_image = r"C:\Users\Administrator\Desktop\parttime\data\data\20250408skt0000069.png"
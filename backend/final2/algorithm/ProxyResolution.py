@@ -0,0 +1,94 @@
+import math
+
+import cv2
+
+from .ImageContext import ImageContext
+
+# 各指标的分辨率校准指数：全分辨率值 ≈ 代理值 * scale ** exponent（scale < 1为代理缩放比例）
+# 'ssim'作用于不相似度(100 - ssim)。默认值由benchmarks/bench_proxy.py --fit在素材库上拟合得到
+CALIBRATION_EXPONENTS = {
+    'laplacian_var': 0.91,
+    'brenner': 0.30,
+    'ssim': 0.33,
+}
+
+# 缩小解码的结果比代理尺寸大不超过该比例时直接作为代理图像：
+# 接近1倍的INTER_AREA缩放相当于一次插值模糊，会明显压低Brenner等梯度指标
+REDUCED_DECODE_SLACK = 1.25
+
+
+def proxy_scale(shape, max_side=None, max_megapixels=None):
+    """
+    计算代理分辨率的缩放比例
+
+    Args:
+        shape: 原始图像shape（高, 宽, ...）
+        max_side: 长边上限（像素）
+        max_megapixels: 像素总数上限（百万像素）
+
+    Returns:
+        float: 缩放比例，不需要缩小时为1.0
+    """
+    h, w = shape[:2]
+    scale = 1.0
+    if max_side:
+        scale = min(scale, max_side / max(h, w))
+    if max_megapixels:
+        scale = min(scale, math.sqrt(max_megapixels * 1e6 / (h * w)))
+    return scale
+
+
+def make_proxy(context, max_side=None, max_megapixels=None):
+    """
+    生成代理分辨率的ImageContext
+
+    原图不超过上限时原样返回；否则返回在缩小副本上计算的新上下文，
+    其scale属性记录相对原图的缩放比例，供各算法对分辨率相关的指标做校准。
+    context可以是缩小解码的上下文（见ImageContext.open_reduced），此时只需从解码结果再缩小剩余部分。
+    """
+    w, h = context.original_size
+    scale = proxy_scale((h, w), max_side, max_megapixels)
+    if scale >= 1.0:
+        return context
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    image = context.image
+    if context.reduce > 1 and image.shape[1] <= size[0] * REDUCED_DECODE_SLACK:
+        return context
+    if image.shape[1] != size[0] or image.shape[0] != size[1]:
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return ImageContext.from_array(context.path, image, scale=size[0] / w)
+
+
+def proxy_decode_side(size, max_side=None, max_megapixels=None):
+    """代理分辨率下图像长边的目标像素数，size为原图（宽, 高）"""
+    w, h = size
+    return int(math.ceil(max(w, h) * min(1.0, proxy_scale((h, w), max_side, max_megapixels))))
+
+
+def calibrate(metric, value, scale):
+    """将代理分辨率上计算的指标换算为全分辨率等效值"""
+    if scale >= 1.0 or metric not in CALIBRATION_EXPONENTS:
+        return value
+    factor = scale ** CALIBRATION_EXPONENTS[metric]
+    if metric == 'ssim':
+        return 100 - (100 - value) * factor
+    return value * factor
+
+
+def fit_exponent(samples):
+    """
+    根据(全分辨率值, 代理值, 缩放比例)样本拟合校准指数
+
+    在对数空间做过原点的最小二乘：log(full / proxy) = exponent * log(scale)
+    """
+    numerator = 0.0
+    denominator = 0.0
+    for full_value, proxy_value, scale in samples:
+        if full_value <= 0 or proxy_value <= 0 or scale >= 1.0:
+            continue
+        log_scale = math.log(scale)
+        numerator += math.log(full_value / proxy_value) * log_scale
+        denominator += log_scale * log_scale
+    if denominator == 0:
+        return 0.0
+    return numerator / denominator
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+import cv2
+import imagehash
+
+from .ImageContext import ImageContext
+
+# 进程内最多缓存的模板数量（按最近使用淘汰）
+MAX_TEMPLATES = 8
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+class TemplateFingerprint:
+    """
+    模板图像指纹
+
+    持有模板的pHash、灰度矩阵以及按目标尺寸缓存的缩放版本。
+    同一模板在一个进程内只读取、解码、计算哈希一次，供所有图片和任务共享。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = ImageContext(path).data
+        self._resized = {}
+        self._pyramids = {}
+        self._resized_lock = threading.Lock()
+
+    @cached_property
+    def phash(self):
+        """32x32 pHash，与is_similar中比较图像的计算方式一致"""
+        context = ImageContext(self.path, data=self._data)
+        return imagehash.phash(context.pil_gray, hash_size=32)
+
+    @cached_property
+    def md5(self):
+        """模板文件内容的MD5，作为结果缓存键的一部分"""
+        return hashlib.md5(self._data).hexdigest()
+
+    @cached_property
+    def gray(self):
+        """灰度矩阵（等价于cv2.imread(path, cv2.IMREAD_GRAYSCALE)，无法解码时为None）"""
+        return cv2.imdecode(self._data, cv2.IMREAD_GRAYSCALE)
+
+    def resized(self, size):
+        """返回缩放到size=(宽, 高)的灰度模板，同一尺寸只缩放一次"""
+        if size == (self.gray.shape[1], self.gray.shape[0]):
+            return self.gray
+        with self._resized_lock:
+            template = self._resized.get(size)
+            if template is None:
+                template = cv2.resize(self.gray, size)
+                self._resized[size] = template
+            return template
+
+    def pyramid(self, size, levels):
+        """返回缩放到size后的高斯金字塔[原尺寸, 1/2, 1/4, ...]（共levels+1层）"""
+        key = (size, levels)
+        pyramid = self._pyramids.get(key)
+        if pyramid is None:
+            pyramid = [self.resized(size)]
+            for _ in range(levels):
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+            with self._resized_lock:
+                self._pyramids[key] = pyramid
+        return pyramid
+
+
+def get_template_fingerprint(template_path):
+    """
+    获取模板指纹（带缓存）
+
+    缓存键为(绝对路径, 修改时间, 文件大小)，模板文件被替换后会自动重新加载。
+    """
+    stat = os.stat(template_path)
+    abs_path = os.path.abspath(template_path)
+    key = (abs_path, stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        fingerprint = _cache.get(key)
+        if fingerprint is not None:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+            return fingerprint
+
+    fingerprint = TemplateFingerprint(template_path)
+
+    with _lock:
+        _stats['misses'] += 1
+        # 同一路径的旧版本已失效，直接移除
+        for stale_key in [k for k in _cache if k[0] == abs_path]:
+            del _cache[stale_key]
+        _cache[key] = fingerprint
+        while len(_cache) > MAX_TEMPLATES:
+            _cache.popitem(last=False)
+    return fingerprint
+
+
+def cache_info():
+    """返回缓存命中统计"""
+    with _lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses'], 'size': len(_cache)}
+
+
+def clear_cache():
+    """清空模板缓存"""
+    with _lock:
+        _cache.clear()
+        _stats['hits'] = 0
+        _stats['misses'] = 0
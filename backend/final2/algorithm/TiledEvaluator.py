@@ -0,0 +1,179 @@
+"""
+超大图像的分条带评估
+
+按水平条带逐段计算Opencv1/Opencv3用到的特征（颜色差、拉普拉斯方差、灰度标准差、
+灰度直方图、Brenner和、SSIM对比度），并写入ImageContext.features，之后各算法直接取用。
+除已解码的原图外，同一时刻只保留一个条带的中间结果，总量不超过给定的字节预算。
+
+每个条带向上下各多取若干行（halo），使滤波结果与整图计算逐像素相同：
+拉普拉斯1行，Brenner为采样步长3行，SSIM为高斯模糊3行加盒式滤波3行共6行。
+所有和都以精确整数或与分组无关的方式累加，方差的第二遍求和与整图计算一样按numpy成对求和的分段方式
+进行（见MetricKernels.SquaredDeviationSum），结果与整图计算完全一致。
+"""
+
+import logging
+import math
+
+import cv2
+import numpy as np
+
+from .FastSSIM import _ssim_map, row_sums
+from .MetricKernels import SquaredDeviationSum
+
+logger = logging.getLogger(__name__)
+
+BRENNER_STEP = 3
+SSIM_WINDOW = 7
+SSIM_HALO = SSIM_WINDOW - 1  # 高斯模糊半径3 + 盒式滤波半径3
+HALO = max(1, BRENNER_STEP, SSIM_HALO)
+
+# 条带中每个像素的中间结果字节数：灰度uint8(1) + 拉普拉斯int16(2) + 颜色差uint8(3)
+# + 灰度/模糊float32(8) + SSIM工作区8个float32缓冲区(32)，取整留余量
+BYTES_PER_PIXEL = 48
+MIN_STRIP_ROWS = 3 * BRENNER_STEP
+
+
+def strip_rows(width, memory_budget):
+    """
+    根据字节预算计算每个条带的行数（不含halo，为BRENNER_STEP的整数倍）
+
+    预算不足以容纳最小条带时按最小条带处理并记录警告
+    """
+    rows = memory_budget // (width * BYTES_PER_PIXEL) - 2 * HALO
+    rows -= rows % BRENNER_STEP
+    if rows < MIN_STRIP_ROWS:
+        logger.warning(f"内存预算{memory_budget}字节不足以容纳宽{width}像素的最小条带，按{MIN_STRIP_ROWS}行处理")
+        rows = MIN_STRIP_ROWS
+    return rows
+
+
+def _gray_rows(image, start, stop):
+    """原图[start, stop)行的uint8灰度（与ImageContext.gray逐像素一致）"""
+    rows = image[start:stop]
+    if rows.ndim == 2:
+        return rows
+    return cv2.cvtColor(rows, cv2.COLOR_BGR2GRAY)
+
+
+def _bgr_rows(image, start, stop):
+    """原图[start, stop)行的三通道BGR（与ImageContext.bgr逐像素一致）"""
+    rows = image[start:stop]
+    if rows.ndim == 2:
+        return cv2.cvtColor(rows, cv2.COLOR_GRAY2BGR)
+    if rows.shape[2] == 4:
+        return cv2.cvtColor(rows, cv2.COLOR_BGRA2BGR)
+    return rows
+
+
+def _strips(h, rows):
+    for start in range(0, h, rows):
+        yield start, min(h, start + rows)
+
+
+def _global_stats(image, h, rows):
+    """
+    第一遍：灰度直方图、灰度和与拉普拉斯响应和
+
+    SSIM的全局均值与取值范围、方差第二遍求和所需的均值都要在第二遍之前得到
+    """
+    histogram = np.zeros(256, dtype=np.int64)
+    gray_total = 0
+    lap_total = 0
+    for start, stop in _strips(h, rows):
+        top = max(0, start - 1)
+        gray = _gray_rows(image, top, min(h, stop + 1))
+        own = gray[start - top:stop - top]
+        histogram += np.bincount(own.ravel(), minlength=256)
+        gray_total += int(own.sum(dtype=np.int64))
+        lap_total += int(cv2.Laplacian(gray, cv2.CV_16S)[start - top:stop - top].sum(dtype=np.int64))
+    return histogram, gray_total, lap_total
+
+
+def compute_features(context, memory_budget, target_color=(255, 255, 255)):
+    """
+    按条带计算整图特征并写入context.features
+
+    Args:
+        context: ImageContext（原图会被解码，但不会生成整图的灰度/float32等副本）
+        memory_budget: 条带中间结果的字节预算
+        target_color: Opencv1颜色匹配度的目标RGB颜色
+
+    Returns:
+        dict: context.features（非8位图像不分条带计算，原样返回，由各算法按原公式整图计算）
+    """
+    image = context.image
+    if image.dtype != np.uint8:
+        return context.features
+    h, w = image.shape[:2]
+    rows = strip_rows(w, memory_budget)
+    n = h * w
+
+    histogram, gray_total, lap_total = _global_stats(image, h, rows)
+    shift = gray_total / n  # 与np.mean(gray_float32, dtype=np.float64)一致（整数和精确）
+    nonzero = np.flatnonzero(histogram)
+    data_range = float(nonzero[-1] - nonzero[0])
+
+    r, g, b = target_color
+    color_total = 0
+    gray_deviations = SquaredDeviationSum(n, gray_total / n)
+    lap_deviations = SquaredDeviationSum(n, lap_total / n)
+    brenner_total = 0
+    ssim_rows = []
+    pad = (SSIM_WINDOW - 1) // 2
+    compute_ssim = data_range != 0 and h >= SSIM_WINDOW and w >= SSIM_WINDOW
+
+    for start, stop in _strips(h, rows):
+        # 颜色差：逐像素运算，不需要halo
+        diff = cv2.absdiff(_bgr_rows(image, start, stop), (b, g, r, 0))
+        color_total += int(diff.sum(dtype=np.int64))
+        del diff
+
+        top = max(0, start - HALO)
+        bottom = min(h, stop + HALO)
+        gray = _gray_rows(image, top, bottom)
+        gray_deviations.add(gray[start - top:stop - top])
+
+        # 拉普拉斯：上下各1行halo，图像真实边界处由cv2按整图相同的方式反射
+        lap_top = max(0, start - 1)
+        lap = cv2.Laplacian(gray[lap_top - top:min(h, stop + 1) - top], cv2.CV_16S)
+        lap = lap[start - lap_top:stop - lap_top]
+        lap_deviations.add(lap)
+        del lap
+
+        # Brenner：上像素行 i ∈ [start, stop) 且 i % 3 == 0、i < h - 3，下像素行为 i + 3
+        upper_rows = range(start, min(stop, h - BRENNER_STEP), BRENNER_STEP)
+        if len(upper_rows):
+            upper = gray[upper_rows.start - top:upper_rows.stop - top:BRENNER_STEP, ::BRENNER_STEP]
+            lower_start = upper_rows.start + BRENNER_STEP - top
+            lower = gray[lower_start:lower_start + len(upper_rows) * BRENNER_STEP:BRENNER_STEP, ::BRENNER_STEP]
+            brenner_diff = np.subtract(upper, lower, dtype=np.int32)
+            brenner_total += int(np.einsum('ij,ij->', brenner_diff, brenner_diff, dtype=np.int64))
+            del brenner_diff
+
+        # SSIM：先在[top, bottom)上模糊，再对[start-3, stop+3)做盒式滤波，只取[start, stop)
+        if compute_ssim:
+            gray_f = gray.astype(np.float32)
+            blurred = cv2.GaussianBlur(gray_f, (SSIM_WINDOW, SSIM_WINDOW), 0)
+            box_top = max(0, start - pad)
+            box_bottom = min(h, stop + pad)
+            ssim_map = _ssim_map(gray_f[box_top - top:box_bottom - top],
+                                 blurred[box_top - top:box_bottom - top],
+                                 shift, data_range, SSIM_WINDOW)
+            keep_start = max(start, pad)
+            keep_stop = min(stop, h - pad)
+            if keep_stop > keep_start:
+                ssim_rows.extend(row_sums(ssim_map[keep_start - box_top:keep_stop - box_top, pad:w - pad]))
+            del gray_f, blurred, ssim_map
+
+    channels = 3
+    features = context.features
+    features[('mean_color_diff', tuple(target_color))] = np.float64(color_total / (n * channels))
+    features['laplacian_var'] = lap_deviations.total() / n
+    features['gray_std'] = np.sqrt(gray_deviations.total() / n)
+    features['histogram'] = histogram
+    features['brenner'] = (float(brenner_total) / n) * 100
+    if data_range == 0:
+        features['ssim_contrast'] = 0.0
+    elif compute_ssim:
+        features['ssim_contrast'] = math.fsum(ssim_rows) / ((h - 2 * pad) * (w - 2 * pad)) * 100
+    return features
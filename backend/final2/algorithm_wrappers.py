@@ -12,15 +12,20 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 # 简单的绝对导入
-from algorithm.ImageHash import is_similar
+from algorithm.ImageHash import is_similar, is_similar_batch, phash_pixels
 from algorithm.Opencv1 import calculate_image_quality
-from algorithm.Opencv2 import evaluate_fashion_image
+from algorithm.Opencv2 import evaluate_fashion_image, match_tolerance
 from algorithm.Opencv3 import calculate_composite_score
 from algorithm.Openai import generate_prompt
 from algorithm.AnomalyData import generate_anomaly_images
+from algorithm.ImageContext import as_context
+from errors import error_result, is_error, run_isolated
+from results import results_array
 
 import logging
 
+logger = logging.getLogger(__name__)
+
 
 def imagehash_algorithm(template_image_path, comparison_image_path, threshold):
     """
@@ -28,7 +33,7 @@ def imagehash_algorithm(template_image_path, comparison_image_path, threshold):
     
     Args:
         template_image_path (str): 模板图像路径
-        comparison_image_path (str): 比较图像路径
+        comparison_image_path (str | ImageContext): 比较图像路径或已解码的图像上下文
         threshold (int): 相似度阈值
         
     Returns:
@@ -47,7 +52,7 @@ def opencv1_algorithm(image_path, target_color):
     OpenCV1图像质量算法包装器
     
     Args:
-        image_path (str): 图像路径
+        image_path (str | ImageContext): 图像路径或已解码的图像上下文
         target_color (tuple): 目标颜色RGB值
         
     Returns:
@@ -67,7 +72,7 @@ def opencv2_algorithm(template_image_path, comparison_image_path):
     
     Args:
         template_image_path (str): 模板图像路径
-        comparison_image_path (str): 比较图像路径
+        comparison_image_path (str | ImageContext): 比较图像路径或已解码的图像上下文
         
     Returns:
         dict: 包含纹理、完整性、质量等评估结果的字典
@@ -83,7 +88,7 @@ def opencv3_algorithm(image_path):
     OpenCV3清晰度算法包装器
     
     Args:
-        image_path (str): 图像路径
+        image_path (str | ImageContext): 图像路径或已解码的图像上下文
         
     Returns:
         dict: 包含清晰度评估结果的字典
@@ -146,6 +151,9 @@ def comprehensive_algorithm(template_image_path, comparison_image_path, config):
     
     results = {}
     
+    # 比较图像只解码一次，由四个算法共享
+    comparison_image_path = as_context(comparison_image_path)
+    
     # 运行ImageHash算法
     results['imagehash'] = imagehash_algorithm(
         template_image_path, 
@@ -168,4 +176,172 @@ def comprehensive_algorithm(template_image_path, comparison_image_path, config):
     # 运行OpenCV3算法
     results['opencv3'] = opencv3_algorithm(comparison_image_path)
     
-    return results 
\ No newline at end of file
+    return results
+
+
+class _BatchedAlgorithm:
+    """
+    可整批计算的算法：逐张图片只提取小的中间特征（collect），整批的计算在finish中向量化完成
+
+    Args:
+        collect: collect(context) -> 特征
+        finish: finish([特征, ...]) -> [结果字典, ...]
+    """
+
+    def __init__(self, collect, finish):
+        self.collect = collect
+        self.finish = finish
+
+
+def _imagehash_batched(template_image_path, threshold):
+    """ImageHash：逐张只缩放到128x128，DCT、中值和汉明距离整批计算，模板pHash只取一次"""
+    return _BatchedAlgorithm(phash_pixels, lambda pixels: is_similar_batch(template_image_path, pixels, threshold))
+
+
+def _run_batch(func_ids, images, algorithms):
+    """
+    批量运行算法并写入结构化数组
+
+    每张图片只解码一次，由本批次的各算法共享；由路径创建的上下文用完即释放。
+    真正整批计算的只有_BatchedAlgorithm类型的算法（目前只有ImageHash：逐张缩放，DCT、中值和
+    汉明距离整批计算）。Opencv1~3仍逐张调用，每张图片的开销与单张接口相同，批量接口对它们
+    只省去重复解码，并把结果按列写入结构化数组供向量化的通过判定和统计使用。
+    结果最后按列写入结构化数组。单个算法在单张图片上的失败经errors.run_isolated转换为错误结果，
+    该行的ok为False并记录error_type和error_message，不影响其他图片和算法；整批计算失败时
+    该算法的所有行都记为该错误。
+    """
+    image_names = []
+    results = {func_id: [] for func_id in func_ids}
+    # 整批计算的算法：[(行号, 特征), ...]
+    features = {func_id: [] for func_id in func_ids if isinstance(algorithms[func_id], _BatchedAlgorithm)}
+    for index, image in enumerate(images):
+        context = as_context(image)
+        image_name = os.path.basename(context.path)
+        image_names.append(image_name)
+        try:
+            for func_id in func_ids:
+                algorithm = algorithms[func_id]
+                if func_id not in features:
+                    results[func_id].append(run_isolated(func_id, image_name, lambda: algorithm(context)))
+                    continue
+                feature = run_isolated(func_id, image_name, lambda: algorithm.collect(context))
+                if is_error(feature):
+                    results[func_id].append(feature)
+                else:
+                    features[func_id].append((index, feature))
+                    results[func_id].append(None)  # 整批计算后填入
+        finally:
+            if context is not image:
+                context.release()
+
+    for func_id, collected in features.items():
+        if not collected:
+            continue
+        indices, values = zip(*collected)
+        try:
+            batch_results = algorithms[func_id].finish(list(values))
+        except Exception as e:
+            logger.warning(f"算法{func_id}的批量计算失败: {type(e).__name__}: {e}")
+            batch_results = [error_result(e)] * len(indices)
+        for index, result in zip(indices, batch_results):
+            results[func_id][index] = result
+    return {func_id: results_array(func_id, image_names, results[func_id]) for func_id in func_ids}
+
+
+def imagehash_algorithm_batch(template_image_path, images, threshold):
+    """
+    图像哈希算法的批量版本
+
+    Args:
+        template_image_path (str): 模板图像路径
+        images (list): 比较图像路径或ImageContext列表
+        threshold (int): 相似度阈值
+
+    Returns:
+        numpy.ndarray: results.IMAGEHASH_DTYPE结构化数组，每张图片一行
+    """
+    if not template_image_path:
+        raise ValueError("模板图像路径不能为空")
+    if threshold is None:
+        raise ValueError("阈值不能为None")
+
+    return _run_batch([1], images, {1: _imagehash_batched(template_image_path, threshold)})[1]
+
+
+def opencv1_algorithm_batch(images, target_color):
+    """
+    OpenCV1图像质量算法的批量版本（逐张计算，与逐张调用opencv1_algorithm相同，只是结果按列写入结构化数组）
+
+    Args:
+        images (list): 图像路径或ImageContext列表
+        target_color (tuple): 目标颜色RGB值
+
+    Returns:
+        numpy.ndarray: results.OPENCV1_DTYPE结构化数组，每张图片一行
+    """
+    if target_color is None:
+        raise ValueError("目标颜色不能为None")
+
+    return _run_batch([2], images, {
+        2: lambda context: calculate_image_quality(context, target_color)
+    })[2]
+
+
+def opencv2_algorithm_batch(template_image_path, images):
+    """
+    OpenCV2纹理质量算法的批量版本（逐张计算，与逐张调用opencv2_algorithm相同，只是结果按列写入结构化数组）
+
+    Args:
+        template_image_path (str): 模板图像路径
+        images (list): 比较图像路径或ImageContext列表
+
+    Returns:
+        numpy.ndarray: results.OPENCV2_DTYPE结构化数组，每张图片一行
+    """
+    if not template_image_path:
+        raise ValueError("模板图像路径不能为空")
+
+    return _run_batch([3], images, {
+        3: lambda context: evaluate_fashion_image(template_image_path, context)
+    })[3]
+
+
+def opencv3_algorithm_batch(images):
+    """
+    OpenCV3清晰度算法的批量版本（逐张计算，与逐张调用opencv3_algorithm相同，只是结果按列写入结构化数组）
+
+    Args:
+        images (list): 图像路径或ImageContext列表
+
+    Returns:
+        numpy.ndarray: results.OPENCV3_DTYPE结构化数组，每张图片一行
+    """
+    return _run_batch([4], images, {4: calculate_composite_score})[4]
+
+
+def comprehensive_algorithm_batch(template_image_path, images, config, input_choice='1234'):
+    """
+    综合算法的批量版本 - 每张图片解码一次，运行选中的所有算法
+
+    Args:
+        template_image_path (str): 模板图像路径
+        images (list): 比较图像路径或ImageContext列表
+        config (dict): 配置参数字典
+        input_choice (str): 要运行的算法编号
+
+    Returns:
+        dict: {算法编号: 结构化数组}，各数组的行顺序与images一致
+    """
+    if not template_image_path:
+        raise ValueError("模板图像路径不能为空")
+    if not config:
+        raise ValueError("配置参数不能为空")
+
+    algorithms = {
+        1: _imagehash_batched(template_image_path, config['distance_threshold']),
+        2: lambda context: calculate_image_quality(context, (255, 255, 255)),
+        3: lambda context: evaluate_fashion_image(template_image_path, context, match_tolerance(config)),
+        4: calculate_composite_score,
+    }
+    func_ids = [func_id for func_id in algorithms if str(func_id) in input_choice]
+    return _run_batch(func_ids, images, algorithms)
@@ -4,11 +4,15 @@
 提供与Django后端的集成接口
 """
 
+import asyncio
 import os
 import logging
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
 from .config import get_config, get_paths
-from .utils import evaluation
+from .utils import evaluation, find_template_image, iter_evaluate_images
+from .errors import collect_errors
+from .result_cache import open_result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +23,8 @@ def process_images(
     algorithm_choice: str = "12345",
     template_image_path: Optional[str] = None,
     custom_config: Optional[Dict[str, Any]] = None,
-    custom_paths: Optional[Dict[str, str]] = None
+    custom_paths: Optional[Dict[str, str]] = None,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
 ) -> Dict[str, Any]:
     """
     处理图像并生成报告
@@ -31,6 +36,8 @@ def process_images(
         template_image_path: 模板图像路径（可选）
         custom_config: 自定义配置参数（可选）
         custom_paths: 自定义路径配置（可选）
+        progress_callback: 进度回调（可选），参数为进度字典（阶段、已完成/总图片数、吞吐量、预计剩余秒数），
+            见progress.py
     
     Returns:
         Dict: 处理结果，包含报告路径等信息
@@ -68,7 +75,8 @@ def process_images(
             paths=paths,
             config=config,
             input_choice=algorithm_choice,
-            specific_image_paths=image_paths  # 传递具体的图像路径列表
+            specific_image_paths=image_paths,  # 传递具体的图像路径列表
+            progress_callback=progress_callback
         )
         
         logger.info("图像处理完成")
@@ -79,6 +87,86 @@ def process_images(
         raise
 
 
+
+def iter_process_images(
+    image_paths: Iterable[str],
+    algorithm_choice: str = "1234",
+    template_image_path: Optional[str] = None,
+    custom_config: Optional[Dict[str, Any]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    流式处理图像：每张图片评估完成后立即产出一条结果记录
+
+    与process_images不同，不生成报告、不累积结果，内存占用与图片数量无关；
+    调用方可以边迭代边持久化结果、更新进度或增量渲染报告。提前停止迭代时
+    （break或关闭生成器）会取消尚未开始的评估。
+
+    Args:
+        image_paths: 要处理的图像路径（可以是生成器）
+        algorithm_choice: 算法选择，如"1234"
+        template_image_path: 模板图像路径（可选，默认使用data/template中的模板）
+        custom_config: 自定义配置参数（可选）
+
+    Yields:
+        Dict: {'index': 序号, 'image': 图片文件名, 'image_path': 路径,
+               'results': [(func_id, result), ...], 'errors': [错误记录, ...]}
+    """
+    config = get_config()
+    if custom_config:
+        config.update(custom_config)
+    if template_image_path is None:
+        template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), get_paths()['template_image_dir'])
+        template_image_path = find_template_image(template_dir)
+    # 选择5表示全部四个算法
+    input_choice = '1234' if '5' in algorithm_choice else algorithm_choice
+
+    cache = open_result_cache(config)
+    try:
+        results = iter_evaluate_images(template_image_path, image_paths, input_choice, config, cache)
+        for index, (image_path, result_group) in enumerate(results):
+            image_name = os.path.basename(image_path)
+            yield {
+                'index': index,
+                'image': image_name,
+                'image_path': image_path,
+                'results': result_group,
+                'errors': collect_errors([(image_name, result_group)]),
+            }
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+async def aiter_process_images(
+    image_paths: Iterable[str],
+    algorithm_choice: str = "1234",
+    template_image_path: Optional[str] = None,
+    custom_config: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    iter_process_images的异步迭代器版本：评估在后台线程中进行，不阻塞事件循环
+
+    生成器的每一步（包括最后的关闭）都在同一个专用线程中执行：生成器不能被多个线程
+    交替驱动，而asyncio.to_thread每次可能分配到默认线程池中不同的线程。
+
+    用法: async for record in aiter_process_images(paths): ...
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='aiter_process_images')
+    iterator = iter_process_images(image_paths, algorithm_choice, template_image_path, custom_config)
+    done = object()
+    try:
+        while True:
+            record = await loop.run_in_executor(executor, next, iterator, done)
+            if record is done:
+                return
+            yield record
+    finally:
+        try:
+            await loop.run_in_executor(executor, iterator.close)
+        finally:
+            executor.shutdown(wait=False)
+
 if __name__ == "__main__":
     # 测试代码
     test_paths = [
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Brenner梯度微基准
+对比原双重循环实现与向量化实现的吞吐量（images/sec）
+
+用法: python benchmarks/bench_brenner.py [--height 4000] [--width 6000] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# 添加final2目录到Python路径，支持直接运行
+final2_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if final2_dir not in sys.path:
+    sys.path.insert(0, final2_dir)
+
+from algorithm.Opencv3 import brenner_gradient, brenner_gradient_batch
+
+
+def brenner_gradient_loop(gray_img):
+    """原双重循环实现（仅用于对比）"""
+    step = 3
+    h, w = gray_img.shape
+    brenner = 0.0
+    for i in range(0, h - step, step):
+        for j in range(0, w, step):
+            diff = gray_img[i, j] - gray_img[i + step, j]
+            brenner += diff ** 2
+    return (brenner / (h * w)) * 100
+
+
+def measure(func, images, repeat):
+    """返回最优一轮的images/sec"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(images)
+        best = min(best, time.perf_counter() - start)
+    return len(images) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Brenner梯度微基准')
+    parser.add_argument('--height', type=int, default=4000)
+    parser.add_argument('--width', type=int, default=6000)
+    parser.add_argument('--count', type=int, default=4, help='向量化实现每轮处理的图片数')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-loop', action='store_true', help='跳过原循环实现（大图时非常慢）')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, size=(args.count, args.height, args.width)).astype(np.float32)
+    print(f"图像尺寸: {args.width}x{args.height}, 数量: {args.count}")
+
+    if not args.skip_loop:
+        loop_rate = measure(lambda imgs: [brenner_gradient_loop(imgs[0])], images[:1], 1)
+        print(f"原循环实现:        {loop_rate:10.3f} images/sec")
+
+    vector_rate = measure(lambda imgs: [brenner_gradient(img) for img in imgs], images, args.repeat)
+    print(f"向量化（采样）:    {vector_rate:10.3f} images/sec")
+
+    full_rate = measure(lambda imgs: [brenner_gradient(img, full_resolution=True) for img in imgs],
+                        images, args.repeat)
+    print(f"向量化（全分辨率）:{full_rate:10.3f} images/sec")
+
+    batch_rate = measure(brenner_gradient_batch, images, args.repeat)
+    print(f"批量接口（采样）:  {batch_rate:10.3f} images/sec")
+
+    if not args.skip_loop:
+        print(f"加速比: {vector_rate / loop_rate:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+代理分辨率模式基准
+在参考图片集上分别以全分辨率和代理分辨率运行四个算法，报告加速比和评级不一致率；
+--fit 模式重新拟合ProxyResolution.CALIBRATION_EXPONENTS。
+
+用法: python benchmarks/bench_proxy.py [--images DIR ...] [--max-side 1600] [--max-megapixels 2.0] [--fit]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+# 添加final2目录到Python路径，支持直接运行
+final2_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if final2_dir not in sys.path:
+    sys.path.insert(0, final2_dir)
+
+from config import get_config
+from utils import evaluate_image
+from algorithm import ProxyResolution
+
+DEFAULT_IMAGE_DIRS = [
+    os.path.join(final2_dir, 'data'),
+    os.path.join(os.path.dirname(final2_dir), 'media', 'images'),
+]
+TEMPLATE_IMAGE = os.path.join(final2_dir, 'data', 'template', '2.jpg')
+
+
+def collect_images(dirs):
+    images = []
+    for directory in dirs:
+        for ext in ('jpg', 'jpeg', 'png'):
+            images.extend(glob.glob(os.path.join(directory, '**', f'*.{ext}'), recursive=True))
+    return sorted(set(images))
+
+
+def grade(value, high, low, higher_is_better=True):
+    """三档评级：2好 1中 0差（与报告中的阈值判断一致）"""
+    if higher_is_better:
+        return 2 if value >= high else 0 if value <= low else 1
+    return 0 if value >= high else 2 if value <= low else 1
+
+
+def grades(result_group, config):
+    """把一张图片的结果转换为{指标: 评级}"""
+    out = {}
+    for func_id, result in result_group:
+        if not isinstance(result, dict):
+            continue
+        if func_id == 1:
+            out['distance'] = int(result['distance'] > config['distance_threshold'])
+        elif func_id == 2:
+            out['color'] = grade(result['initial_color_diff'], config['color_score_threshold_high'],
+                                 config['color_score_threshold_low'], higher_is_better=False)
+            out['laplacian_var'] = grade(result['initial_laplacian_var'], config['sharpness_score_threshold_high'],
+                                         config['sharpness_score_threshold_low'])
+            out['noise'] = grade(result['initial_noise_level'], config['noise_score_threshold_high'],
+                                 config['noise_score_threshold_low'], higher_is_better=False)
+        elif func_id == 3:
+            out['texture'] = grade(result['texture'], config['texture_threshold_high'], config['texture_threshold_low'])
+            out['completeness'] = grade(result['completeness'], config['completeness_threshold_high'],
+                                        config['completeness_threshold_low'])
+            out['quality'] = grade(result['quality'], config['quality_score_threshold_high'],
+                                   config['quality_score_threshold_low'])
+            out['grade'] = result['quality_grade']
+        elif func_id == 4:
+            out['brenner'] = grade(result['raw_scores']['brenner'], config['brenner_threshold_high'],
+                                   config['brenner_threshold_low'])
+            out['ssim'] = grade(result['raw_scores']['ssim'], config['ssim_threshold_high'],
+                                config['ssim_threshold_low'])
+    return out
+
+
+def raw_values(result_group):
+    """提取需要校准的原始指标"""
+    values = {}
+    for func_id, result in result_group:
+        if func_id == 2 and isinstance(result, dict):
+            values['laplacian_var'] = result['initial_laplacian_var']
+        elif func_id == 4 and isinstance(result, dict):
+            values['brenner'] = result['raw_scores']['brenner']
+            values['ssim'] = 100 - result['raw_scores']['ssim']
+    return values
+
+
+def run(images, config):
+    results = []
+    start = time.perf_counter()
+    for image_path in images:
+        results.append(evaluate_image(TEMPLATE_IMAGE, image_path, '1234', config))
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='代理分辨率模式基准')
+    parser.add_argument('--images', nargs='*', default=DEFAULT_IMAGE_DIRS, help='参考图片目录')
+    parser.add_argument('--max-side', type=int, default=None)
+    parser.add_argument('--max-megapixels', type=float, default=None)
+    parser.add_argument('--fit', action='store_true', help='在参考集上拟合校准指数')
+    args = parser.parse_args()
+
+    images = collect_images(args.images)
+    if not images:
+        parser.error('参考集中没有图片')
+
+    full_config = get_config()
+    proxy_config = get_config()
+    proxy_config['proxy_resolution'] = True
+    if args.max_side is not None:
+        proxy_config['proxy_max_side'] = args.max_side
+    if args.max_megapixels is not None:
+        proxy_config['proxy_max_megapixels'] = args.max_megapixels
+    print(f"参考集: {len(images)} 张图片, 代理上限: 长边 {proxy_config['proxy_max_side']}px, "
+          f"{proxy_config['proxy_max_megapixels']} MP")
+
+    run(images[:1], full_config)  # 预热模板缓存
+    full_results, full_time = run(images, full_config)
+
+    if args.fit:
+        saved = dict(ProxyResolution.CALIBRATION_EXPONENTS)
+        ProxyResolution.CALIBRATION_EXPONENTS.clear()
+        proxy_results, _ = run(images, proxy_config)
+        ProxyResolution.CALIBRATION_EXPONENTS.update(saved)
+        samples = {'laplacian_var': [], 'brenner': [], 'ssim': []}
+        for image_path, full_group, proxy_group in zip(images, full_results, proxy_results):
+            from algorithm.ImageContext import ImageContext
+            scale = ProxyResolution.proxy_scale(ImageContext(image_path).image.shape,
+                                                proxy_config['proxy_max_side'],
+                                                proxy_config['proxy_max_megapixels'])
+            full_values, proxy_values = raw_values(full_group), raw_values(proxy_group)
+            for metric in samples:
+                if metric in full_values and metric in proxy_values:
+                    samples[metric].append((full_values[metric], proxy_values[metric], scale))
+        print("拟合的校准指数:")
+        for metric, metric_samples in samples.items():
+            used = sum(1 for _, _, scale in metric_samples if scale < 1.0)
+            print(f"  '{metric}': {ProxyResolution.fit_exponent(metric_samples):.2f},  # {used} 个样本")
+        return
+
+    proxy_results, proxy_time = run(images, proxy_config)
+    print(f"全分辨率: {full_time:.2f}s ({len(images) / full_time:.2f} images/sec)")
+    print(f"代理分辨率: {proxy_time:.2f}s ({len(images) / proxy_time:.2f} images/sec)")
+    print(f"加速比: {full_time / proxy_time:.2f}x")
+
+    disagreements = {}
+    totals = {}
+    for full_group, proxy_group in zip(full_results, proxy_results):
+        full_grades, proxy_grades = grades(full_group, full_config), grades(proxy_group, proxy_config)
+        for metric, value in full_grades.items():
+            totals[metric] = totals.get(metric, 0) + 1
+            if proxy_grades.get(metric) != value:
+                disagreements[metric] = disagreements.get(metric, 0) + 1
+    total = sum(totals.values())
+    print(f"评级不一致率: {sum(disagreements.values()) / total:.1%} ({sum(disagreements.values())}/{total})")
+    for metric in totals:
+        print(f"  {metric:14s} {disagreements.get(metric, 0) / totals[metric]:6.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+算法基准测试套件的pytest配置
+
+默认跳过全部基准测试，加--benchmark才会运行：
+
+    python -m pytest final2/benchmarks --benchmark                       # 运行并打印结果
+    python -m pytest final2/benchmarks --benchmark --benchmark-save      # 写入基线JSON
+    python -m pytest final2/benchmarks --benchmark --benchmark-compare   # 与基线比较，吞吐量下降超过阈值即失败
+
+测试图片由AnomalyData.generate_corpus在本地临时目录生成（固定种子），无需联网。
+"""
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+FINAL2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if FINAL2_DIR not in sys.path:
+    sys.path.insert(0, FINAL2_DIR)
+
+from algorithm.AnomalyData import generate_corpus
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+TEMPLATE_IMAGE = os.path.join(FINAL2_DIR, 'data', 'template', '2.jpg')
+
+# 尺寸档位 -> ((宽, 高), 语料库图片数)
+SIZES = {
+    'small': ((320, 240), 8),
+    'medium': ((1600, 1200), 4),
+    'huge': ((6000, 4000), 2),
+}
+
+_results = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark', '算法基准测试')
+    group.addoption('--benchmark', action='store_true', default=False, help='运行基准测试（默认跳过）')
+    group.addoption('--benchmark-sizes', default='small,medium,huge', help='运行的尺寸档位，逗号分隔')
+    group.addoption('--benchmark-rounds', type=int, default=5, help='每项基准的计时轮数')
+    group.addoption('--benchmark-baseline', default=DEFAULT_BASELINE, help='基线JSON文件路径')
+    group.addoption('--benchmark-save', action='store_true', default=False, help='把本次结果写入基线文件')
+    group.addoption('--benchmark-compare', action='store_true', default=False, help='与基线比较吞吐量')
+    group.addoption('--benchmark-max-regression', type=float, default=20.0,
+                    help='允许的吞吐量下降百分比，超过则失败')
+
+
+def _option(config, name, default=None):
+    # 从其他目录运行pytest时本文件的选项可能未注册，此时使用默认值
+    try:
+        return config.getoption(name)
+    except ValueError:
+        return default
+
+
+def pytest_collection_modifyitems(config, items):
+    if _option(config, '--benchmark', False):
+        return
+    skip = pytest.mark.skip(reason='基准测试需要--benchmark参数')
+    for item in items:
+        if 'benchmarks' in str(item.fspath):
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results:
+        return
+    config = session.config
+    if _option(config, '--benchmark-save', False):
+        path = _option(config, '--benchmark-baseline', DEFAULT_BASELINE)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(_results, f, ensure_ascii=False, indent=1, sort_keys=True)
+    reporter = config.pluginmanager.get_plugin('terminalreporter')
+    if reporter is not None:
+        reporter.write_sep('-', '基准测试结果')
+        reporter.write_line(f"{'名称':48s} {'ops/sec':>10s} {'p50(ms)':>10s} {'p95(ms)':>10s} {'峰值RSS(MB)':>12s}")
+        for name, result in sorted(_results.items()):
+            reporter.write_line(f"{name:48s} {result['ops_per_sec']:10.2f} {result['p50_ms']:10.1f} "
+                                f"{result['p95_ms']:10.1f} {result['peak_rss_mb']:12.1f}")
+
+
+def _current_rss():
+    """当前常驻内存（字节），读取/proc/self/statm"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class _RssSampler:
+    """在后台线程中采样常驻内存，得到一段代码运行期间的峰值；无/proc时退化为进程级ru_maxrss"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        try:
+            self.peak = _current_rss()
+        except OSError:
+            return self
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _current_rss())
+
+    def __exit__(self, *exc):
+        if self._thread is None:
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            return
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+@pytest.fixture(params=list(SIZES))
+def size(request):
+    """尺寸档位（受--benchmark-sizes限制）"""
+    selected = _option(request.config, '--benchmark-sizes', 'small,medium,huge').split(',')
+    if request.param not in selected:
+        pytest.skip(f"未选择尺寸档位{request.param}")
+    return request.param
+
+
+@pytest.fixture(scope='session')
+def corpus_root(tmp_path_factory):
+    return tmp_path_factory.mktemp('benchmark_corpus')
+
+
+@pytest.fixture
+def corpus(size, corpus_root):
+    """固定种子的本地语料库：该尺寸档位的JPEG图片路径列表（每个档位只生成一次）"""
+    (width, height), count = SIZES[size]
+    directory = corpus_root / size
+    if not directory.exists():
+        generate_corpus(str(directory), count, sizes=[((width, height), 1)], anomaly_mix={'normal': 1},
+                        jpeg_ratio=1.0, seed=2024, workers=1)
+    return sorted(str(path) for path in directory.glob('*.jpg'))
+
+
+@pytest.fixture
+def benchmark(request):
+    """
+    对可调用对象计时：先预热一次，再运行--benchmark-rounds轮
+
+    记录ops/sec、p50/p95延迟和运行期间的峰值RSS；--benchmark-compare时吞吐量
+    低于基线超过--benchmark-max-regression百分比即判定失败。
+
+    用法: benchmark(func, ops=每次调用处理的图片数)；同一测试中计时多项时用label区分，
+    结果名为"测试名:label"
+
+    """
+    config = request.config
+    rounds = _option(config, '--benchmark-rounds', 5)
+
+    def run(func, ops=1, label=None):
+        name = request.node.name if label is None else f"{request.node.name}:{label}"
+        func()  # 预热（模板缓存、线程工作区等）
+        latencies = []
+        with _RssSampler() as sampler:
+            for _ in range(rounds):
+                start = time.perf_counter()
+                func()
+                latencies.append(time.perf_counter() - start)
+        latencies = np.array(latencies)
+        result = {
+            'ops_per_sec': ops * len(latencies) / float(latencies.sum()),
+            'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+            'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+            'peak_rss_mb': sampler.peak / (1024 * 1024),
+            'rounds': len(latencies),
+        }
+        _results[name] = result
+
+        if _option(config, '--benchmark-compare', False):
+            path = _option(config, '--benchmark-baseline', DEFAULT_BASELINE)
+            if not os.path.exists(path):
+                pytest.fail(f"基线文件不存在: {path}（先用--benchmark-save生成）")
+            with open(path, encoding='utf-8') as f:
+                baseline = json.load(f).get(name)
+            if baseline is not None:
+                max_regression = _option(config, '--benchmark-max-regression', 20.0)
+                change = (result['ops_per_sec'] / baseline['ops_per_sec'] - 1) * 100
+                if change < -max_regression:
+                    pytest.fail(f"吞吐量下降{-change:.1f}%（基线{baseline['ops_per_sec']:.2f} ops/sec，"
+                                f"本次{result['ops_per_sec']:.2f} ops/sec，允许{max_regression:.0f}%）")
+        return result
+
+    return run
@@ -0,0 +1,117 @@
+"""
+算法与流程基准：四个算法、报告生成和完整evaluation()，按small/medium/huge三档尺寸
+"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from algorithm.ImageContext import ImageContext
+from algorithm.ImageHash import is_similar
+from algorithm.Opencv1 import calculate_image_quality
+from algorithm.Opencv2 import evaluate_fashion_image, match_template_pyramid
+from algorithm.Opencv3 import calculate_composite_score
+from config import get_config
+from utils import evaluate_image, evaluate_images, evaluation, generate_combined_report
+
+TEMPLATE_IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'template', '2.jpg')
+
+
+def _per_image(func, corpus):
+    """每张图片新建上下文（包含读取和解码），与evaluate_image中的单算法开销一致"""
+    def run():
+        for path in corpus:
+            context = ImageContext(path)
+            func(context)
+            context.release()
+    return run
+
+
+def test_imagehash(benchmark, corpus):
+    benchmark(_per_image(lambda context: is_similar(TEMPLATE_IMAGE, context), corpus), ops=len(corpus))
+
+
+def test_opencv1(benchmark, corpus):
+    benchmark(_per_image(calculate_image_quality, corpus), ops=len(corpus))
+
+
+def test_opencv2(benchmark, corpus):
+    benchmark(_per_image(lambda context: evaluate_fashion_image(TEMPLATE_IMAGE, context), corpus), ops=len(corpus))
+
+
+def test_opencv3(benchmark, corpus):
+    benchmark(_per_image(calculate_composite_score, corpus), ops=len(corpus))
+
+
+def test_report_generation(benchmark, corpus, tmp_path):
+    config = get_config()
+    all_results = [(path, evaluate_image(TEMPLATE_IMAGE, path, '1234', config)) for path in corpus]
+    paths = {'report_dir': str(tmp_path)}
+    benchmark(lambda: generate_combined_report(all_results, config, '1234', paths), ops=len(corpus))
+
+
+def test_evaluation(benchmark, corpus, tmp_path):
+    config = dict(get_config(), result_cache=False)  # 预热后各轮都应实际计算
+    paths = {
+        'template_image_dir': str(tmp_path / 'template'),
+        'comparison_image_dir': str(tmp_path),
+        'report_dir': str(tmp_path / 'report'),
+    }
+    (tmp_path / 'template').mkdir()
+    (tmp_path / 'template' / 'template.jpg').write_bytes(open(TEMPLATE_IMAGE, 'rb').read())
+    benchmark(lambda: evaluation(paths, config, '5', specific_image_paths=corpus), ops=len(corpus))
+
+
+@pytest.mark.parametrize('workers', sorted({1, 2, 4, os.cpu_count() or 1}))
+def test_parallel_evaluation(benchmark, corpus, workers):
+    """进程池评估的吞吐量随进程数的变化（进程数超过CPU核数时跳过）"""
+    if workers > (os.cpu_count() or 1):
+        pytest.skip(f"CPU核数不足{workers}")
+    config = dict(get_config(), result_cache=False, parallel_workers=workers, parallel_chunk_size=1)
+    images = corpus * max(1, workers)
+    benchmark(lambda: evaluate_images(TEMPLATE_IMAGE, images, '1234', config), ops=len(images))
+
+
+def test_large_report(benchmark, tmp_path):
+    """10万行详细表的报告写入（流式写入，耗时应与行数成线性）"""
+    config = get_config()
+    result = {'raw_scores': {'brenner': 2600.0, 'ssim': 85.0}, 'composite': 90.0,
+              'initial_brenner': 2600.0, 'initial_ssim': 85.0}
+    all_results = [(f"{index:06d}.jpg", [(4, result)]) for index in range(50000)]  # 每张图片2行
+    paths = {'report_dir': str(tmp_path)}
+    benchmark(lambda: generate_combined_report(all_results, config, '4', paths), ops=len(all_results))
+
+
+def test_large_export(benchmark, tmp_path):
+    """10万张图片的结果导出（按块向量化，内存与图片数无关）"""
+    from result_export import ResultExporter
+    config = get_config()
+    result_group = [(1, {'distance': 3, 'similar': True}),
+                    (4, {'raw_scores': {'brenner': 2600.0, 'ssim': 85.0}, 'composite': 90.0})]
+
+    def export():
+        exporter = ResultExporter(config, '14', str(tmp_path))
+        for index in range(100000):
+            exporter.add(f"{index:06d}.jpg", result_group)
+        return exporter.close()
+
+    benchmark(export, ops=100000)
+
+
+@pytest.mark.parametrize('matching', [True, False])
+def test_template_matching(benchmark, matching):
+    """3000x2400图像上800x600模板的匹配：金字塔（含容差校验）应快于全分辨率穷举"""
+    rng = np.random.default_rng(2)
+    image = cv2.normalize(cv2.GaussianBlur(rng.integers(0, 256, (2400, 3000)).astype(np.uint8), (0, 0), 4),
+                          None, 0, 255, cv2.NORM_MINMAX)
+    if matching:
+        template = image[700:1500, 1100:1700].copy()
+    else:
+        # 与图像无关的模板：得分低，金字塔也不应退回全图穷举
+        template = cv2.GaussianBlur(rng.integers(0, 256, (800, 600)).astype(np.uint8), (0, 0), 4)
+    tolerance = get_config()['template_match_tolerance']
+    pyramid = benchmark(lambda: match_template_pyramid(image, template, tolerance=tolerance), label='pyramid')
+    exhaustive = benchmark(lambda: cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED), label='exhaustive')
+    assert pyramid['ops_per_sec'] > exhaustive['ops_per_sec']
@@ -0,0 +1,60 @@
+"""
+级联评估
+按开销从低到高运行算法，廉价检查已能确定结论时跳过剩余的昂贵算法（模板匹配、SSIM、Brenner），
+被跳过的算法在结果中标记为"未评估"。策略参数见config.py中的cascade_*配置。
+"""
+
+SKIPPED_LABEL = '未评估'
+
+
+def skipped_result(reason):
+    """被级联跳过的算法结果"""
+    return {'skipped': True, 'reason': reason}
+
+
+def is_skipped(result):
+    return isinstance(result, dict) and result.get('skipped', False)
+
+
+def settled_reason(func_id, result, config):
+    """
+    根据已完成算法的结果判断结论是否已确定
+
+    Returns:
+        str | None: 已确定时返回原因，否则为None
+    """
+    if not isinstance(result, dict) or result.get('error'):
+        return None  # 出错的算法不能确定结论
+    if func_id == 1 and result['distance'] <= config['cascade_duplicate_distance']:
+        return '与模板重复'
+    if func_id == 2 and result['quality_score'] < config['cascade_reject_quality']:
+        return '质量初检不合格'
+    return None
+
+
+def execution_order(input_choice, config):
+    """选中算法的执行顺序（按cascade_order，未列出的算法排在最后）"""
+    order = config.get('cascade_order', '1234')
+    selected = [func_id for func_id in '1234' if func_id in input_choice]
+    return sorted(selected, key=lambda func_id: order.index(func_id) if func_id in order else len(order))
+
+
+def skipped_compute(all_results, config):
+    """
+    统计级联跳过的计算量（按cascade_costs中各算法的相对开销加权）
+
+    Returns:
+        dict: {'skipped_runs', 'total_runs', 'skipped_cost', 'total_cost', 'ratio'}
+    """
+    costs = config['cascade_costs']
+    stats = {'skipped_runs': 0, 'total_runs': 0, 'skipped_cost': 0.0, 'total_cost': 0.0}
+    for _, result_group in all_results:
+        for func_id, result in result_group:
+            cost = costs.get(str(func_id), 1.0)
+            stats['total_runs'] += 1
+            stats['total_cost'] += cost
+            if is_skipped(result):
+                stats['skipped_runs'] += 1
+                stats['skipped_cost'] += cost
+    stats['ratio'] = stats['skipped_cost'] / stats['total_cost'] if stats['total_cost'] else 0.0
+    return stats
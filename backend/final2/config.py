@@ -30,6 +30,39 @@ DEFAULT_CONFIG = {
 
     'ssim_threshold_high': 80,  # 结构相似性指数（SSIM）的阈值
     'ssim_threshold_low': 50,  # 结构相似性指数（SSIM）的阈值
+
+    'cascade_enabled': False,  # 级联评估：廉价检查已能确定结论时跳过剩余的昂贵算法，报告中标记为"未评估"
+    'cascade_order': '1243',  # 执行顺序（按开销从低到高：ImageHash、OpenCV1、OpenCV3、OpenCV2）
+    'cascade_skippable': '34',  # 可被跳过的算法（OpenCV2模板匹配、OpenCV3的Brenner和SSIM）
+    'cascade_duplicate_distance': 0,  # pHash汉明距离不超过该值视为与模板重复，结论确定
+    'cascade_reject_quality': 0.4,  # OpenCV1综合质量低于该值直接判定不合格，结论确定
+    'cascade_costs': {'1': 1.0, '2': 1.0, '3': 25.0, '4': 4.0},  # 各算法的相对开销，用于统计跳过的计算量
+
+    'proxy_resolution': False,  # 是否在缩小的代理分辨率上计算指标（拉普拉斯方差、Brenner、SSIM会校准回全分辨率）
+    'proxy_max_side': 1600,  # 代理分辨率的长边上限（像素）
+    'proxy_max_megapixels': 2.0,  # 代理分辨率的像素总数上限（百万像素）
+    'tiled_evaluation': True,  # 超大图像按水平条带计算Opencv1/Opencv3特征，结果与整图计算一致
+    'tiled_min_megapixels': 40,  # 像素总数超过该值（百万像素）时启用分条带评估
+    'tile_memory_budget': 256 * 1024 * 1024,  # 分条带评估时条带中间结果的字节预算
+    'reduced_decode': True,  # 代理分辨率模式下按算法需求缩小解码（JPEG直接以1/2、1/4、1/8解码，只需灰度时解码为灰度图）
+
+    'template_match_tolerance': 0.05,  # Opencv2金字塔模板匹配的容差，精化结果不可靠时退回穷举（0为与穷举一致，None为不校验），见Opencv2.match_template_pyramid
+
+    'result_cache': True,  # 按(图片内容MD5, 算法, 算法版本, 相关配置)持久化缓存算法结果，重复评估同一批图片时直接复用
+    'result_cache_path': None,  # 缓存数据库路径，为空时为数据目录下的result_cache.sqlite3，相对路径相对于数据目录（见result_cache.data_directory）
+    'result_cache_max_entries': 200000,  # 缓存条目上限，超过时淘汰最久未使用的条目
+
+    'parallel_workers': 1,  # 评估进程数：1为串行，0表示使用全部CPU核
+    'parallel_chunk_size': 16,  # 每次提交给工作进程的图片数
+    'parallel_cv2_threads': None,  # 每个工作进程的cv2线程数，None时按CPU核数/进程数自动分配
+    'parallel_start_method': 'spawn',  # 进程启动方式（Django进程中有其他线程，不宜fork）
+    'parallel_max_pending_chunks': None,  # 同时在途的最大块数，None时为进程数的2倍（流式评估的内存上限）
+
+    'progress_min_interval': 0.25,  # 进度回调的最小间隔（秒），每秒最多写入约4次任务状态
+    'combined_report_only': False,  # 选择多个算法时只生成综合报告，不生成各算法的单独报告
+    'report_page_size': 1000,  # 报告每页的图片数：图片数超过时报告分为索引页和若干分页，0表示不分页
+    'result_export': True,  # 评估时同时导出机器可读的结果文件（results_时间戳.jsonl，每张图片一行）
+    'result_export_parquet': True,  # 安装了pyarrow时同时导出Parquet文件
 }
 
 # 默认路径配置
@@ -0,0 +1,67 @@
+"""
+单张图片、单个算法的错误隔离
+
+算法出错（抛出异常或返回None）时记录为错误结果，不中断整批评估；
+报告中对应单元格显示"处理失败"，evaluation()据此返回partial状态和错误清单。
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+ERROR_LABEL = '处理失败'
+# 算法返回None时的错误信息（算法出错时应抛出异常，None结果仅作防御性处理）
+EMPTY_RESULT_MESSAGE = '算法未返回结果'
+
+
+def error_result(error):
+    """
+    算法出错时的结果
+
+    Args:
+        error: 异常对象或错误信息
+    """
+    if isinstance(error, BaseException):
+        return {'error': True, 'error_type': type(error).__name__, 'message': str(error)}
+    return {'error': True, 'error_type': None, 'message': str(error)}
+
+
+def is_error(result):
+    return isinstance(result, dict) and result.get('error', False) is True
+
+
+def run_isolated(func_id, image_path, compute):
+    """
+    运行一个算法，异常或None结果转换为错误结果
+
+    Returns:
+        dict: 算法结果或error_result
+    """
+    try:
+        result = compute()
+    except Exception as e:
+        logger.warning(f"算法{func_id}处理{image_path}失败: {type(e).__name__}: {e}")
+        return error_result(e)
+    if result is None:
+        logger.warning(f"算法{func_id}处理{image_path}失败: {EMPTY_RESULT_MESSAGE}")
+        return error_result(EMPTY_RESULT_MESSAGE)
+    return result
+
+
+def collect_errors(all_results):
+    """
+    汇总错误清单（机器可读）
+
+    Returns:
+        list: [{'image', 'algorithm', 'error_type', 'message'}, ...]
+    """
+    errors = []
+    for image_name, result_group in all_results:
+        for func_id, result in result_group:
+            if is_error(result):
+                errors.append({'image': image_name, 'algorithm': func_id,
+                               'error_type': result['error_type'], 'message': result['message']})
+            elif result is None:
+                errors.append({'image': image_name, 'algorithm': func_id,
+                               'error_type': None, 'message': EMPTY_RESULT_MESSAGE})
+    return errors
@@ -0,0 +1,146 @@
+"""
+多进程并行评估
+
+图片按块（parallel_chunk_size张）提交到进程池，结果按原顺序逐张产出，在途的块数有上限。
+每个工作进程启动时预加载模板指纹并设置cv2线程数，使"进程数 × cv2线程数"不超过CPU核数；
+算法错误已在evaluate_image中按图片隔离；评估流程本身出错时，异常连同出错图片和工作进程中的堆栈
+传回主进程重新抛出。
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# 工作进程内的状态（由_init_worker设置）
+_worker = {}
+
+
+class ImageEvaluationError(Exception):
+    """工作进程中评估单张图片失败（__cause__为原始异常）"""
+
+    def __init__(self, image_path, worker_traceback):
+        super().__init__(f"评估图片失败: {image_path}\n工作进程堆栈:\n{worker_traceback}")
+        self.image_path = image_path
+        self.worker_traceback = worker_traceback
+
+
+def worker_count(config):
+    """config中的parallel_workers：0或None表示使用全部CPU核"""
+    workers = config.get('parallel_workers', 1) if config else 1
+    return workers or os.cpu_count() or 1
+
+
+def cv2_threads_per_worker(workers, config=None):
+    """每个工作进程的cv2线程数，默认平分CPU核数（至少1）"""
+    threads = config.get('parallel_cv2_threads') if config else None
+    return threads or max(1, (os.cpu_count() or 1) // workers)
+
+
+def _init_worker(template_image_path, config, cv2_threads):
+    from algorithm.TemplateCache import get_template_fingerprint
+    from result_cache import open_result_cache
+
+    cv2.setNumThreads(cv2_threads)
+    # 预加载模板：pHash、灰度矩阵在每个进程内只计算一次
+    if template_image_path:
+        fingerprint = get_template_fingerprint(template_image_path)
+        fingerprint.phash
+        fingerprint.gray
+    _worker['template_image_path'] = template_image_path
+    _worker['config'] = config
+    _worker['cache'] = open_result_cache(config)
+
+
+def _evaluate_chunk(image_paths, input_choice):
+    """
+    在工作进程中评估一块图片
+
+    Returns:
+        list: 每张图片一项，成功为('ok', result_group)，失败为('error', (异常, 堆栈))
+    """
+    from utils import evaluate_image
+
+    outcomes = []
+    for image_path in image_paths:
+        try:
+            result_group = evaluate_image(_worker['template_image_path'], image_path, input_choice,
+                                          _worker['config'], _worker['cache'])
+            outcomes.append(('ok', result_group))
+        except Exception as e:
+            outcomes.append(('error', (e, traceback.format_exc())))
+    return outcomes
+
+
+def _chunks(image_paths, chunk_size):
+    iterator = iter(image_paths)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_parallel(template_image_path, image_paths, input_choice, config, workers=None):
+    """
+    用进程池评估多张图片，按输入顺序逐张产出结果
+
+    同时在途的块数不超过parallel_max_pending_chunks（默认为进程数的2倍），
+    内存占用与图片总数无关；image_paths可以是任意可迭代对象。
+
+    Args:
+        template_image_path: 模板图片路径
+        image_paths: 图片路径（可迭代）
+        input_choice: 算法选择
+        config: 配置（parallel_chunk_size、parallel_cv2_threads、parallel_start_method、
+            parallel_max_pending_chunks）
+        workers: 进程数，默认按config的parallel_workers
+
+    Yields:
+        tuple: (image_path, result_group)
+
+    Raises:
+        ImageEvaluationError: 评估流程本身出错时（中止整个评估）
+    """
+    workers = workers or worker_count(config)
+    chunk_size = max(1, config.get('parallel_chunk_size', 16))
+    max_pending = config.get('parallel_max_pending_chunks') or 2 * workers
+    cv2_threads = cv2_threads_per_worker(workers, config)
+    # 默认spawn：在多线程的Django进程中fork不安全
+    context = multiprocessing.get_context(config.get('parallel_start_method', 'spawn'))
+    logger.info(f"并行评估: {workers}个进程，每块{chunk_size}张，每进程cv2线程数{cv2_threads}")
+
+    chunks = _chunks(image_paths, chunk_size)
+    pending = deque()
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(template_image_path, config, cv2_threads))
+    try:
+        for chunk in itertools.islice(chunks, max_pending):
+            pending.append((chunk, executor.submit(_evaluate_chunk, chunk, input_choice)))
+        while pending:
+            # 按提交顺序取结果，保证与image_paths顺序一致；每取走一块补交一块
+            chunk, future = pending.popleft()
+            outcomes = future.result()
+            for next_chunk in itertools.islice(chunks, 1):
+                pending.append((next_chunk, executor.submit(_evaluate_chunk, next_chunk, input_choice)))
+            for image_path, (status, payload) in zip(chunk, outcomes):
+                if status == 'error':
+                    error, worker_traceback = payload
+                    raise ImageEvaluationError(image_path, worker_traceback) from error
+                yield image_path, payload
+    finally:
+        # 提前结束迭代（调用方break或出错）时取消尚未开始的块
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def evaluate_parallel(template_image_path, image_paths, input_choice, config, workers=None):
+    """用进程池评估多张图片，返回与image_paths一一对应的result_group列表（见iter_parallel）"""
+    return [result_group for _, result_group in
+            iter_parallel(template_image_path, image_paths, input_choice, config, workers)]
@@ -0,0 +1,87 @@
+"""
+评估进度回调
+
+evaluation()每评估完一张图片调用一次ProgressReporter.update()，由它按时间间隔节流后
+调用外部回调，回调参数为进度字典：
+    {'stage': 阶段, 'done': 已完成图片数, 'total': 图片总数,
+     'throughput': 每秒图片数, 'elapsed': 已用秒数, 'eta_seconds': 预计剩余秒数}
+阶段依次为evaluating（评估图片）、reporting（生成报告）、done（完成）。
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+STAGE_EVALUATING = 'evaluating'
+STAGE_REPORTING = 'reporting'
+STAGE_DONE = 'done'
+
+
+class ProgressReporter:
+    """
+    节流的进度回调
+
+    阶段切换和最后一张图片总会回调，其余更新两次回调之间至少间隔min_interval秒。
+    回调抛出的异常只记录日志，不中断评估。
+
+    Args:
+        callback: 回调函数callback(progress)，为None时不做任何事
+        total: 图片总数
+        min_interval: 两次回调的最小间隔（秒）
+        clock: 计时函数（测试用）
+    """
+
+    def __init__(self, callback, total, min_interval=0.25, clock=time.monotonic):
+        self.callback = callback
+        self.total = total
+        self.min_interval = min_interval
+        self.clock = clock
+        self.done = 0
+        self.stage = None
+        self._started = clock()
+        self._last_emit = None
+
+    def update(self, done, stage=STAGE_EVALUATING):
+        """记录已完成的图片数，按节流规则回调"""
+        if self.callback is None:
+            return
+        now = self.clock()
+        due = (stage != self.stage or done >= self.total or self._last_emit is None
+               or now - self._last_emit >= self.min_interval)
+        self.done = done
+        self.stage = stage
+        if due:
+            self._emit(now)
+
+    def set_stage(self, stage):
+        """切换阶段（总会回调）"""
+        self.update(self.done, stage)
+
+    def snapshot(self, now=None):
+        """当前进度字典"""
+        now = self.clock() if now is None else now
+        elapsed = max(now - self._started, 0.0)
+        throughput = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        if remaining <= 0 or self.stage == STAGE_DONE:
+            eta = 0.0
+        elif throughput > 0:
+            eta = remaining / throughput
+        else:
+            eta = None
+        return {
+            'stage': self.stage,
+            'done': self.done,
+            'total': self.total,
+            'throughput': round(throughput, 3),
+            'elapsed': round(elapsed, 1),
+            'eta_seconds': None if eta is None else round(eta, 1),
+        }
+
+    def _emit(self, now):
+        self._last_emit = now
+        try:
+            self.callback(self.snapshot(now))
+        except Exception as e:
+            logger.warning(f"进度回调出错（已忽略）: {e}")
@@ -7,6 +7,7 @@ import sys
 import os
 import glob
 import datetime
+import html
 from tqdm import tqdm
 
 # 添加当前目录到Python路径，支持直接运行
@@ -22,6 +23,10 @@ from algorithm_wrappers import (
     opencv3_algorithm,
     comprehensive_algorithm
 )
+from algorithm.ImageContext import ImageContext
+from results import summarize
+from errors import ERROR_LABEL, is_error, run_isolated
+from report_writer import iter_html_document, write_report
 
 
 def generate_html_report(paths, config, input_choice):
@@ -108,33 +113,38 @@ def process_images_with_algorithms(all_results, template_path, comparison_dir, c
     for i, (image_name, result_group) in tqdm(enumerate(all_results), 
                                             desc='Processing images', 
                                             total=len(all_results)):
+        # 每张图片只解码一次，由各算法共享
         image_path = os.path.join(comparison_dir, image_name)
+        image = ImageContext(image_path)
+        # 单个算法出错时记录为错误结果，不中断其他图片的处理
         
         if '1' in input_choice:
             # ImageHash算法
-            hamming_result = imagehash_algorithm(template_path, image_path, config['distance_threshold'])
+            hamming_result = run_isolated(1, image_path, lambda: imagehash_algorithm(
+                template_path, image, config['distance_threshold']))
             result_group.append((1, hamming_result))
         
         if '2' in input_choice:
             # OpenCV1算法
-            quality_result = opencv1_algorithm(image_path, (255, 255, 255))
+            quality_result = run_isolated(2, image_path, lambda: opencv1_algorithm(image, (255, 255, 255)))
             result_group.append((2, quality_result))
         
         if '3' in input_choice:
             # OpenCV2算法
-            fashion_result = opencv2_algorithm(template_path, image_path)
+            fashion_result = run_isolated(3, image_path, lambda: opencv2_algorithm(template_path, image))
             result_group.append((3, fashion_result))
         
         if '4' in input_choice:
             # OpenCV3算法
-            clarity_result = opencv3_algorithm(image_path)
+            clarity_result = run_isolated(4, image_path, lambda: opencv3_algorithm(image))
             result_group.append((4, clarity_result))
+        
+        image.release()
 
 
 def generate_combined_report(all_results, config, input_choice, paths):
     """生成综合HTML报告"""
     algorithm_report = generate_algorithm_summary_report(all_results, input_choice, config)
-    overall_report = generate_overall_quality_report(all_results, config, input_choice)
     timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
     
     # 确定报告名称
@@ -156,28 +166,11 @@ def generate_combined_report(all_results, config, input_choice, paths):
     
     filename = os.path.join(paths['report_dir'], f"{report_name}_{timestamp}.html")
     
-    html_content = f"""
-    <html>
-    <head>
-    <meta charset="UTF-8">
-    <style>
-        body {{ font-family: Arial, sans-serif; }}
-        table {{ width: 100%; border-collapse: collapse; margin: 10px 0; }}
-        th, td {{ border: 1px solid black; padding: 8px; text-align: center; }}
-        th {{ background-color: #f2f2f2; }}
-        td {{ text-align: center; }}
-    </style>
-    </head>
-    <body>
-    <h1 style="text-align: center;">图像质量检测报告</h1>
-    {algorithm_report}
-    {overall_report}
-    </body>
-    </html>
-    """
-    
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(html_content)
+    # 详细报告逐行生成并缓冲写入，不在内存中拼接整个文档
+    write_report(filename, iter_html_document('图像质量检测报告', [
+        algorithm_report,
+        iter_overall_quality_report(all_results, config, input_choice),
+    ]))
     
     print(f"HTML报告已生成: {filename}")
     return filename
@@ -185,54 +178,9 @@ def generate_combined_report(all_results, config, input_choice, paths):
 
 def generate_algorithm_summary_report(all_results, input_choice, config):
     """生成算法汇总报告"""
-    algorithm_summary = {
-        'ImageHash': {'total': 0, 'passed': 0, 'failed': 0},
-        'OpenCV1': {'total': 0, 'passed': 0, 'failed': 0},
-        'OpenCV2': {'total': 0, 'passed': 0, 'failed': 0},
-        'OpenCV3': {'total': 0, 'passed': 0, 'failed': 0}
-    }
-    
-    selected_algorithms = []
-    
-    # 统计各算法结果
-    for image_name, result_group in all_results:
-        for func_id, result in result_group:
-            if func_id == 1 and '1' in input_choice:
-                if 'ImageHash' not in selected_algorithms:
-                    selected_algorithms.append('ImageHash')
-                algorithm_summary['ImageHash']['total'] += 1
-                if result['distance'] <= config['distance_threshold']:
-                    algorithm_summary['ImageHash']['passed'] += 1
-                else:
-                    algorithm_summary['ImageHash']['failed'] += 1
-            
-            elif func_id == 2 and '2' in input_choice:
-                if 'OpenCV1' not in selected_algorithms:
-                    selected_algorithms.append('OpenCV1')
-                algorithm_summary['OpenCV1']['total'] += 1
-                if result['quality_score'] >= config['quality_score_threshold_high']:
-                    algorithm_summary['OpenCV1']['passed'] += 1
-                else:
-                    algorithm_summary['OpenCV1']['failed'] += 1
-            
-            elif func_id == 3 and '3' in input_choice:
-                if 'OpenCV2' not in selected_algorithms:
-                    selected_algorithms.append('OpenCV2')
-                algorithm_summary['OpenCV2']['total'] += 1
-                if result['overall'] >= config['quality_score_threshold_high']:
-                    algorithm_summary['OpenCV2']['passed'] += 1
-                else:
-                    algorithm_summary['OpenCV2']['failed'] += 1
-            
-            elif func_id == 4 and '4' in input_choice:
-                if 'OpenCV3' not in selected_algorithms:
-                    selected_algorithms.append('OpenCV3')
-                algorithm_summary['OpenCV3']['total'] += 1
-                if (result['raw_scores']['brenner'] > config['brenner_threshold_high'] and 
-                    result['raw_scores']['ssim'] > config['ssim_threshold_high']):
-                    algorithm_summary['OpenCV3']['passed'] += 1
-                else:
-                    algorithm_summary['OpenCV3']['failed'] += 1
+    # 按算法整列与阈值做向量化比较统计通过数
+    algorithm_summary = summarize(all_results, input_choice, config)
+    selected_algorithms = list(algorithm_summary)
     
     # 生成HTML表格
     total_images = sum(algorithm_summary[alg]['total'] for alg in selected_algorithms)
@@ -270,12 +218,15 @@ def generate_algorithm_summary_report(all_results, input_choice, config):
     </tr>
     """
     report_content += "</table>\n"
+    total_errors = sum(algorithm_summary[alg]['errors'] for alg in selected_algorithms)
+    if total_errors:
+        report_content += f"<p>其中处理失败: {total_errors}/{total_images}（{total_errors / total_images:.1%}）</p>\n"
     return report_content
 
 
-def generate_overall_quality_report(all_results, config, input_choice):
-    """生成详细质量报告"""
-    report_content = """
+def iter_overall_quality_report(all_results, config, input_choice):
+    """逐段产出详细质量报告（供流式写入）"""
+    yield """
     <h2 style="text-align: center;">详细质量检测报告</h2>
     <table>
     <tr>
@@ -288,12 +239,25 @@ def generate_overall_quality_report(all_results, config, input_choice):
     </tr>
     """
     
+    algorithm_names = {1: 'ImageHash算法', 2: 'OpenCV1算法', 3: 'OpenCV2算法', 4: 'OpenCV3算法'}
     for image_name, result_group in all_results:
         for func_id, result in result_group:
-            if func_id == 1 and '1' in input_choice:
+            if str(func_id) in input_choice and (result is None or is_error(result)):
+                # 处理失败的算法只显示一行错误信息
+                message = f"（{html.escape(result['message'])}）" if result else ''
+                yield f"""
+                <tr>
+                    <td>{image_name}</td>
+                    <td>{algorithm_names[func_id]}</td>
+                    <td colspan="3">{ERROR_LABEL}{message}</td>
+                    <td>否</td>
+                </tr>
+                """
+            
+            elif func_id == 1 and '1' in input_choice:
                 # ImageHash算法结果
                 passed = "是" if result['distance'] <= config['distance_threshold'] else "否"
-                report_content += f"""
+                yield f"""
                 <tr>
                     <td>{image_name}</td>
                     <td>ImageHash算法</td>
@@ -307,7 +271,7 @@ def generate_overall_quality_report(all_results, config, input_choice):
             elif func_id == 2 and '2' in input_choice:
                 # OpenCV1算法结果
                 passed = "是" if result['quality_score'] >= config['quality_score_threshold_high'] else "否"
-                report_content += f"""
+                yield f"""
                 <tr>
                     <td rowspan="4">{image_name}</td>
                     <td rowspan="4">OpenCV1算法</td>
@@ -336,7 +300,7 @@ def generate_overall_quality_report(all_results, config, input_choice):
             elif func_id == 3 and '3' in input_choice:
                 # OpenCV2算法结果
                 passed = "是" if result['overall'] >= config['quality_score_threshold_high'] else "否"
-                report_content += f"""
+                yield f"""
                 <tr>
                     <td rowspan="4">{image_name}</td>
                     <td rowspan="4">OpenCV2算法</td>
@@ -368,7 +332,7 @@ def generate_overall_quality_report(all_results, config, input_choice):
                 ssim_passed = result['raw_scores']['ssim'] > config['ssim_threshold_high']
                 passed = "是" if brenner_passed and ssim_passed else "否"
                 
-                report_content += f"""
+                yield f"""
                 <tr>
                     <td rowspan="2">{image_name}</td>
                     <td rowspan="2">OpenCV3算法</td>
@@ -384,8 +348,12 @@ def generate_overall_quality_report(all_results, config, input_choice):
                 </tr>
                 """
     
-    report_content += "</table>\n"
-    return report_content
+    yield "</table>\n"
+
+
+def generate_overall_quality_report(all_results, config, input_choice):
+    """生成详细质量报告"""
+    return ''.join(iter_overall_quality_report(all_results, config, input_choice))
 
 
 def quick_report_generation(template_dir, comparison_dir, report_dir, algorithms="1234"):
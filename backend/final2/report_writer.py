@@ -0,0 +1,223 @@
+"""
+HTML报告的流式写入
+
+报告按片段（表头、每张图片每个算法的若干行、表尾）逐个产出，经缓冲写入文件，
+不在内存中拼接整个文档：写入时间与行数成线性，额外内存与行数无关。
+
+图片数超过每页上限时报告分页：报告文件本身是索引页（汇总表和各分页的链接），
+详细表按固定图片数写入同名的"_pages"目录下的分页文件，评估过程中逐页生成。
+文件中的分页链接是相对路径（直接打开磁盘上的报告时可用），经接口提供报告时由link_pages()改为接口地址。
+"""
+
+import glob
+import html
+import io
+import os
+import re
+import shutil
+import tempfile
+
+# 写文件的缓冲区大小（字节）
+WRITE_BUFFER_SIZE = 1 << 20
+# 分页目录后缀和分页文件名格式
+PAGES_SUFFIX = '_pages'
+PAGE_FILENAME = 'page_{:04d}.html'
+# 指向分页文件的相对链接（索引页中为"<分页目录>/page_NNNN.html"，分页导航中为"page_NNNN.html"）
+_PAGE_LINK = re.compile(r"href='(?:[^'/]*/)?page_(\d+)\.html'")
+# 分页中返回索引页的相对链接
+_INDEX_LINK = re.compile(r"href='\.\./[^'/]*'")
+
+_DOCUMENT_HEAD = """
+    <html>
+    <head>
+    <meta charset="UTF-8">
+    <style>
+        body { font-family: Arial, sans-serif; }
+        table { width: 100%; border-collapse: collapse; margin: 10px 0; }
+        th, td { border: 1px solid black; padding: 8px; text-align: center; }
+        th { background-color: #f2f2f2; }
+        td { text-align: center; }
+    </style>
+    </head>
+    <body>
+    <h1 style="text-align: center;">"""
+
+DOCUMENT_TAIL = """
+    </body>
+    </html>
+    """
+# 报告各部分之间的分隔
+SECTION_SEPARATOR = "\n    "
+
+
+def document_head(title):
+    """报告开头（样式表和页面大标题），之后依次写入各部分"""
+    return _DOCUMENT_HEAD + title + "</h1>\n    "
+
+
+def iter_html_document(title, sections):
+    """
+    逐段产出完整的HTML报告
+
+    Args:
+        title: 页面大标题
+        sections: 报告各部分，每部分为字符串或字符串片段的可迭代对象（如生成器）
+    """
+    yield document_head(title)
+    for index, section in enumerate(sections):
+        if index:
+            yield SECTION_SEPARATOR
+        if isinstance(section, str):
+            yield section
+        else:
+            yield from section
+    yield DOCUMENT_TAIL
+
+
+def open_report(filename, buffer_size=WRITE_BUFFER_SIZE):
+    """以缓冲写入方式打开报告文件"""
+    return open(filename, "w", encoding="utf-8", buffering=buffer_size)
+
+
+def write_report(filename, chunks, buffer_size=WRITE_BUFFER_SIZE):
+    """把报告片段依次写入文件（缓冲写入）"""
+    with open_report(filename, buffer_size) as f:
+        f.writelines(chunks)
+
+
+def page_directory(report_path):
+    """分页报告的分页目录（与索引页同名，加_pages后缀）"""
+    return os.path.splitext(report_path)[0] + PAGES_SUFFIX
+
+
+def page_filename(number):
+    """第number页（从1开始）的文件名"""
+    return PAGE_FILENAME.format(number)
+
+
+def count_pages(report_path):
+    """报告的分页数，单文件报告为0"""
+    return len(glob.glob(os.path.join(page_directory(report_path), 'page_*.html')))
+
+
+def link_pages(document, page_url, index_url):
+    """
+    把报告中指向分页文件和索引页的相对链接改为给定地址
+
+    经接口提供报告时（索引页作为附件下载、按页查看）相对路径失效，
+    分页链接改为page_url?page=页码，返回汇总的链接改为index_url
+
+    Args:
+        document: 索引页或分页的HTML
+        page_url: 分页接口地址
+        index_url: 索引页接口地址
+    """
+    document = _PAGE_LINK.sub(lambda match: f"href='{html.escape(page_url)}?page={int(match.group(1))}'", document)
+    return _INDEX_LINK.sub(lambda match: f"href='{html.escape(index_url)}'", document)
+
+
+class SingleFileReport:
+    """
+    单文件报告：详细表的行先写入临时文件，close()时在汇总表之后按字节拼接（不重新编码）
+
+    Args:
+        filename: 报告路径
+        table_head: 详细表的表头HTML
+    """
+
+    def __init__(self, filename, table_head):
+        self.filename = filename
+        self.table_head = table_head
+        self._raw = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(filename)))
+        self._rows = io.TextIOWrapper(io.BufferedWriter(self._raw, WRITE_BUFFER_SIZE), encoding='utf-8')
+
+    def add_image(self, image_name, chunks):
+        """写入一张图片的行"""
+        self._rows.writelines(chunks)
+
+    def close(self, summary_html):
+        """写入报告文件（汇总表、详细表）"""
+        self._rows.flush()
+        self._raw.seek(0)
+        with open(self.filename, 'wb') as f:
+            f.write(''.join([document_head(''), summary_html, SECTION_SEPARATOR, self.table_head]).encode('utf-8'))
+            shutil.copyfileobj(self._raw, f, WRITE_BUFFER_SIZE)
+            f.write(''.join(["</table>\n", DOCUMENT_TAIL]).encode('utf-8'))
+        self.discard()
+
+    def discard(self):
+        self._rows.close()
+
+
+class PagedReport:
+    """
+    分页报告：详细表每page_size张图片一页，写满即关闭该页；close()时写入索引页
+
+    Args:
+        filename: 索引页路径
+        table_head: 详细表的表头HTML
+        page_size: 每页图片数
+        total_pages: 预计的总页数（用于分页导航）
+    """
+
+    def __init__(self, filename, table_head, page_size, total_pages):
+        self.filename = filename
+        self.table_head = table_head
+        self.page_size = page_size
+        self.total_pages = total_pages
+        self.directory = page_directory(filename)
+        os.makedirs(self.directory, exist_ok=True)
+        # 每页的[第一张图片, 最后一张图片]
+        self.pages = []
+        self._page = None
+        self._count = 0
+
+    def _page_nav(self, number):
+        index_name = os.path.basename(self.filename)
+        links = [f"<a href='../{html.escape(index_name)}'>返回汇总</a>"]
+        if number > 1:
+            links.append(f"<a href='{page_filename(number - 1)}'>上一页</a>")
+        if number < self.total_pages:
+            links.append(f"<a href='{page_filename(number + 1)}'>下一页</a>")
+        return f"<p style=\"text-align: center;\">第{number}/{self.total_pages}页 | {' | '.join(links)}</p>\n"
+
+    def _finish_page(self):
+        if self._page is None:
+            return
+        number = len(self.pages)
+        self._page.writelines(["</table>\n", self._page_nav(number), DOCUMENT_TAIL])
+        self._page.close()
+        self._page = None
+
+    def add_image(self, image_name, chunks):
+        """写入一张图片的行，当前页写满时开始新的一页"""
+        if self._page is None or self._count == self.page_size:
+            self._finish_page()
+            self.pages.append([image_name, image_name])
+            number = len(self.pages)
+            self.total_pages = max(self.total_pages, number)
+            self._page = open_report(os.path.join(self.directory, page_filename(number)))
+            self._page.writelines([document_head(''), self._page_nav(number), self.table_head])
+            self._count = 0
+        self._page.writelines(chunks)
+        self.pages[-1][1] = image_name
+        self._count += 1
+
+    def close(self, summary_html):
+        """结束最后一页并写入索引页（汇总表和分页链接）"""
+        self._finish_page()
+        directory = os.path.basename(self.directory)
+        with open_report(self.filename) as f:
+            f.writelines([document_head(''), summary_html, SECTION_SEPARATOR,
+                          f"<h2 style=\"text-align: center;\">详细检测结果（共{len(self.pages)}页，"
+                          f"每页{self.page_size}张图片）</h2>\n",
+                          "<table>\n<tr><th>页码</th><th>图片范围</th></tr>\n"])
+            for number, (first, last) in enumerate(self.pages, 1):
+                f.write(f"<tr><td><a href='{html.escape(directory)}/{page_filename(number)}'>第{number}页</a></td>"
+                        f"<td>{html.escape(first)} ~ {html.escape(last)}</td></tr>\n")
+            f.writelines(["</table>\n", DOCUMENT_TAIL])
+
+    def discard(self):
+        if self._page is not None:
+            self._page.close()
+            self._page = None
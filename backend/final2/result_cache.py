@@ -0,0 +1,206 @@
+"""
+算法结果的持久化缓存（内容寻址）
+
+缓存键为(图片内容MD5, 算法编号, 算法版本, 相关配置)。图片内容MD5与Django中
+Image.image_hash的计算方式相同，因此同一批图片重启任务或在新任务中再次评估时，
+配置不变的算法结果直接从缓存读取，无需重新解码和计算。
+依赖模板的算法（ImageHash、OpenCV2）的键中还包含模板内容的MD5。
+
+存储使用SQLite单文件，多个进程可同时读写；条目数超过上限时按最近使用时间淘汰。
+数据库默认位于数据目录（见data_directory()）中，不写入源码目录。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from algorithm import ImageHash, Opencv1, Opencv2, Opencv3
+
+logger = logging.getLogger(__name__)
+
+# 算法编号 -> 算法版本（各模块的VERSION，算法输出变化时递增，旧结果随之失效）
+ALGORITHM_VERSIONS = {'1': ImageHash.VERSION, '2': Opencv1.VERSION, '3': Opencv2.VERSION, '4': Opencv3.VERSION}
+# 结果依赖模板图片的算法
+TEMPLATE_ALGORITHMS = '13'
+# 影响算法输出的配置项（阈值只参与报告判定，不影响缓存的原始结果）
+PROXY_CONFIG_KEYS = ('proxy_max_side', 'proxy_max_megapixels', 'reduced_decode')
+# 只影响单个算法输出的配置项
+ALGORITHM_CONFIG_KEYS = {'3': ('template_match_tolerance',)}
+# 每写入多少条检查一次淘汰
+EVICT_INTERVAL = 256
+# 数据目录的环境变量，及未设置时的默认数据库文件名
+DATA_DIR_ENV = 'IMAGE_PROCESSING_DATA_DIR'
+CACHE_FILENAME = 'result_cache.sqlite3'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    image_hash TEXT NOT NULL,
+    func_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    config_key TEXT NOT NULL,
+    result TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (image_hash, func_id, version, config_key)
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def content_hash(data):
+    """文件内容的MD5（十六进制），data为字节或np.uint8数组"""
+    return hashlib.md5(data).hexdigest()
+
+
+def config_key(func_id, config, template_hash=None):
+    """
+    与算法输出相关的配置摘要
+
+    代理分辨率关闭时其余代理参数不影响结果，不计入键；只影响单个算法的配置项（如模板匹配容差）
+    只计入该算法的键；依赖模板的算法计入模板内容MD5
+    """
+    subset = {'proxy_resolution': bool(config.get('proxy_resolution'))}
+    if subset['proxy_resolution']:
+        subset.update({key: config.get(key) for key in PROXY_CONFIG_KEYS})
+    for key in ALGORITHM_CONFIG_KEYS.get(str(func_id), ()):
+        subset[key] = config.get(key)
+    if str(func_id) in TEMPLATE_ALGORITHMS:
+        subset['template'] = template_hash
+    return hashlib.md5(json.dumps(subset, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _to_builtin(value):
+    """json序列化时把numpy标量转换为Python内置类型"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化的结果类型: {type(value).__name__}")
+
+
+class ResultCache:
+    """
+    SQLite结果缓存
+
+    Args:
+        path: 数据库文件路径（目录不存在时自动创建）
+        max_entries: 最多保留的条目数，超过时淘汰最久未使用的条目
+    """
+
+    def __init__(self, path, max_entries=200000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def _key(self, image_hash, func_id, config, template_hash):
+        func_id = str(func_id)
+        return image_hash, int(func_id), ALGORITHM_VERSIONS[func_id], config_key(func_id, config, template_hash)
+
+    def get_many(self, image_hash, func_ids, config, template_hash=None):
+        """
+        查询一张图片多个算法的缓存结果
+
+        Returns:
+            dict: {算法编号(str): 结果字典}，只包含命中的算法
+        """
+        found = {}
+        now = time.time()
+        with self._lock:
+            for func_id in func_ids:
+                key = self._key(image_hash, func_id, config, template_hash)
+                row = self._conn.execute(
+                    'SELECT result FROM results WHERE image_hash=? AND func_id=? AND version=? AND config_key=?',
+                    key).fetchone()
+                if row is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                found[str(func_id)] = json.loads(row[0])
+                self._conn.execute(
+                    'UPDATE results SET last_used=? WHERE image_hash=? AND func_id=? AND version=? AND config_key=?',
+                    (now,) + key)
+            self._conn.commit()
+        return found
+
+    def put(self, image_hash, func_id, config, result, template_hash=None):
+        """写入一个算法结果（只缓存成功的结果字典）"""
+        if not isinstance(result, dict) or result.get('error'):
+            return
+        value = json.dumps(result, default=_to_builtin, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)',
+                               self._key(image_hash, func_id, config, template_hash) + (value, time.time()))
+            self._conn.commit()
+            self._puts += 1
+            if self._puts % EVICT_INTERVAL == 0:
+                self._evict()
+
+    def _evict(self):
+        excess = self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_used LIMIT ?)',
+                (excess,))
+            self._conn.commit()
+            logger.info(f"结果缓存淘汰了{excess}条最久未使用的记录")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM results')
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._conn.close()
+
+
+def data_directory():
+    """
+    运行时数据（结果缓存）的目录
+
+    依次为：环境变量IMAGE_PROCESSING_DATA_DIR、Django配置DATA_DIR（在Django中运行时）、
+    用户缓存目录（$XDG_CACHE_HOME或~/.cache）下的image_processing_system
+    """
+    directory = os.environ.get(DATA_DIR_ENV)
+    if directory:
+        return directory
+    try:
+        from django.conf import settings
+        if settings.configured and getattr(settings, 'DATA_DIR', None):
+            return settings.DATA_DIR
+    except ImportError:  # 独立运行final2时可以不安装Django
+        pass
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'image_processing_system')
+
+
+def open_result_cache(config):
+    """
+    按config打开结果缓存；未开启result_cache时返回None
+
+    未设置result_cache_path时使用数据目录下的result_cache.sqlite3，为相对路径时相对于数据目录
+    """
+    if not config or not config.get('result_cache'):
+        return None
+    path = os.path.join(data_directory(), config.get('result_cache_path') or CACHE_FILENAME)
+    try:
+        return ResultCache(path, config.get('result_cache_max_entries', 200000))
+    except sqlite3.Error as e:
+        logger.warning(f"无法打开结果缓存{path}，本次不使用缓存: {e}")
+        return None
@@ -0,0 +1,242 @@
+"""
+评估结果的列式导出（机器可读）
+
+每张图片一行，列为各算法的原始指标、加权值和判定结果：
+    image, {算法}.status, {算法}.message, {算法}.passed, {算法}.{指标/派生列}...
+算法前缀为imagehash、opencv1、opencv2、opencv3；status为ok/skipped/error，
+未成功运行的算法（出错或被级联跳过）指标列为空值，message为错误信息或跳过原因。
+
+评估过程中每EXPORT_CHUNK_SIZE张图片写出一块：JSONL总是写出，安装了pyarrow时
+同时写出Parquet（每块一个row group）；额外内存与图片数无关。
+"""
+
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+
+import numpy as np
+
+from results import ALGORITHMS, derived_columns, empty_results, fill_row, passed_mask
+from cascade import is_skipped
+from errors import is_error
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow是可选依赖，未安装时只导出JSONL
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# 每块的图片数（向量化计算派生列和写出的粒度）
+EXPORT_CHUNK_SIZE = 1024
+# 导出文件名前缀，文件名为results_时间戳.jsonl/.parquet
+EXPORT_PREFIX = 'results_'
+EXPORT_FORMATS = ('jsonl', 'parquet')
+# 算法编号 -> 列名前缀
+COLUMN_PREFIXES = {1: 'imagehash', 2: 'opencv1', 3: 'opencv2', 4: 'opencv3'}
+# 不导出的结构化数组字段（状态由status列表示，错误信息由message列表示）
+_HIDDEN_FIELDS = ('image', 'ok', 'skipped', 'error', 'error_type', 'error_message')
+
+
+def parquet_available():
+    return pq is not None
+
+
+def _result_message(result):
+    """出错或被跳过的算法结果的说明文字"""
+    if is_skipped(result):
+        return result.get('reason')
+    if is_error(result):
+        return result.get('message')
+    if not isinstance(result, dict):
+        return '算法未返回结果'
+    return None
+
+
+def _kind(array):
+    """列的类型：float、bool或str"""
+    if array.dtype.kind == 'f':
+        return 'float'
+    if array.dtype.kind == 'b':
+        return 'bool'
+    return 'str'
+
+
+def _algorithm_columns(func_id, results, config):
+    """
+    一块图片的某个算法的导出列（向量化）
+
+    Args:
+        results: 与图片一一对应的结果字典（未运行时为None）
+
+    Returns:
+        list: [(列名, 类型, 值列表), ...]，值列表中未成功运行的行为None
+    """
+    prefix = COLUMN_PREFIXES[func_id]
+    array = empty_results(func_id, len(results))
+    for index, result in enumerate(results):
+        fill_row(array, index, func_id, None, result)
+    ok = array['ok']
+    status = np.where(ok, 'ok', np.where(array['skipped'], 'skipped', 'error'))
+
+    columns = [
+        (f'{prefix}.status', 'str', status.tolist()),
+        (f'{prefix}.message', 'str', [_result_message(result) for result in results]),
+        (f'{prefix}.passed', 'bool', passed_mask(func_id, array, config).tolist()),
+    ]
+    values = {name: array[name] for name in array.dtype.names if name not in _HIDDEN_FIELDS}
+    values.update(derived_columns(func_id, array, config))
+    for name, column in values.items():
+        kind = _kind(column)
+        missing = ~ok
+        if kind == 'float':
+            missing = missing | ~np.isfinite(column)  # NaN不是合法的JSON
+        column = column.astype(object)
+        column[missing] = None
+        columns.append((f'{prefix}.{name}', kind, column.tolist()))
+    return columns
+
+
+def export_schema(input_choice, config):
+    """
+    导出文件的列：[(列名, 类型), ...]，类型为float、bool或str
+
+    Args:
+        input_choice: 算法选择，如"1234"
+    """
+    schema = [('image', 'str')]
+    for func_id in _func_ids(input_choice):
+        schema.extend((name, kind) for name, kind, _ in _algorithm_columns(func_id, [], config))
+    return schema
+
+
+def _func_ids(input_choice):
+    return [func_id for func_id in sorted(ALGORITHMS) if str(func_id) in input_choice]
+
+
+def _parquet_schema(schema):
+    types = {'float': pa.float64(), 'bool': pa.bool_(), 'str': pa.string()}
+    return pa.schema([(name, types[kind]) for name, kind in schema])
+
+
+class ResultExporter:
+    """
+    增量导出评估结果：每评估完一张图片调用add()，全部完成后调用close()
+
+    Args:
+        config: 配置（result_export_parquet为False时不写Parquet）
+        input_choice: 算法选择，如"1234"
+        report_dir: 输出目录
+        chunk_size: 每块的图片数
+        timestamp: 文件名中的时间戳（默认为当前时间），传入同一次评估的报告的时间戳，
+            由报告路径即可找到对应的导出文件（见find_exports）
+    """
+
+    def __init__(self, config, input_choice, report_dir, chunk_size=EXPORT_CHUNK_SIZE, timestamp=None):
+        self.config = config
+        self.func_ids = _func_ids(input_choice)
+        self.schema = export_schema(input_choice, config)
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self._images = []
+        self._results = []
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        os.makedirs(report_dir, exist_ok=True)
+        base = os.path.join(report_dir, f"{EXPORT_PREFIX}{timestamp}")
+        self.paths = {'jsonl': base + '.jsonl'}
+        self._jsonl = open(self.paths['jsonl'], 'w', encoding='utf-8')
+        self._parquet = None
+        if config.get('result_export_parquet', True) and parquet_available():
+            self.paths['parquet'] = base + '.parquet'
+            self._parquet = pq.ParquetWriter(self.paths['parquet'], _parquet_schema(self.schema))
+
+    def add(self, image_name, result_group):
+        """加入一张图片的结果，攒满一块时写出"""
+        by_func = dict(result_group)
+        self._images.append(image_name)
+        self._results.append([by_func.get(func_id) for func_id in self.func_ids])
+        if len(self._images) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._images:
+            return
+        columns = [('image', 'str', self._images)]
+        for position, func_id in enumerate(self.func_ids):
+            columns.extend(_algorithm_columns(func_id, [results[position] for results in self._results],
+                                              self.config))
+        names = [name for name, _, _ in columns]
+        self._jsonl.writelines(json.dumps(dict(zip(names, row)), ensure_ascii=False) + '\n'
+                               for row in zip(*(values for _, _, values in columns)))
+        if self._parquet is not None:
+            self._parquet.write_table(pa.table({name: values for name, _, values in columns},
+                                               schema=self._parquet.schema))
+        self.rows += len(self._images)
+        self._images = []
+        self._results = []
+
+    def close(self):
+        """
+        写出剩余的行并关闭文件
+
+        Returns:
+            dict: {格式: 路径}，如{'jsonl': ..., 'parquet': ...}
+        """
+        self._flush()
+        self._jsonl.close()
+        if self._parquet is not None:
+            self._parquet.close()
+        logger.info(f"已导出{self.rows}条评估结果: {', '.join(self.paths.values())}")
+        return dict(self.paths)
+
+    def discard(self):
+        """评估中途出错时关闭并删除不完整的导出文件"""
+        self._jsonl.close()
+        if self._parquet is not None:
+            self._parquet.close()
+        for path in self.paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def find_exports(report_path):
+    """
+    与报告同一次评估写出的导出文件（报告文件名以时间戳结尾，导出文件名带有相同的时间戳）
+
+    Returns:
+        dict: {格式: 路径}，只包含存在的文件，没有时为空字典
+    """
+    timestamp = os.path.splitext(os.path.basename(report_path))[0].rsplit('_', 1)[-1]
+    if not timestamp.isdigit():
+        return {}
+    base = os.path.join(os.path.dirname(report_path), f"{EXPORT_PREFIX}{timestamp}")
+    return {fmt: f"{base}.{fmt}" for fmt in EXPORT_FORMATS if os.path.exists(f"{base}.{fmt}")}
+
+
+def iter_csv(jsonl_path, batch_size=EXPORT_CHUNK_SIZE):
+    """
+    把JSONL导出文件逐批转换为CSV文本（首行为表头，空值为空字符串）
+
+    Yields:
+        str: 若干行CSV
+    """
+    with open(jsonl_path, encoding='utf-8') as f:
+        buffer = io.StringIO()
+        writer = None
+        for count, line in enumerate(f, 1):
+            row = json.loads(line)
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            if count % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
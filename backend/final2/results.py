@@ -0,0 +1,287 @@
+"""
+批量算法结果的结构化数组表示
+每种算法一行对应一张图片，通过/未通过统计直接对整列与config阈值做向量化比较
+"""
+
+import numpy as np
+
+from cascade import is_skipped
+from errors import EMPTY_RESULT_MESSAGE, is_error
+
+_META_FIELDS = ('image', 'ok', 'skipped', 'error', 'error_type', 'error_message')
+
+# 每行都带有图片名、ok、skipped和error标记；算法出错或被级联跳过的行ok为False，数值列为NaN，
+# 出错的行在error_type和error_message中记录异常类型和错误信息（与errors.collect_errors一致）
+IMAGEHASH_DTYPE = np.dtype([
+    ('image', object),
+    ('ok', bool),
+    ('skipped', bool),
+    ('error', bool),
+    ('error_type', object),
+    ('error_message', object),
+    ('distance', np.float64),
+    ('similar', bool),
+])
+
+OPENCV1_DTYPE = np.dtype([
+    ('image', object),
+    ('ok', bool),
+    ('skipped', bool),
+    ('error', bool),
+    ('error_type', object),
+    ('error_message', object),
+    ('color_score', np.float64),
+    ('sharpness_score', np.float64),
+    ('noise_score', np.float64),
+    ('quality_score', np.float64),
+    ('initial_color_diff', np.float64),
+    ('initial_laplacian_var', np.float64),
+    ('initial_noise_level', np.float64),
+])
+
+OPENCV2_DTYPE = np.dtype([
+    ('image', object),
+    ('ok', bool),
+    ('skipped', bool),
+    ('error', bool),
+    ('error_type', object),
+    ('error_message', object),
+    ('texture', np.float64),
+    ('completeness', np.float64),
+    ('completeness_scale', np.float64),
+    ('quality', np.float64),
+    ('overall', np.float64),
+    ('quality_grade', 'U1'),
+    ('needs_human_review', bool),
+])
+
+OPENCV3_DTYPE = np.dtype([
+    ('image', object),
+    ('ok', bool),
+    ('skipped', bool),
+    ('error', bool),
+    ('error_type', object),
+    ('error_message', object),
+    ('brenner', np.float64),
+    ('ssim', np.float64),
+    ('composite', np.float64),
+])
+
+# 算法编号 -> (汇总报告中的名称, dtype)
+ALGORITHMS = {
+    1: ('ImageHash', IMAGEHASH_DTYPE),
+    2: ('OpenCV1', OPENCV1_DTYPE),
+    3: ('OpenCV2', OPENCV2_DTYPE),
+    4: ('OpenCV3', OPENCV3_DTYPE),
+}
+
+
+def _flatten(func_id, result):
+    """把单个算法的结果字典展开为与dtype字段同名的键"""
+    if func_id == 4:
+        return {
+            'brenner': result['raw_scores']['brenner'],
+            'ssim': result['raw_scores']['ssim'],
+            'composite': result['composite'],
+        }
+    return result
+
+
+def _error_fields(result):
+    """出错的结果的(异常类型, 错误信息)；None结果视为算法未返回结果"""
+    if is_error(result):
+        return result['error_type'], result['message']
+    return None, EMPTY_RESULT_MESSAGE
+
+
+def empty_results(func_id, size):
+    """分配指定行数的结果数组，数值列初始化为NaN，错误信息列初始化为None"""
+    dtype = ALGORITHMS[func_id][1]
+    array = np.zeros(size, dtype=dtype)
+    for name in dtype.names:
+        if dtype[name].kind == 'f':
+            array[name] = np.nan
+    array['error_type'] = None
+    array['error_message'] = None
+    return array
+
+
+def fill_row(array, index, func_id, image, result):
+    """将一个算法结果字典写入结果数组的第index行；result为None或错误结果表示该图片处理失败"""
+    row = array[index]
+    row['image'] = image
+    if is_skipped(result):
+        row['skipped'] = True
+        return
+    if not isinstance(result, dict) or is_error(result):
+        row['error'] = True
+        row['error_type'], row['error_message'] = _error_fields(result)
+        return
+    values = _flatten(func_id, result)
+    for name in array.dtype.names:
+        if name not in _META_FIELDS and name in values:
+            row[name] = values[name]
+    row['ok'] = True
+
+
+def results_array(func_id, image_names, results):
+    """
+    一批结果字典按列写入结果数组（与逐行fill_row的结果相同）
+
+    Args:
+        image_names: 图片名列表
+        results: 与image_names一一对应的结果字典（None或错误结果表示处理失败）
+    """
+    array = empty_results(func_id, len(results))
+    array['image'] = image_names
+    array['skipped'] = [is_skipped(result) for result in results]
+    array['error'] = [not is_skipped(result) and (not isinstance(result, dict) or is_error(result))
+                      for result in results]
+    array['ok'] = ~(array['skipped'] | array['error'])
+    for index in np.flatnonzero(array['error']):
+        array['error_type'][index], array['error_message'][index] = _error_fields(results[index])
+    ok_rows = np.flatnonzero(array['ok'])
+    values = [_flatten(func_id, results[index]) for index in ok_rows]
+    for name in array.dtype.names:
+        if name in _META_FIELDS:
+            continue
+        present = [(index, row[name]) for index, row in zip(ok_rows, values) if name in row]
+        if present:
+            indices, column = zip(*present)
+            array[name][list(indices)] = column
+    return array
+
+
+def from_result_groups(all_results, func_id):
+    """
+    把evaluation()返回的[(图片名, [(func_id, result), ...]), ...]转换为指定算法的结果数组
+
+    未运行该算法的图片不出现在结果中
+    """
+    rows = [(image_name, result)
+            for image_name, result_group in all_results
+            for group_func_id, result in result_group
+            if group_func_id == func_id]
+    return results_array(func_id, [image_name for image_name, _ in rows], [result for _, result in rows])
+
+
+def as_columns(array):
+    """结构化数组转换为{字段名: 一维数组}的列式字典"""
+    return {name: array[name] for name in array.dtype.names}
+
+
+def passed_mask(func_id, array, config):
+    """
+    各算法的通过判定（向量化），出错的行一律视为未通过
+
+    - ImageHash: 汉明距离不超过distance_threshold
+    - OpenCV1: 综合质量不低于quality_score_threshold_high
+    - OpenCV2: 综合评分不低于quality_score_threshold_high
+    - OpenCV3: Brenner与SSIM都高于各自的高阈值
+    """
+    if func_id == 1:
+        mask = array['distance'] <= config['distance_threshold']
+    elif func_id == 2:
+        mask = array['quality_score'] >= config['quality_score_threshold_high']
+    elif func_id == 3:
+        mask = array['overall'] >= config['quality_score_threshold_high']
+    elif func_id == 4:
+        mask = ((array['brenner'] > config['brenner_threshold_high']) &
+                (array['ssim'] > config['ssim_threshold_high']))
+    else:
+        raise ValueError(f"未知的算法编号: {func_id}")
+    return mask & array['ok']
+
+
+def _grade(conditions, labels, default):
+    """按条件依次选择等级文字（与np.select相同，结果为object数组）"""
+    return np.select(conditions, labels, default).astype(object)
+
+
+def derived_columns(func_id, array, config):
+    """
+    由结果数组计算导出用的派生列（向量化）：各评估维度的评估结果、是否需要人工干预，
+    以及OpenCV3的Brenner/SSIM加权值；判定与综合质量检测报告中的一致
+
+    Returns:
+        dict: {列名: 一维数组}，评估结果列为文字，*_review列为布尔值
+    """
+    c = config
+    if func_id == 1:
+        distance = array['distance']
+        return {
+            'distance_grade': _grade([distance > c['distance_threshold']], ['图像差异显著'], '图像高度相似或重复'),
+            'distance_review': ~(distance > c['distance_threshold']),
+        }
+    if func_id == 2:
+        color = array['initial_color_diff']
+        sharpness = array['initial_laplacian_var']
+        noise = array['initial_noise_level']
+        return {
+            'color_grade': _grade([color >= c['color_score_threshold_high'], color <= c['color_score_threshold_low']],
+                                  ['差', '高'], '一般'),
+            'color_review': ~(color >= c['color_score_threshold_high']),
+            'sharpness_grade': _grade([sharpness >= c['sharpness_score_threshold_high'],
+                                       sharpness <= c['sharpness_score_threshold_low']], ['清晰', '模糊'], '一般'),
+            'sharpness_review': ~(sharpness >= c['sharpness_score_threshold_high']),
+            'noise_grade': _grade([noise < c['noise_score_threshold_low'], noise > c['noise_score_threshold_high']],
+                                  ['优秀', '差'], '中'),
+            'noise_review': ~(noise >= c['noise_score_threshold_high']),
+        }
+    if func_id == 3:
+        texture = array['texture']
+        completeness = array['completeness']
+        quality = array['quality']
+        return {
+            'texture_grade': _grade([texture >= c['texture_threshold_high'], texture <= c['texture_threshold_low']],
+                                    ['优秀', '中'], '差'),
+            'texture_review': ~(texture >= c['texture_threshold_high']),
+            'completeness_grade': _grade([completeness >= c['completeness_threshold_high'],
+                                          completeness <= c['completeness_threshold_low']], ['完整', '一般'], '不完整'),
+            'completeness_review': ~(completeness >= c['completeness_threshold_high']),
+            'quality_grade_text': _grade([quality >= c['quality_score_threshold_high'],
+                                          quality <= c['quality_score_threshold_low']], ['优秀', '可用'], '差'),
+            'quality_review': ~(quality >= c['quality_score_threshold_high']),
+        }
+    if func_id == 4:
+        brenner = array['brenner']
+        ssim = array['ssim']
+        return {
+            # Brenner/SSIM按分段线性插值映射为0~1的加权值
+            'brenner_weighted': np.select([brenner < 1000, brenner <= 2500],
+                                          [brenner / 2500 * 0.4, 0.4 + (brenner - 1000) / 1500 * 0.2],
+                                          0.6 + (brenner - 2500) / 500 * 0.4),
+            'ssim_weighted': np.select([ssim < 50, ssim <= 80],
+                                       [ssim / 80 * 0.4, 0.4 + (ssim - 50) / 30 * 0.2],
+                                       0.6 + (ssim - 80) / 20 * 0.4),
+            'brenner_grade': _grade([brenner > c['brenner_threshold_high'], brenner >= c['brenner_threshold_low']],
+                                    ['优秀', '一般'], '差'),
+            'brenner_review': ~(brenner > c['brenner_threshold_high']),
+            'ssim_grade': _grade([ssim > c['ssim_threshold_high'], ssim < c['ssim_threshold_low']], ['优秀', '差'], '一般'),
+            'ssim_review': ~(ssim > c['ssim_threshold_high']),
+        }
+    raise ValueError(f"未知的算法编号: {func_id}")
+
+
+def summarize(all_results, input_choice, config):
+    """
+    统计选中算法的检测总数、通过数和未通过数
+
+    被级联跳过的图片计入skipped，既不算通过也不算未通过；处理失败的图片计入failed，并单独统计errors
+
+    Returns:
+        dict: {算法名称: {'total': int, 'passed': int, 'failed': int, 'skipped': int, 'errors': int}}，
+        按算法编号排序
+    """
+    summary = {}
+    for func_id, (name, _) in ALGORITHMS.items():
+        if str(func_id) not in input_choice:
+            continue
+        array = from_result_groups(all_results, func_id)
+        if len(array) == 0:
+            continue
+        passed = int(np.count_nonzero(passed_mask(func_id, array, config)))
+        skipped = int(np.count_nonzero(array['skipped']))
+        summary[name] = {'total': len(array), 'passed': passed, 'failed': len(array) - passed - skipped,
+                         'skipped': skipped, 'errors': int(np.count_nonzero(array['error']))}
+    return summary
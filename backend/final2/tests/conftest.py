@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# 与utils.py一致：把final2目录加入Python路径，测试中使用同样的绝对导入
+FINAL2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if FINAL2_DIR not in sys.path:
+    sys.path.insert(0, FINAL2_DIR)
+
+DATA_DIR = os.path.join(FINAL2_DIR, 'data')
+TEMPLATE_IMAGE = os.path.join(DATA_DIR, 'template', '2.jpg')
+COMPARISON_IMAGES = [
+    os.path.join(DATA_DIR, 'comparision', '1.jpg'),
+    os.path.join(DATA_DIR, 'comparision', '20250408skt0000069.png'),
+]
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path_factory, monkeypatch):
+    """结果缓存等运行时数据写入临时目录，不写入源码目录或用户缓存目录"""
+    directory = tmp_path_factory.getbasetemp() / 'data'
+    monkeypatch.setenv('IMAGE_PROCESSING_DATA_DIR', str(directory))
+    return directory
@@ -0,0 +1,46 @@
+import json
+import os
+
+from algorithm import AnomalyData
+from algorithm.AnomalyData import MANIFEST_NAME, generate_anomaly_images, generate_corpus
+
+SMALL_SIZES = [((64, 48), 1), ((32, 32), 1)]
+SMALL_MIX = {'normal': 3, 'corrupted_header': 1, 'pixelated': 1, 'empty_canvas': 1}
+
+
+def _read_all(directory, entries):
+    contents = {}
+    for entry in entries:
+        with open(os.path.join(directory, entry['file']), 'rb') as f:
+            contents[entry['file']] = f.read()
+    return contents
+
+
+def test_corpus_is_deterministic_across_worker_counts(tmp_path, monkeypatch):
+    monkeypatch.setattr(AnomalyData, 'CHUNK_SIZE', 4)
+    serial = generate_corpus(str(tmp_path / 'serial'), 10, SMALL_SIZES, SMALL_MIX, seed=7, workers=1)
+    parallel = generate_corpus(str(tmp_path / 'parallel'), 10, SMALL_SIZES, SMALL_MIX, seed=7, workers=2)
+    assert serial == parallel
+    assert _read_all(tmp_path / 'serial', serial) == _read_all(tmp_path / 'parallel', parallel)
+
+
+def test_manifest_labels(tmp_path):
+    entries = generate_corpus(str(tmp_path), 12, SMALL_SIZES, SMALL_MIX, jpeg_ratio=0.5, seed=1, workers=1)
+    with open(tmp_path / MANIFEST_NAME, encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['images'] == entries
+    assert len(entries) == 12
+    for entry in entries:
+        assert entry['anomaly'] in SMALL_MIX
+        assert entry['file'].endswith('.' + entry['format'])
+        assert (tmp_path / entry['file']).exists()
+        if entry['anomaly'] == 'normal':
+            assert (entry['width'], entry['height']) in [size for size, _ in SMALL_SIZES]
+
+
+def test_generate_anomaly_images_keeps_legacy_output(tmp_path, monkeypatch):
+    monkeypatch.setitem(AnomalyData.TRANSFORMS, 'oversized', AnomalyData.normal)  # 测试中跳过10000x10000图片
+    generate_anomaly_images(str(tmp_path))
+    files = os.listdir(tmp_path)
+    assert len(files) == 50
+    assert all(name.endswith('.png') for name in files)
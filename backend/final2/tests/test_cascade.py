@@ -0,0 +1,59 @@
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from config import get_config
+from cascade import execution_order, is_skipped, settled_reason, skipped_compute, skipped_result
+from results import summarize
+from utils import evaluate_image, generate_algorithm_summary_report
+
+
+def _cascade_config(**overrides):
+    config = get_config()
+    config.update(cascade_enabled=True, **overrides)
+    return config
+
+
+def test_execution_order_follows_config():
+    config = _cascade_config()
+    assert execution_order('1234', config) == ['1', '2', '4', '3']
+    assert execution_order('34', config) == ['4', '3']
+    assert execution_order('31', dict(config, cascade_order='21')) == ['1', '3']
+
+
+def test_settled_reason():
+    config = _cascade_config()
+    assert settled_reason(1, {'distance': 0, 'similar': True}, config) == '与模板重复'
+    assert settled_reason(1, {'distance': 5, 'similar': True}, config) is None
+    assert settled_reason(2, {'quality_score': 0.1}, config) == '质量初检不合格'
+    assert settled_reason(2, None, config) is None
+
+
+def test_duplicate_of_template_skips_expensive_algorithms():
+    config = _cascade_config()
+    result_group = evaluate_image(TEMPLATE_IMAGE, TEMPLATE_IMAGE, '1234', config)
+    assert [func_id for func_id, _ in result_group] == [1, 2, 3, 4]
+    results = dict(result_group)
+    assert results[1]['distance'] == 0
+    assert not is_skipped(results[2])
+    assert is_skipped(results[3]) and is_skipped(results[4])
+
+
+def test_cascade_results_match_full_evaluation_when_not_settled():
+    image_path = COMPARISON_IMAGES[0]
+    config = _cascade_config(cascade_duplicate_distance=-1, cascade_reject_quality=0.0)
+    assert evaluate_image(TEMPLATE_IMAGE, image_path, '1234', config) == \
+        evaluate_image(TEMPLATE_IMAGE, image_path, '1234', get_config())
+
+
+def test_skipped_counts_in_summary():
+    config = _cascade_config()
+    all_results = [
+        ('a.jpg', [(1, {'distance': 0, 'similar': True}), (4, skipped_result('与模板重复'))]),
+        ('b.jpg', [(1, {'distance': 12, 'similar': False}),
+                   (4, {'raw_scores': {'brenner': 3000.0, 'ssim': 40.0}, 'composite': 60.0})]),
+    ]
+    summary = summarize(all_results, '14', config)
+    assert summary['OpenCV3'] == {'total': 2, 'passed': 0, 'failed': 1, 'skipped': 1, 'errors': 0}
+    stats = skipped_compute(all_results, config)
+    assert stats['skipped_runs'] == 1 and stats['total_runs'] == 4
+    assert stats['ratio'] == 4.0 / 10.0
+    report = generate_algorithm_summary_report({}, '14', config, all_results)
+    assert '未评估总数' in report and '40.0%' in report
@@ -0,0 +1,54 @@
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from config import get_config
+from errors import collect_errors, error_result, is_error, run_isolated
+from results import summarize
+from utils import evaluate_image, evaluation, generate_algorithm_summary_report, generate_overall_quality_report
+
+
+def _raise():
+    raise ValueError('坏文件')
+
+
+def test_run_isolated():
+    assert run_isolated(1, 'a.jpg', lambda: {'distance': 1}) == {'distance': 1}
+    failed = run_isolated(1, 'a.jpg', _raise)
+    assert is_error(failed) and failed['error_type'] == 'ValueError' and failed['message'] == '坏文件'
+    assert is_error(run_isolated(2, 'a.jpg', lambda: None))
+
+
+def test_broken_image_isolated_per_algorithm(tmp_path):
+    broken = tmp_path / 'broken.jpg'
+    broken.write_bytes(b'not an image')
+    config = dict(get_config(), result_cache=False)
+    result_group = evaluate_image(TEMPLATE_IMAGE, str(broken), '1234', config)
+    assert [func_id for func_id, _ in result_group] == [1, 2, 3, 4]
+    assert all(is_error(result) for func_id, result in result_group if func_id != 3)
+    # Opencv1/Opencv3的异常不再被算法内部吞掉，错误记录带有异常类型和信息
+    failures = {func_id: result for func_id, result in result_group if is_error(result)}
+    assert failures[2]['error_type'] and failures[4]['error_type']
+    assert failures[2]['message'] != '算法未返回结果' and failures[4]['message'] != '算法未返回结果'
+
+    all_results = [('ok.jpg', evaluate_image(TEMPLATE_IMAGE, COMPARISON_IMAGES[0], '1234', config)),
+                   ('broken.jpg', result_group)]
+    errors = collect_errors(all_results)
+    assert {error['image'] for error in errors} == {'broken.jpg'}
+    assert summarize(all_results, '2', config)['OpenCV1']['errors'] == 1
+    # 报告中失败的单元格单独一行，不会因取值出错而中断
+    assert '处理失败' in generate_overall_quality_report(all_results, config, '1234', {})
+    assert '处理失败率: ' in generate_algorithm_summary_report({}, '1234', config, all_results)
+
+
+def test_evaluation_returns_partial(tmp_path):
+    broken = tmp_path / 'broken.jpg'
+    broken.write_bytes(b'not an image')
+    paths = {'template_image_dir': str(tmp_path / 'template'), 'report_dir': str(tmp_path / 'report'),
+             'comparison_image_dir': str(tmp_path)}
+    (tmp_path / 'template').mkdir()
+    (tmp_path / 'template' / 'template.jpg').write_bytes(open(TEMPLATE_IMAGE, 'rb').read())
+    config = dict(get_config(), result_cache=False)
+    result = evaluation(paths, config, '12', specific_image_paths=[COMPARISON_IMAGES[0], str(broken)])
+    assert result['status'] == 'partial'
+    assert result['failed_images'] == 1
+    assert [(error['image'], error['algorithm']) for error in result['errors']] == [('broken.jpg', 1), ('broken.jpg', 2)]
+    assert result['report_paths']
+    assert error_result('x')['error_type'] is None
@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+import pytest
+from skimage.metrics import structural_similarity as skimage_ssim
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from algorithm.FastSSIM import SSIMWorkspace, structural_similarity
+from algorithm.Opencv3 import load_image_gray
+
+
+def blurred_pair(gray):
+    return gray, cv2.GaussianBlur(gray, (7, 7), 0)
+
+
+@pytest.mark.parametrize('image_path', [TEMPLATE_IMAGE] + COMPARISON_IMAGES)
+def test_matches_skimage_on_sample_images(image_path):
+    gray, blurred = blurred_pair(load_image_gray(image_path))
+    data_range = float(gray.max() - gray.min())
+    expected = skimage_ssim(gray, blurred, data_range=data_range, win_size=7)
+    assert structural_similarity(gray, blurred, data_range=data_range) == pytest.approx(expected, abs=1e-3)
+
+
+@pytest.mark.parametrize('shape', [(7, 7), (31, 57), (240, 320)])
+def test_matches_skimage_on_random_images(shape):
+    rng = np.random.default_rng(shape[0])
+    im1 = rng.integers(0, 256, size=shape).astype(np.float32)
+    im2 = np.clip(im1 + rng.normal(0, 20, size=shape), 0, 255).astype(np.float32)
+    expected = skimage_ssim(im1, im2, data_range=255, win_size=7)
+    assert structural_similarity(im1, im2, data_range=255) == pytest.approx(expected, abs=1e-3)
+
+
+def test_workspace_is_reused():
+    workspace = SSIMWorkspace()
+    gray, blurred = blurred_pair(load_image_gray(COMPARISON_IMAGES[0]))
+    first = structural_similarity(gray, blurred, 255, workspace=workspace)
+    buffers = workspace.buffers
+    assert structural_similarity(gray, blurred, 255, workspace=workspace) == first
+    assert workspace.buffers is buffers
+
+
+def test_large_images_are_not_kept_in_workspace():
+    gray, blurred = blurred_pair(load_image_gray(COMPARISON_IMAGES[0]))
+    workspace = SSIMWorkspace(max_bytes=8 * 4 * gray.size - 1)
+    first = structural_similarity(gray, blurred, 255, workspace=workspace)
+    # 超过上限的缓冲区用完即释放，结果不受影响
+    assert workspace.buffers == {} and workspace.shape is None
+    assert first == structural_similarity(gray, blurred, 255)
+
+
+def test_proxy_resolution_computes_on_resized_copy():
+    gray, blurred = blurred_pair(load_image_gray(COMPARISON_IMAGES[0]))
+    h, w = gray.shape
+    scale = 512 / max(h, w)
+    size = (int(round(w * scale)), int(round(h * scale)))
+    small = [cv2.resize(img, size, interpolation=cv2.INTER_AREA) for img in (gray, blurred)]
+    proxy = structural_similarity(gray, blurred, 255, max_side=512)
+    assert proxy == structural_similarity(small[0], small[1], 255)
+
+
+def test_rejects_images_smaller_than_window():
+    with pytest.raises(ValueError):
+        structural_similarity(np.zeros((5, 5), np.float32), np.zeros((5, 5), np.float32), 255)
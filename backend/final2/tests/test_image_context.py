@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from algorithm.ImageContext import ImageContext, combine_requirements, reduction_factor
+from algorithm.ImageHash import is_similar
+from algorithm.Opencv1 import calculate_image_quality
+from algorithm.Opencv2 import evaluate_fashion_image
+from algorithm.Opencv3 import calculate_composite_score
+
+
+def test_context_results_match_paths():
+    image_path = COMPARISON_IMAGES[0]
+    context = ImageContext(image_path)
+    assert is_similar(TEMPLATE_IMAGE, context) == is_similar(TEMPLATE_IMAGE, image_path)
+    assert calculate_image_quality(context) == calculate_image_quality(image_path)
+    assert evaluate_fashion_image(TEMPLATE_IMAGE, context) == evaluate_fashion_image(TEMPLATE_IMAGE, image_path)
+    assert calculate_composite_score(context) == calculate_composite_score(image_path)
+
+
+def test_context_decodes_once(monkeypatch):
+    calls = []
+    original = cv2.imdecode
+
+    def counting_imdecode(buf, flags):
+        calls.append(flags)
+        return original(buf, flags)
+
+    monkeypatch.setattr(cv2, 'imdecode', counting_imdecode)
+    context = ImageContext(COMPARISON_IMAGES[1])
+    calculate_image_quality(context)
+    evaluate_fashion_image(None, context)
+    calculate_composite_score(context)
+    assert len(calls) == 1
+
+
+def _write_jpeg(tmp_path, width, height):
+    rng = np.random.default_rng(0)
+    image = cv2.resize(rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8), (width, height))
+    path = str(tmp_path / 'large.jpg')
+    cv2.imwrite(path, image)
+    return path
+
+
+def test_reduction_factor_keeps_target_side():
+    assert reduction_factor((4000, 3000), 1600) == 2
+    assert reduction_factor((4000, 3000), 600) == 4
+    assert reduction_factor((4000, 3000), 400) == 8
+    assert reduction_factor((1200, 800), 1600) == 1
+
+
+def test_combine_requirements():
+    combined = combine_requirements([{'channels': 'gray', 'min_side': 128}, {'channels': 'color', 'min_side': 256}])
+    assert combined == {'channels': 'color', 'min_side': 256}
+
+
+def test_reduced_decode(tmp_path):
+    path = _write_jpeg(tmp_path, 2400, 1600)
+    context = ImageContext.open_reduced(path, 1000, channels='gray')
+    assert context.original_size == (2400, 1600)
+    assert context.reduce == 2
+    assert context.image.shape == (800, 1200)
+    assert context.gray is context.image
+    assert context.scale == 0.5
+    color = ImageContext.open_reduced(path, 500, channels='color')
+    assert color.image.shape == (400, 600, 3)
+
+
+
+def test_choice_5_computes_each_primitive_once():
+    context = ImageContext(COMPARISON_IMAGES[0])
+    is_similar(TEMPLATE_IMAGE, context)
+    calculate_image_quality(context)
+    evaluate_fashion_image(TEMPLATE_IMAGE, context)
+    calculate_composite_score(context)
+    counts = context.compute_counts
+    for key in ('decode', 'gray', 'laplacian_var', 'gray_std', 'histogram', 'brenner', 'ssim_contrast'):
+        assert counts[key] == 1, key
+    assert max(counts.values()) == 1
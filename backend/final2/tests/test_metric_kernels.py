@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+
+from conftest import COMPARISON_IMAGES
+from algorithm.ImageContext import ImageContext
+from algorithm.MetricKernels import MetricWorkspace, SquaredDeviationSum, gray_std, laplacian_variance, mean_color_diff
+from algorithm.Opencv1 import calculate_image_quality
+
+
+def _old_metrics(context, target_color):
+    """重写前calculate_image_quality中的计算方式"""
+    img_rgb = context.rgb
+    color_diff = cv2.absdiff(img_rgb, np.full_like(img_rgb, target_color))
+    gray = context.gray
+    return np.mean(color_diff), cv2.Laplacian(gray, cv2.CV_64F).var(), gray.std()
+
+
+@pytest.mark.parametrize('image_path', COMPARISON_IMAGES[:3])
+@pytest.mark.parametrize('target_color', [(255, 255, 255), (12, 200, 77)])
+def test_kernels_match_old_formulas(image_path, target_color):
+    context = ImageContext(image_path)
+    old_color, old_laplacian, old_std = _old_metrics(context, target_color)
+    assert mean_color_diff(context.bgr, target_color) == old_color
+    assert laplacian_variance(context.gray) == old_laplacian
+    assert gray_std(context.gray) == old_std
+
+
+def test_kernels_reuse_buffers_across_sizes():
+    rng = np.random.default_rng(0)
+    # 覆盖多段成对求和（超过PAIRWISE_SEGMENT个元素）和非8的倍数的长度
+    for shape in [(300, 257), (64, 1000), (300, 257), (1023, 1031), (2, 3)]:
+        gray = cv2.GaussianBlur(rng.integers(0, 256, shape, dtype=np.uint8), (0, 0), 2)
+        assert laplacian_variance(gray) == cv2.Laplacian(gray, cv2.CV_64F).var()
+        assert gray_std(gray) == gray.std()
+
+
+def test_squared_deviation_sum_in_chunks():
+    rng = np.random.default_rng(1)
+    values = rng.integers(-1020, 1021, 300001).astype(np.int16)
+    mean = int(values.sum(dtype=np.int64)) / values.size
+    expected = np.add.reduce((values - mean) ** 2)
+    deviations = SquaredDeviationSum(values.size, mean, segment=1000)
+    for start in range(0, values.size, 7777):
+        deviations.add(values[start:start + 7777])
+    assert deviations.total() == expected
+
+
+def test_large_buffers_are_not_kept_in_workspace():
+    workspace = MetricWorkspace(max_bytes=1000)
+    gray = np.random.default_rng(2).integers(0, 256, (40, 50), dtype=np.uint8)
+    assert laplacian_variance(gray, workspace) == cv2.Laplacian(gray, cv2.CV_64F).var()
+    assert workspace.buffers == {}
+    small = gray[:10, :10].copy()
+    laplacian_variance(small, workspace)
+    assert workspace.buffers['laplacian'].shape == (10, 10)
+
+
+def test_16bit_images_use_original_formulas(tmp_path):
+    rng = np.random.default_rng(3)
+    image = cv2.GaussianBlur(rng.integers(0, 65536, (240, 320, 3)).astype(np.uint16), (0, 0), 1.5)
+    path = str(tmp_path / '16bit.png')
+    cv2.imwrite(path, image)
+    context = ImageContext(path)
+    assert context.bgr.dtype == np.uint16
+
+    old_color, old_laplacian, old_std = _old_metrics(context, (255, 255, 255))
+    assert mean_color_diff(context.bgr, (255, 255, 255)) == old_color
+    assert laplacian_variance(context.gray) == old_laplacian
+    assert gray_std(context.gray) == old_std
+    result = calculate_image_quality(ImageContext(path))
+    assert result is not None
+    assert (result['initial_color_diff'], result['initial_laplacian_var'], result['initial_noise_level']) == \
+        (old_color, old_laplacian, old_std)
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+import pytest
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from algorithm.ImageContext import ImageContext
+from algorithm.Opencv2 import MATCH_TOLERANCE, TEMPLATE_SCALES, check_element_completeness, match_template_pyramid, \
+    match_tolerance
+from config import get_config
+
+
+@pytest.mark.parametrize('image_path', [TEMPLATE_IMAGE] + COMPARISON_IMAGES)
+def test_pyramid_agrees_with_exhaustive(image_path):
+    context = ImageContext(image_path)
+    exhaustive = check_element_completeness(context, TEMPLATE_IMAGE, mode='exhaustive', return_scale=True)
+    pyramid = check_element_completeness(context, TEMPLATE_IMAGE, mode='pyramid', return_scale=True)
+    assert pyramid[0] == pytest.approx(exhaustive[0], abs=get_config()['template_match_tolerance'])
+    assert pyramid[1] == exhaustive[1] == 1.0
+
+
+def test_multi_scale_is_opt_in():
+    context = ImageContext(COMPARISON_IMAGES[0])
+    assert TEMPLATE_SCALES == (1.0,)
+    single = check_element_completeness(context, TEMPLATE_IMAGE)
+    multi, scale = check_element_completeness(context, TEMPLATE_IMAGE, scales=(0.9, 1.0, 1.1), return_scale=True)
+    assert multi >= single and scale in (0.9, 1.0, 1.1)
+
+
+def test_pyramid_finds_embedded_template():
+    rng = np.random.default_rng(1)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (900, 1200)).astype(np.uint8), (0, 0), 3)
+    image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX)
+    template = image[321:521, 456:756].copy()
+    exhaustive = float(cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED).max())
+    assert match_template_pyramid(image, template) == pytest.approx(exhaustive, abs=1e-6)
+
+
+def test_single_scale_exhaustive_matches_original_behaviour():
+    context = ImageContext(COMPARISON_IMAGES[0])
+    template = cv2.imread(TEMPLATE_IMAGE, cv2.IMREAD_GRAYSCALE)
+    expected = float(cv2.matchTemplate(context.gray, template, cv2.TM_CCOEFF_NORMED).max())
+    assert check_element_completeness(context, TEMPLATE_IMAGE, mode='exhaustive', scales=(1.0,)) == expected
+
+
+def _large_case(matching):
+    rng = np.random.default_rng(2)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (2400, 3000)).astype(np.uint8), (0, 0), 4)
+    image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX)
+    if matching:
+        return image, image[700:1500, 1100:1700].copy()
+    # 与图像无关的模板：得分低，金字塔也不应退回全图穷举
+    return image, cv2.GaussianBlur(rng.integers(0, 256, (800, 600)).astype(np.uint8), (0, 0), 4)
+
+
+@pytest.mark.parametrize('matching', [True, False])
+def test_pyramid_agrees_with_exhaustive_on_large_images(matching):
+    image, template = _large_case(matching)
+    exhaustive = float(cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED).max())
+    tolerance = get_config()['template_match_tolerance']
+    pyramid = match_template_pyramid(image, template, tolerance=tolerance)
+    assert exhaustive - tolerance <= pyramid <= exhaustive + 1e-4
+
+
+def test_zero_tolerance_matches_exhaustive():
+    # 粗层被误导的情形（与图像无关的小模板）：不校验时偏差明显，容差为0时退回穷举
+    rng = np.random.default_rng(2)
+    for _ in range(3):
+        image = cv2.normalize(cv2.GaussianBlur(rng.integers(0, 256, (1200, 1600)).astype(np.uint8), (0, 0), 4),
+                              None, 0, 255, cv2.NORM_MINMAX)
+        template = cv2.normalize(cv2.GaussianBlur(rng.integers(0, 256, (400, 300)).astype(np.uint8), (0, 0), 4),
+                                 None, 0, 255, cv2.NORM_MINMAX)
+        exhaustive = float(cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED).max())
+        assert match_template_pyramid(image, template, tolerance=None) <= exhaustive + 1e-4
+        assert match_template_pyramid(image, template, tolerance=0) == exhaustive
+
+
+def test_tolerance_comes_from_config():
+    context = ImageContext.from_array('large', cv2.cvtColor(_large_case(False)[0], cv2.COLOR_GRAY2BGR))
+    template = _large_case(False)[1]
+    exhaustive = float(cv2.matchTemplate(context.gray, template, cv2.TM_CCOEFF_NORMED).max())
+    assert match_tolerance(dict(get_config(), template_match_tolerance=0)) == 0
+    assert match_tolerance(None) == MATCH_TOLERANCE
+    assert match_template_pyramid(context.gray, template, tolerance=match_tolerance({'template_match_tolerance': 0})) \
+        == exhaustive
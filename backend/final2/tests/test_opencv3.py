@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from algorithm.Opencv3 import brenner_gradient, brenner_gradient_batch, load_image_gray
+
+
+def brenner_gradient_loop(gray_img):
+    """原双重循环实现（用float64累加），作为向量化版本的参照"""
+    step = 3
+    h, w = gray_img.shape
+    brenner = 0.0
+    for i in range(0, h - step, step):
+        for j in range(0, w, step):
+            diff = float(gray_img[i, j]) - float(gray_img[i + step, j])
+            brenner += diff ** 2
+    return (brenner / (h * w)) * 100
+
+
+@pytest.mark.parametrize('shape', [(3, 3), (4, 7), (61, 89), (100, 33)])
+def test_brenner_matches_loop_on_random_images(shape):
+    rng = np.random.default_rng(shape[0] * 1000 + shape[1])
+    gray = rng.integers(0, 256, size=shape).astype(np.float32)
+    assert brenner_gradient(gray) == pytest.approx(brenner_gradient_loop(gray), rel=1e-12)
+
+
+@pytest.mark.parametrize('image_path', [TEMPLATE_IMAGE] + COMPARISON_IMAGES)
+def test_brenner_matches_loop_on_sample_images(image_path):
+    gray = load_image_gray(image_path)
+    assert brenner_gradient(gray) == pytest.approx(brenner_gradient_loop(gray), rel=1e-12)
+
+
+def test_brenner_full_resolution_is_on_sampled_scale():
+    gray = load_image_gray(COMPARISON_IMAGES[0])
+    sampled = brenner_gradient(gray)
+    full = brenner_gradient(gray, full_resolution=True)
+    assert full == pytest.approx(sampled, rel=0.05)
+
+
+def test_brenner_batch_matches_single():
+    grays = [load_image_gray(path) for path in [TEMPLATE_IMAGE] + COMPARISON_IMAGES]
+    expected = [brenner_gradient(g) for g in grays]
+    np.testing.assert_allclose(brenner_gradient_batch(np.stack(grays)), expected, rtol=1e-12)
+    np.testing.assert_allclose(brenner_gradient_batch([grays[0], grays[1][:500]]),
+                               [expected[0], brenner_gradient(grays[1][:500])], rtol=1e-12)
@@ -0,0 +1,34 @@
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from config import get_config
+from errors import is_error
+from parallel import cv2_threads_per_worker
+from utils import evaluate_images
+
+
+def _parallel_config(**overrides):
+    config = get_config()
+    config.update(parallel_workers=2, parallel_chunk_size=2, result_cache=False, **overrides)
+    return config
+
+
+def test_parallel_matches_serial():
+    images = COMPARISON_IMAGES * 2
+    serial = evaluate_images(TEMPLATE_IMAGE, images, '1234', dict(get_config(), result_cache=False))
+    assert evaluate_images(TEMPLATE_IMAGE, images, '1234', _parallel_config()) == serial
+
+
+def test_parallel_isolates_broken_image(tmp_path):
+    broken = tmp_path / 'broken.jpg'
+    broken.write_bytes(b'not an image')
+    images = [COMPARISON_IMAGES[0], COMPARISON_IMAGES[1], str(broken)]
+    serial = evaluate_images(TEMPLATE_IMAGE, images, '12', dict(get_config(), result_cache=False))
+    parallel = evaluate_images(TEMPLATE_IMAGE, images, '12', _parallel_config())
+    assert parallel == serial
+    assert all(is_error(result) for _, result in parallel[2])
+
+
+def test_cv2_threads_do_not_oversubscribe(monkeypatch):
+    monkeypatch.setattr('os.cpu_count', lambda: 32)
+    assert cv2_threads_per_worker(8) == 4
+    assert cv2_threads_per_worker(64) == 1
+    assert cv2_threads_per_worker(8, {'parallel_cv2_threads': 2}) == 2
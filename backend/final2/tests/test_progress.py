@@ -0,0 +1,62 @@
+import shutil
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from config import get_config
+from progress import ProgressReporter
+from utils import evaluation
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_updates_are_throttled():
+    clock = FakeClock()
+    calls = []
+    progress = ProgressReporter(calls.append, 100, min_interval=0.25, clock=clock)
+    for done in range(100):
+        clock.now = done * 0.01
+        progress.update(done)
+    # 第一次更新立即回调，之后每0.25秒最多一次
+    assert [call['done'] for call in calls] == [0, 25, 50, 75]
+    clock.now = 1.0
+    progress.update(100)
+    assert calls[-1]['done'] == 100 and calls[-1]['eta_seconds'] == 0.0
+    assert calls[-1]['throughput'] == 100.0
+    progress.set_stage('reporting')
+    assert calls[-1]['stage'] == 'reporting' and len(calls) == 6
+
+
+def test_eta_from_throughput():
+    clock = FakeClock()
+    calls = []
+    progress = ProgressReporter(calls.append, 10, clock=clock)
+    clock.now = 4.0
+    progress.update(2)
+    assert calls[-1]['throughput'] == 0.5 and calls[-1]['eta_seconds'] == 16.0
+
+
+def test_callback_errors_are_ignored():
+    def broken_callback(progress):
+        raise RuntimeError('写入失败')
+
+    progress = ProgressReporter(broken_callback, 1)
+    progress.update(1)
+    assert progress.done == 1
+
+
+def test_evaluation_reports_stages(tmp_path):
+    (tmp_path / 'template').mkdir()
+    shutil.copy(TEMPLATE_IMAGE, tmp_path / 'template' / 'template.jpg')
+    paths = {'template_image_dir': str(tmp_path / 'template'), 'report_dir': str(tmp_path / 'report'),
+             'comparison_image_dir': str(tmp_path)}
+    config = dict(get_config(), result_cache=False, progress_min_interval=0)
+    calls = []
+    evaluation(paths, config, '2', specific_image_paths=COMPARISON_IMAGES, progress_callback=calls.append)
+    assert [(call['stage'], call['done']) for call in calls] == [
+        ('evaluating', 0), ('evaluating', 1), ('evaluating', 2), ('reporting', 2), ('done', 2)]
+    assert all(call['total'] == 2 for call in calls)
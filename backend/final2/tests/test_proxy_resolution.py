@@ -0,0 +1,32 @@
+import math
+
+import numpy as np
+
+from conftest import COMPARISON_IMAGES
+from algorithm.ImageContext import ImageContext
+from algorithm.ProxyResolution import calibrate, fit_exponent, make_proxy, proxy_scale
+
+
+def test_proxy_scale_limits():
+    assert proxy_scale((1000, 800), max_side=1600) == 1.0
+    assert proxy_scale((4000, 3000), max_side=1600) == 0.4
+    assert math.isclose(proxy_scale((4000, 3000), max_megapixels=3.0), 0.5)
+
+
+def test_make_proxy_returns_original_when_small():
+    context = ImageContext.from_array('x.jpg', np.zeros((100, 80, 3), dtype=np.uint8))
+    assert make_proxy(context, max_side=1600) is context
+
+
+def test_make_proxy_downscales():
+    context = ImageContext(COMPARISON_IMAGES[0])
+    h, w = context.image.shape[:2]
+    proxy = make_proxy(context, max_side=max(h, w) // 2)
+    assert max(proxy.gray.shape) == max(h, w) // 2
+    assert math.isclose(proxy.scale, proxy.image.shape[1] / w)
+
+
+def test_calibrate_and_fit_roundtrip():
+    assert calibrate('laplacian_var', 123.0, 1.0) == 123.0
+    samples = [(v * s ** 0.7, v, s) for v, s in ((50.0, 0.5), (80.0, 0.25), (20.0, 0.8))]
+    assert math.isclose(fit_exponent(samples), 0.7)
@@ -0,0 +1,110 @@
+import os
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from config import get_config
+from report_writer import count_pages, iter_html_document, link_pages, page_directory, write_report
+from utils import evaluate_image, generate_algorithm_summary_report, generate_combined_report, \
+    evaluation, generate_overall_quality_report, iter_overall_quality_report, render_reports, report_choices
+
+
+def test_document_sections_accept_strings_and_generators():
+    document = ''.join(iter_html_document('标题', ['<p>a</p>', (part for part in ['<p>', 'b', '</p>'])]))
+    assert '<h1 style="text-align: center;">标题</h1>' in document
+    assert document.index('<p>a</p>') < document.index('<p>b</p>') < document.index('</body>')
+
+
+def test_write_report_consumes_chunks_lazily(tmp_path):
+    written = []
+
+    def chunks():
+        for index in range(10000):
+            written.append(index)
+            yield f"<tr><td>{index}</td></tr>\n"
+
+    filename = tmp_path / 'report.html'
+    write_report(str(filename), chunks(), buffer_size=4096)
+    assert len(written) == 10000
+    assert filename.read_text(encoding='utf-8').count('<tr>') == 10000
+
+
+def test_combined_report_matches_string_rendering(tmp_path):
+    config = dict(get_config(), result_cache=False)
+    all_results = [(image_path, evaluate_image(TEMPLATE_IMAGE, image_path, '1234', config))
+                   for image_path in COMPARISON_IMAGES]
+    paths = {'report_dir': str(tmp_path)}
+    assert generate_overall_quality_report(all_results, config, '1234', paths) == \
+        ''.join(iter_overall_quality_report(all_results, config, '1234'))
+    filename = generate_combined_report(all_results, config, '1234', paths)
+    content = open(filename, encoding='utf-8').read()
+    assert generate_algorithm_summary_report(paths, '1234', config, all_results) in content
+    assert generate_overall_quality_report(all_results, config, '1234', paths) in content
+    assert content.rstrip().endswith('</html>')
+
+
+def _read(path):
+    return open(path, encoding='utf-8').read()
+
+
+def test_render_reports_matches_separate_rendering(tmp_path):
+    config = dict(get_config(), result_cache=False)
+    all_results = [(image_path, evaluate_image(TEMPLATE_IMAGE, image_path, '1234', config))
+                   for image_path in COMPARISON_IMAGES]
+    choices = report_choices('1234', config)
+    assert choices == ['1', '2', '3', '4', '1234']
+    rendered = render_reports(all_results, config, choices, {'report_dir': str(tmp_path / 'together')})
+    for choice, path in zip(choices, rendered):
+        single = [(image_name, [(func_id, result) for func_id, result in result_group if str(func_id) in choice])
+                  for image_name, result_group in all_results]
+        separate = generate_combined_report(single, config, choice, {'report_dir': str(tmp_path / choice)})
+        assert _read(path) == _read(separate)
+
+
+def test_combined_report_only(tmp_path):
+    config = dict(get_config(), combined_report_only=True)
+    assert report_choices('1234', config) == ['1234']
+    assert report_choices('3', config) == ['3']
+    assert render_reports([], config, [], {'report_dir': str(tmp_path)}) == []
+
+
+def test_paged_reports(tmp_path):
+    config = dict(get_config(), result_cache=False, report_page_size=1)
+    all_results = [(os.path.basename(image_path), evaluate_image(TEMPLATE_IMAGE, image_path, '12', config))
+                   for image_path in COMPARISON_IMAGES]
+    index_path, = render_reports(all_results, config, ['12'], {'report_dir': str(tmp_path)})
+    assert count_pages(index_path) == 2
+    index = _read(index_path)
+    assert '算法测试结果报告' in index and '共2页' in index
+    pages_dir = os.path.basename(page_directory(index_path))
+    assert f"href='{pages_dir}/page_0001.html'" in index
+    first = _read(os.path.join(page_directory(index_path), 'page_0001.html'))
+    second = _read(os.path.join(page_directory(index_path), 'page_0002.html'))
+    assert '1.jpg' in first and '20250408skt0000069.png' not in first
+    assert "下一页" in first and "上一页" in second and "下一页" not in second
+    assert first.count('<table>') == 1 and first.rstrip().endswith('</html>')
+
+    # 经接口提供时相对链接改为接口地址
+    linked = link_pages(index, 'http://host/api/reports/7/page/', 'http://host/api/reports/7/download/')
+    assert "href='http://host/api/reports/7/page/?page=1'" in linked and 'page_0001.html' not in linked
+    linked = link_pages(first, 'http://host/api/reports/7/page/', 'http://host/api/reports/7/download/')
+    assert "href='http://host/api/reports/7/page/?page=2'" in linked
+    assert "href='http://host/api/reports/7/download/'>返回汇总" in linked
+
+
+def test_small_reports_are_not_paged(tmp_path):
+    config = dict(get_config(), result_cache=False, report_page_size=2)
+    all_results = [(os.path.basename(image_path), evaluate_image(TEMPLATE_IMAGE, image_path, '2', config))
+                   for image_path in COMPARISON_IMAGES]
+    path, = render_reports(all_results, config, ['2'], {'report_dir': str(tmp_path)})
+    assert count_pages(path) == 0 and not os.path.exists(page_directory(path))
+    assert '20250408skt0000069.png' in _read(path)
+
+
+def test_evaluation_writes_pages_while_evaluating(tmp_path):
+    (tmp_path / 'template').mkdir()
+    (tmp_path / 'template' / 'template.jpg').write_bytes(open(TEMPLATE_IMAGE, 'rb').read())
+    paths = {'template_image_dir': str(tmp_path / 'template'), 'report_dir': str(tmp_path / 'report'),
+             'comparison_image_dir': str(tmp_path)}
+    config = dict(get_config(), result_cache=False, report_page_size=1, combined_report_only=True)
+    result = evaluation(paths, config, '24', specific_image_paths=COMPARISON_IMAGES)
+    assert len(result['report_paths']) == 1
+    assert count_pages(result['main_report_path']) == 2
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+
+import cv2
+import numpy as np
+import pytest
+
+import result_cache
+import utils
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from config import get_config
+from result_cache import ResultCache, config_key, data_directory, open_result_cache
+from utils import evaluate_image
+
+
+def test_round_trip_and_key_parts(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    config = get_config()
+    result = {'distance': np.int64(3), 'similar': np.True_}
+    cache.put('abc', 1, config, result, template_hash='t1')
+    assert cache.get_many('abc', '1', config, 't1') == {'1': {'distance': 3, 'similar': True}}
+    # 模板、代理分辨率配置不同或图片内容不同都不命中
+    assert cache.get_many('abc', '1', config, 't2') == {}
+    assert cache.get_many('abc', '1', dict(config, proxy_resolution=True), 't1') == {}
+    assert cache.get_many('abd', '1', config, 't1') == {}
+    # 报告阈值不影响缓存键；不依赖模板的算法不受模板影响
+    assert cache.get_many('abc', '1', dict(config, distance_threshold=5), 't1')
+    assert config_key(2, config, 't1') == config_key(2, config, 't2')
+    cache.put('abc', 2, config, None)
+    assert len(cache) == 1
+    cache.close()
+
+
+def test_version_change_invalidates(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    config = get_config()
+    cache.put('abc', 4, config, {'composite': 1.0})
+    monkeypatch.setitem(result_cache.ALGORITHM_VERSIONS, '4', result_cache.ALGORITHM_VERSIONS['4'] + 1)
+    assert cache.get_many('abc', '4', config) == {}
+
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, 'EVICT_INTERVAL', 1)
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    config = get_config()
+    cache.put('a', 2, config, {'quality_score': 0.1})
+    cache.put('b', 2, config, {'quality_score': 0.2})
+    cache.get_many('a', '2', config)  # a成为最近使用
+    cache.put('c', 2, config, {'quality_score': 0.3})
+    assert len(cache) == 2
+    assert cache.get_many('b', '2', config) == {}
+    assert cache.get_many('a', '2', config) and cache.get_many('c', '2', config)
+
+
+def test_cached_evaluation_matches_and_skips_decode(tmp_path, monkeypatch):
+    config = get_config()
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    image_path = COMPARISON_IMAGES[0]
+    fresh = evaluate_image(TEMPLATE_IMAGE, image_path, '1234', config, cache)
+    assert cache.misses == 4 and len(cache) == 4
+
+    calls = []
+    original = cv2.imdecode
+
+    def counting_imdecode(buf, flags):
+        calls.append(flags)
+        return original(buf, flags)
+
+    monkeypatch.setattr(cv2, 'imdecode', counting_imdecode)
+    cached = evaluate_image(TEMPLATE_IMAGE, image_path, '1234', config, cache)
+    assert cache.hits == 4
+    assert calls == []
+    assert cached == fresh
+
+
+def test_default_path_is_outside_source_tree(tmp_path, monkeypatch, data_dir):
+    cache = open_result_cache(get_config())
+    assert cache.path == str(data_dir / 'result_cache.sqlite3')
+    assert not cache.path.startswith(os.path.dirname(result_cache.__file__))
+    cache.close()
+    # 相对路径相对于数据目录，绝对路径直接使用
+    cache = open_result_cache(dict(get_config(), result_cache_path=str(tmp_path / 'other.sqlite3')))
+    assert cache.path == str(tmp_path / 'other.sqlite3')
+    cache.close()
+    monkeypatch.delenv('IMAGE_PROCESSING_DATA_DIR')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert data_directory() == str(tmp_path / 'image_processing_system')
+
+
+def test_evaluation_closes_cache_on_error(tmp_path, monkeypatch):
+    opened = []
+
+    def open_and_record(config):
+        opened.append(open_result_cache(config))
+        return opened[-1]
+
+    monkeypatch.setattr(utils, 'open_result_cache', open_and_record)
+
+    def fail(*args, **kwargs):
+        raise OSError('磁盘已满')
+
+    monkeypatch.setattr(utils, '_evaluate_and_report', fail)
+    (tmp_path / 'template').mkdir()
+    (tmp_path / 'template' / 'template.jpg').write_bytes(open(TEMPLATE_IMAGE, 'rb').read())
+    paths = {'template_image_dir': str(tmp_path / 'template'), 'report_dir': str(tmp_path / 'report'),
+             'comparison_image_dir': str(tmp_path)}
+    with pytest.raises(OSError):
+        utils.evaluation(paths, get_config(), '12', specific_image_paths=[COMPARISON_IMAGES[0]])
+    # 出错时连接同样被关闭
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0]._conn.execute('SELECT 1')
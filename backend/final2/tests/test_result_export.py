@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from cascade import skipped_result
+from config import get_config
+from errors import error_result
+from result_export import ResultExporter, export_schema, find_exports, iter_csv
+from results import derived_columns, from_result_groups, passed_mask
+from utils import evaluate_image, evaluation
+
+
+def _read_rows(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def _evaluated(config):
+    return [(os.path.basename(image_path), evaluate_image(TEMPLATE_IMAGE, image_path, '1234', config))
+            for image_path in COMPARISON_IMAGES]
+
+
+def test_export_rows_match_results(tmp_path):
+    config = dict(get_config(), result_cache=False)
+    all_results = _evaluated(config)
+    exporter = ResultExporter(config, '1234', str(tmp_path), chunk_size=1)
+    for image_name, result_group in all_results:
+        exporter.add(image_name, result_group)
+    rows = _read_rows(exporter.close()['jsonl'])
+
+    assert [row['image'] for row in rows] == [image_name for image_name, _ in all_results]
+    assert all(list(row) == [name for name, _ in export_schema('1234', config)] for row in rows)
+    opencv3 = from_result_groups(all_results, 4)
+    assert [row['opencv3.brenner'] for row in rows] == opencv3['brenner'].tolist()
+    assert [row['opencv3.passed'] for row in rows] == passed_mask(4, opencv3, config).tolist()
+    assert [row['opencv3.ssim_grade'] for row in rows] == derived_columns(4, opencv3, config)['ssim_grade'].tolist()
+    opencv2 = from_result_groups(all_results, 3)
+    assert [row['opencv2.quality_grade'] for row in rows] == opencv2['quality_grade'].tolist()
+    assert all(row['opencv1.status'] == 'ok' and row['opencv1.message'] is None for row in rows)
+
+
+def test_failed_and_skipped_algorithms_have_empty_metrics(tmp_path):
+    config = get_config()
+    exporter = ResultExporter(config, '14', str(tmp_path))
+    exporter.add('a.jpg', [(1, error_result(ValueError('坏图'))), (4, skipped_result('图像差异显著'))])
+    exporter.add('b.jpg', [(1, {'distance': 0, 'similar': True}),
+                           (4, {'raw_scores': {'brenner': 3000.0, 'ssim': 90.0}, 'composite': 95.0})])
+    failed, ok = _read_rows(exporter.close()['jsonl'])
+
+    assert (failed['imagehash.status'], failed['imagehash.message']) == ('error', '坏图')
+    assert (failed['opencv3.status'], failed['opencv3.message']) == ('skipped', '图像差异显著')
+    assert failed['imagehash.distance'] is None and failed['opencv3.ssim_weighted'] is None
+    assert failed['imagehash.passed'] is False and failed['opencv3.passed'] is False
+    assert ok['imagehash.passed'] is True and ok['imagehash.distance_grade'] == '图像高度相似或重复'
+    assert ok['opencv3.brenner_weighted'] == pytest.approx(0.6 + 500 / 500 * 0.4)
+    assert ok['opencv3.ssim_weighted'] == pytest.approx(0.6 + 10 / 20 * 0.4)
+    assert ok['opencv3.brenner_review'] is False
+
+
+def test_csv_is_streamed_in_batches(tmp_path):
+    config = get_config()
+    exporter = ResultExporter(config, '1', str(tmp_path), chunk_size=7)
+    for index in range(25):
+        exporter.add(f"{index}.jpg", [(1, {'distance': index, 'similar': index <= 10})])
+    path = exporter.close()['jsonl']
+
+    batches = list(iter_csv(path, batch_size=10))
+    assert len(batches) == 3
+    lines = ''.join(batches).splitlines()
+    assert lines[0].startswith('image,imagehash.status,imagehash.message,imagehash.passed,imagehash.distance')
+    assert len(lines) == 26 and lines[1].startswith('0.jpg,ok,,True,0.0')
+
+
+def test_evaluation_exports_results(tmp_path):
+    (tmp_path / 'template').mkdir()
+    (tmp_path / 'template' / 'template.jpg').write_bytes(open(TEMPLATE_IMAGE, 'rb').read())
+    paths = {'template_image_dir': str(tmp_path / 'template'), 'report_dir': str(tmp_path / 'report'),
+             'comparison_image_dir': str(tmp_path)}
+    config = dict(get_config(), result_cache=False, result_export_parquet=False)
+    result = evaluation(paths, config, '24', specific_image_paths=COMPARISON_IMAGES)
+
+    # 每份报告都能找到同一次评估写出的导出文件
+    assert all(find_exports(path) == result['export_paths'] for path in result['report_paths'])
+    (tmp_path / 'report' / 'results_29991231235959.jsonl').write_text('')
+    assert find_exports(result['main_report_path']) == result['export_paths']
+    rows = _read_rows(result['export_paths']['jsonl'])
+    assert len(rows) == len(COMPARISON_IMAGES)
+    assert 'opencv1.quality_score' in rows[0] and 'imagehash.status' not in rows[0]
+
+    result = evaluation(paths, dict(config, result_export=False), '2', specific_image_paths=COMPARISON_IMAGES)
+    assert result['export_paths'] == {}
+
+
+def test_parquet_matches_jsonl(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    config = dict(get_config(), result_cache=False)
+    exporter = ResultExporter(config, '1234', str(tmp_path), chunk_size=1)
+    for image_name, result_group in _evaluated(config):
+        exporter.add(image_name, result_group)
+    export_paths = exporter.close()
+    assert pq.read_table(export_paths['parquet']).to_pylist() == _read_rows(export_paths['jsonl'])
@@ -0,0 +1,87 @@
+import numpy as np
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from config import get_config
+from algorithm.ImageHash import is_similar
+from algorithm_wrappers import comprehensive_algorithm, comprehensive_algorithm_batch, imagehash_algorithm_batch, \
+    opencv1_algorithm_batch
+from cascade import skipped_result
+from errors import error_result
+from results import as_columns, empty_results, fill_row, passed_mask, results_array, summarize
+
+
+def test_batch_matches_single_image_wrappers():
+    config = get_config()
+    images = COMPARISON_IMAGES[:3]
+    arrays = comprehensive_algorithm_batch(TEMPLATE_IMAGE, images, config)
+    for index, image_path in enumerate(images):
+        single = comprehensive_algorithm(TEMPLATE_IMAGE, image_path, config)
+        assert arrays[1][index]['distance'] == single['imagehash']['distance']
+        assert arrays[2][index]['quality_score'] == single['opencv1']['quality_score']
+        assert arrays[3][index]['overall'] == single['opencv2']['overall']
+        assert arrays[3][index]['quality_grade'] == single['opencv2']['quality_grade']
+        assert arrays[4][index]['brenner'] == single['opencv3']['raw_scores']['brenner']
+    assert all(arrays[func_id]['ok'].all() for func_id in arrays)
+
+
+def test_failed_image_is_marked_and_counted_as_failed(tmp_path):
+    missing = str(tmp_path / 'missing.jpg')
+    array = opencv1_algorithm_batch([COMPARISON_IMAGES[0], missing], (255, 255, 255))
+    assert list(array['ok']) == [True, False]
+    assert list(array['error']) == [False, True]
+    assert array[0]['error_type'] is None and array[0]['error_message'] is None
+    assert array[1]['error_type'] is not None and array[1]['error_message']
+    assert np.isnan(as_columns(array)['quality_score'][1])
+    assert not passed_mask(2, array, {'quality_score_threshold_high': 0.0})[1]
+
+
+def test_summarize_matches_per_row_counting():
+    config = get_config()
+    all_results = [
+        ('a.jpg', [(1, {'distance': 0, 'similar': True}),
+                   (4, {'raw_scores': {'brenner': 3000.0, 'ssim': 90.0}, 'composite': 100.0})]),
+        ('b.jpg', [(1, {'distance': 12, 'similar': False}),
+                   (4, {'raw_scores': {'brenner': 3000.0, 'ssim': 40.0}, 'composite': 60.0})]),
+    ]
+    summary = summarize(all_results, '14', config)
+    assert summary == {
+        'ImageHash': {'total': 2, 'passed': 1, 'failed': 1, 'skipped': 0, 'errors': 0},
+        'OpenCV3': {'total': 2, 'passed': 1, 'failed': 1, 'skipped': 0, 'errors': 0},
+    }
+
+
+def test_imagehash_batch_matches_is_similar(tmp_path):
+    missing = str(tmp_path / 'missing.jpg')
+    images = COMPARISON_IMAGES + [TEMPLATE_IMAGE, missing]
+    array = imagehash_algorithm_batch(TEMPLATE_IMAGE, images, 0)
+    for index, image_path in enumerate(images[:-1]):
+        single = is_similar(TEMPLATE_IMAGE, image_path, 0)
+        assert (array[index]['distance'], array[index]['similar']) == (single['distance'], single['similar'])
+    assert list(array['ok']) == [True] * (len(images) - 1) + [False]
+    assert array[-1]['error'] and array[-1]['error_message']
+
+
+def test_batch_failure_marks_every_row(monkeypatch):
+    import algorithm_wrappers
+
+    def failing_batch(template_image_path, pixels, threshold):
+        raise ValueError('boom')
+
+    monkeypatch.setattr(algorithm_wrappers, 'is_similar_batch', failing_batch)
+    array = imagehash_algorithm_batch(TEMPLATE_IMAGE, COMPARISON_IMAGES, 0)
+    assert not array['ok'].any()
+    assert list(array['error_type']) == ['ValueError'] * len(COMPARISON_IMAGES)
+    assert list(array['error_message']) == ['boom'] * len(COMPARISON_IMAGES)
+
+
+def test_results_array_matches_fill_row():
+    results = [{'texture': 0.5, 'completeness': 0.7, 'completeness_scale': None, 'quality': 0.9,
+                'overall': 0.72, 'quality_grade': 'B', 'needs_human_review': False},
+               None, error_result('x'), skipped_result('与模板重复'), {'texture': 0.1}]
+    names = [f'{index}.jpg' for index in range(len(results))]
+    expected = empty_results(3, len(results))
+    for index, (name, result) in enumerate(zip(names, results)):
+        fill_row(expected, index, 3, name, result)
+    actual = results_array(3, names, results)
+    for field in expected.dtype.names:
+        np.testing.assert_array_equal(actual[field], expected[field])
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from final2.api_integration import aiter_process_images, iter_process_images
+from config import get_config
+from utils import evaluate_image
+
+CONFIG = {'result_cache': False}
+
+
+def test_records_match_evaluate_image():
+    records = list(iter_process_images(COMPARISON_IMAGES, '1234', TEMPLATE_IMAGE, CONFIG))
+    assert [record['index'] for record in records] == [0, 1]
+    for record, image_path in zip(records, COMPARISON_IMAGES):
+        assert record['image_path'] == image_path
+        assert record['results'] == evaluate_image(TEMPLATE_IMAGE, image_path, '1234', get_config())
+        assert record['errors'] == []
+
+
+def test_consumes_input_lazily():
+    consumed = []
+
+    def paths():
+        for image_path in COMPARISON_IMAGES * 3:
+            consumed.append(image_path)
+            yield image_path
+
+    stream = iter_process_images(paths(), '2', TEMPLATE_IMAGE, CONFIG)
+    next(stream)
+    assert len(consumed) == 1
+    stream.close()
+    assert len(consumed) == 1
+
+
+def test_parallel_stream_bounded_and_ordered():
+    config = dict(CONFIG, parallel_workers=2, parallel_chunk_size=1, parallel_max_pending_chunks=2)
+    consumed = []
+
+    def paths():
+        for image_path in COMPARISON_IMAGES * 3:
+            consumed.append(image_path)
+            yield image_path
+
+    stream = iter_process_images(paths(), '2', TEMPLATE_IMAGE, config)
+    first = next(stream)
+    assert first['image_path'] == COMPARISON_IMAGES[0]
+    # 在途的块数有上限，不会一次读完全部输入
+    assert len(consumed) <= 3
+    rest = list(stream)
+    assert [record['index'] for record in rest] == [1, 2, 3, 4, 5]
+
+
+def test_async_iterator():
+    async def collect():
+        return [record async for record in aiter_process_images(COMPARISON_IMAGES, '4', TEMPLATE_IMAGE, CONFIG)]
+
+    records = asyncio.run(collect())
+    assert [record['image'] for record in records] == ['1.jpg', '20250408skt0000069.png']
+
+
+def test_async_iterator_runs_on_one_thread():
+    threads = []
+
+    def paths():
+        for image_path in COMPARISON_IMAGES * 3:
+            threads.append(threading.get_ident())
+            yield image_path
+
+    async def first_two():
+        records = []
+        async for record in aiter_process_images(paths(), '4', TEMPLATE_IMAGE, CONFIG):
+            records.append(record)
+            await asyncio.gather(*(asyncio.to_thread(sum, []) for _ in range(8)))  # 占用默认线程池
+            if len(records) == 2:
+                break
+        return records
+
+    records = asyncio.run(first_two())
+    assert len(records) == 2
+    # 逐条取结果都在同一个专用线程中
+    assert len(threads) == 2
+    assert len(set(threads)) == 1
+    assert threads[0] != threading.get_ident()
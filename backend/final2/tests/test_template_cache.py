@@ -0,0 +1,35 @@
+import os
+import shutil
+
+from conftest import COMPARISON_IMAGES, TEMPLATE_IMAGE
+from algorithm import TemplateCache
+from algorithm.ImageHash import is_similar
+from algorithm.Opencv2 import check_element_completeness
+from algorithm.ImageContext import ImageContext
+
+
+def test_template_loaded_once_for_many_images():
+    TemplateCache.clear_cache()
+    for image_path in COMPARISON_IMAGES * 3:
+        context = ImageContext(image_path)
+        is_similar(TEMPLATE_IMAGE, context)
+        check_element_completeness(context, TEMPLATE_IMAGE)
+    info = TemplateCache.cache_info()
+    assert info['misses'] == 1
+    assert info['hits'] == len(COMPARISON_IMAGES) * 3 * 2 - 1
+
+
+def test_template_reloaded_when_file_changes(tmp_path):
+    TemplateCache.clear_cache()
+    template = tmp_path / 'template.jpg'
+    shutil.copy(TEMPLATE_IMAGE, template)
+    first = TemplateCache.get_template_fingerprint(str(template))
+    assert TemplateCache.get_template_fingerprint(str(template)) is first
+
+    shutil.copy(COMPARISON_IMAGES[0], template)
+    stat = os.stat(template)
+    os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second = TemplateCache.get_template_fingerprint(str(template))
+    assert second is not first
+    assert is_similar(str(template), COMPARISON_IMAGES[0])['distance'] == 0
+    assert TemplateCache.cache_info()['size'] == 1
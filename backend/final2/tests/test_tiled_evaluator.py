@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from conftest import COMPARISON_IMAGES
+from algorithm.ImageContext import ImageContext
+from algorithm.Opencv1 import calculate_image_quality
+from algorithm.Opencv3 import calculate_composite_score
+from algorithm.TiledEvaluator import MIN_STRIP_ROWS, compute_features, strip_rows
+
+
+def _synthetic(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, shape, dtype=np.uint8)
+
+
+def _assert_same_as_whole(image, budget):
+    tiled = ImageContext.from_array('tiled', image)
+    compute_features(tiled, budget)
+    whole = ImageContext.from_array('whole', image)
+    assert calculate_image_quality(tiled) == calculate_image_quality(whole)
+    assert calculate_composite_score(tiled) == calculate_composite_score(whole)
+
+
+@pytest.mark.parametrize('shape', [(301, 257, 3), (100, 64), (77, 90, 4), (9, 40, 3)])
+@pytest.mark.parametrize('budget', [1, 100_000, 10 ** 9])
+def test_tiled_matches_whole_image(shape, budget):
+    _assert_same_as_whole(_synthetic(shape), budget)
+
+
+def test_tiled_matches_whole_image_on_sample():
+    image = ImageContext(COMPARISON_IMAGES[0]).image
+    _assert_same_as_whole(image, 2_000_000)
+
+
+def test_strip_rows_respects_budget():
+    assert strip_rows(1000, 1) == MIN_STRIP_ROWS
+    rows = strip_rows(1000, 10 * 1024 * 1024)
+    assert rows % 3 == 0
+    assert rows > MIN_STRIP_ROWS
+
+
+def test_constant_image_has_zero_ssim():
+    context = ImageContext.from_array('flat', np.full((50, 60), 128, dtype=np.uint8))
+    features = compute_features(context, 1)
+    assert features['ssim_contrast'] == 0.0
+    assert features['laplacian_var'] == 0.0
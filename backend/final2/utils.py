@@ -2,6 +2,8 @@ import sys
 import os
 import glob
 import datetime
+import html
+import logging
 from tqdm import tqdm
 
 # 添加当前目录到Python路径，支持直接运行
@@ -14,8 +16,21 @@ from algorithm.AnomalyData import generate_anomaly_images
 from algorithm.ImageHash import is_similar
 from algorithm.Openai import generate_prompt
 from algorithm.Opencv1 import calculate_image_quality  # 2-1
-from algorithm.Opencv2 import evaluate_fashion_image  # 2-2
+from algorithm.Opencv2 import evaluate_fashion_image, match_tolerance  # 2-2
 from algorithm.Opencv3 import calculate_composite_score
+from algorithm import ImageHash, Opencv1, Opencv2, Opencv3
+from algorithm.ImageContext import ImageContext, combine_requirements, reduction_factor
+from algorithm.ProxyResolution import make_proxy, proxy_decode_side
+from algorithm.TiledEvaluator import compute_features
+from algorithm.TemplateCache import get_template_fingerprint
+from results import ALGORITHMS, summarize
+from cascade import SKIPPED_LABEL, execution_order, is_skipped, settled_reason, skipped_result
+from result_cache import content_hash, open_result_cache
+from parallel import iter_parallel, worker_count
+from errors import ERROR_LABEL, collect_errors, is_error, run_isolated
+from report_writer import PagedReport, SingleFileReport
+from result_export import ResultExporter
+from progress import STAGE_DONE, STAGE_REPORTING, ProgressReporter
 from algorithm.evaluation import (
     test_imagehash_algorithm,
     test_opencv1_algorithm,
@@ -24,8 +39,29 @@ from algorithm.evaluation import (
     test_overall_results
 )
 
-def generate_overall_quality_report(all_results, config, input_choice, paths):
-    report_content = """
+logger = logging.getLogger(__name__)
+
+# 详细报告中各算法的名称
+ALGORITHM_TITLES = {
+    1: '图像准确度AI检测【ImageHash算法】',
+    2: '图像质量AI检测【opencv算法1】',
+    3: '图像纹理质量AI检测【opencv算法2】',
+    4: '图像清晰度AI检测【opencv算法3+ScikitImage算法】',
+}
+
+
+def _status_text(result):
+    """被级联跳过或处理失败的算法结果在报告中显示的文字，正常结果返回None"""
+    if is_skipped(result):
+        return f"{SKIPPED_LABEL}（{result['reason']}）"
+    if result is None:
+        return ERROR_LABEL
+    if is_error(result):
+        return f"{ERROR_LABEL}（{html.escape(result['message'])}）"
+    return None
+
+
+_OVERALL_TABLE_HEAD = """
     <h1 style=\"text-align: center;\">综合质量检测报告</h1>
     <table>
     <tr>
@@ -40,25 +76,35 @@ def generate_overall_quality_report(all_results, config, input_choice, paths):
         <th>质量预测区间建议</th>
     </tr>
     """
+# 每行开头到图片名称单元格之前的部分
+_ROW_LEAD = """
+                                        <tr>
+                                            """
+# 各算法在详细表中占的行数
+ROWSPAN_MAP = {1: 1, 2: 3, 3: 3, 4: 2}
 
-    rowspan_map = {1: 1, 2: 3, 3: 3, 4: 2}
 
-    for image_name, result_group in all_results:
-        total_rowspan = sum(rowspan_map[func_id] for func_id, _ in result_group if str(func_id) in input_choice)
-        first_func_id = True
-        for i, (func_id, result) in enumerate(result_group):
-            if str(func_id) in input_choice:
-                if first_func_id:
-                    image_name_cell = f"<td rowspan='{total_rowspan}'>{image_name}</td>"
-                    first_func_id = False
-                else:
-                    image_name_cell = "<td style='display: none;'></td>"
-
-                if func_id == 1:
-                    if isinstance(result, dict) and 'distance' in result:
-                        result_text = f"""
-                                        <tr>
-                                            {image_name_cell}
+def _algorithm_rows(func_id, result, config):
+    """
+    渲染一个算法结果在详细表中的行（不含行首和图片名称单元格）
+
+    每个结果只渲染一次，可以拼接到多份报告中（见render_reports）
+
+    Returns:
+        tuple: (占用行数, 行的HTML)；结果缺少字段时HTML为空字符串
+    """
+    # 被级联跳过或处理失败的算法只占一行
+    status_text = _status_text(result)
+    if status_text:
+        return 1, f"""
+                                            <td>{ALGORITHM_TITLES[func_id]}</td>
+                                            <td colspan='7'>{status_text}</td>
+                                        </tr>
+                                        """
+    rowspan = ROWSPAN_MAP[func_id]
+    if func_id == 1:
+        if isinstance(result, dict) and 'distance' in result:
+            return rowspan, f"""
                                             <td rowspan='1'>图像准确度AI检测【ImageHash算法】</td>
                                             <td>汉明距离</td>
                                             <td>{result['distance']}</td>
@@ -69,14 +115,9 @@ def generate_overall_quality_report(all_results, config, input_choice, paths):
                                             <td></td>
                                         </tr>
                                         """
-                        report_content += result_text
-                elif func_id == 2:
-
-                    if isinstance(result, dict) and 'color_score' in result:
-
-                        result_text = f"""
-                                        <tr>
-                                            {image_name_cell}
+    elif func_id == 2:
+        if isinstance(result, dict) and 'color_score' in result:
+            return rowspan, f"""
                                             <td rowspan='3'>图像质量AI检测【opencv算法1】</td>
                                             <td>颜色匹配度（目标白色差异）</td>
                                             <td>{result['initial_color_diff']}</td>
@@ -105,14 +146,9 @@ def generate_overall_quality_report(all_results, config, input_choice, paths):
                                             <td>噪声水平（灰度标准差）：<30为好,30>=Z>=50为中,>50差</td>
                                         </tr>
                                         """
-                        report_content += result_text
-                elif func_id == 3:
-
-                    if isinstance(result, dict) and 'texture' in result:
-     
-                        result_text = f"""
-                                        <tr>
-                                            {image_name_cell}
+    elif func_id == 3:
+        if isinstance(result, dict) and 'texture' in result:
+            return rowspan, f"""
                                             <td rowspan='3'>图像纹理质量AI检测【opencv算法2】</td>
                                             <td>纹理复杂度</td>
                                             <td>{result['texture']}</td>
@@ -141,58 +177,84 @@ def generate_overall_quality_report(all_results, config, input_choice, paths):
                                             <td></td>
                                         </tr>
                                         """
-                        report_content += result_text
-                elif func_id == 4:
+    elif func_id == 4:
+        if isinstance(result, dict) and 'composite' in result:
+            return rowspan, f"""
+                                            <td rowspan='2'>图像清晰度AI检测【opencv算法3+ScikitImage算法】</td>
+                                            <td rowspan='1'>Brenner算法</td>
+                                            <td>{result['raw_scores']['brenner']} </td>
+                                            <td>{'优秀' if result['raw_scores']['brenner'] > config['brenner_threshold_high'] else '一般' if result['raw_scores']['brenner'] >= config['brenner_threshold_low'] else '差'}</td>
+                                            <td>>2500</td>
+                                            <td>{'否' if result['raw_scores']['brenner'] > config['brenner_threshold_high'] else '是'}</td>
+                                            <td>{result['initial_brenner']}</td>
+                                            <td>>2500为优，2500>=B>=1000为一般，<1000为差</td>
+                                        </tr>
+                                        <tr>
+                                            <td rowspan='1'>SSIM对比度</td>
+                                            <td>{result['raw_scores']['ssim']}</td>
+                                            <td>{'优秀' if result['raw_scores']['ssim'] > config['ssim_threshold_high'] else '差' if result['raw_scores']['ssim'] < config['ssim_threshold_low'] else '一般'}</td>
+                                            <td>>80</td>
+                                            <td>{'否' if result['raw_scores']['ssim'] > config['ssim_threshold_high'] else '是'}</td>
+                                            <td>{result['initial_ssim']}</td>
+                                            <td>>80为优，50<=S<=80为一般，<50为差</td>
+                                        </tr>
+                                        """
+    return rowspan, ''
 
-                    if isinstance(result, dict) and 'composite' in result:
-    
-                        # Map Brenner score to weighted value using linear interpolation
-                        if result['raw_scores']['brenner'] < 1000:
-                            brenner_weighted = result['raw_scores']['brenner'] / 2500 * 0.4
-                        elif result['raw_scores']['brenner'] <= 2500:
-                            brenner_weighted = 0.4 + (result['raw_scores']['brenner'] - 1000) / 1500 * 0.2
-                        else:
-                            brenner_weighted = 0.6 + (result['raw_scores']['brenner'] - 2500) / 500 * 0.4
-
-                        # Map SSIM score to weighted value using linear interpolation
-                        if result['raw_scores']['ssim'] < 50:
-                            ssim_weighted = result['raw_scores']['ssim'] / 80 * 0.4
-                        elif result['raw_scores']['ssim'] <= 80:
-                            ssim_weighted = 0.4 + (result['raw_scores']['ssim'] - 50) / 30 * 0.2
-                        else:
-                            ssim_weighted = 0.6 + (result['raw_scores']['ssim'] - 80) / 20 * 0.4
-
-                        result_text = f"""
-                            <tr>
-                                {image_name_cell}
-                                <td rowspan='2'>图像清晰度AI检测【opencv算法3+ScikitImage算法】</td>
-                                <td rowspan='1'>Brenner算法</td>
-                                <td>{result['raw_scores']['brenner']} </td>
-                                <td>{'优秀' if result['raw_scores']['brenner'] > config['brenner_threshold_high'] else '一般' if result['raw_scores']['brenner'] >= config['brenner_threshold_low'] else '差'}</td>
-                                <td>>2500</td>
-                                <td>{'否' if result['raw_scores']['brenner'] > config['brenner_threshold_high'] else '是'}</td>
-                                
-                                <td>{result['initial_brenner']}</td>
-                                <td>>2500为优，2500>=B>=1000为一般，<1000为差</td>
-                            </tr>
-                            <tr>    
-                                <td rowspan='1'>SSIM对比度</td>
-                                <td>{result['raw_scores']['ssim']}</td>
-                                <td>{'优秀' if result['raw_scores']['ssim'] > config['ssim_threshold_high'] else '差' if result['raw_scores']['ssim'] < config['ssim_threshold_low'] else '一般'}</td>
-                                <td>>80</td>
-                                <td>{'否' if result['raw_scores']['ssim'] > config['ssim_threshold_high'] else '是'}</td>
-                                
-                                <td>{result['initial_ssim']}</td>
-                                <td>>80为优，50<=S<=80为一般，<50为差</td>
-                            </tr>
-                            """
-                        report_content += result_text
 
-    report_content += "</table>\n"
-    return report_content
+def _image_rows(image_name, rendered):
+    """
+    拼接一张图片的各算法行：第一个算法的行带跨行的图片名称单元格，其余行用隐藏单元格占位
+
+    Args:
+        rendered: [(占用行数, 行的HTML), ...]（_algorithm_rows的结果）
+    """
+    total_rowspan = sum(rowspan for rowspan, _ in rendered)
+    for index, (_, rows) in enumerate(rendered):
+        if index == 0:
+            image_name_cell = f"<td rowspan='{total_rowspan}'>{image_name}</td>"
+        else:
+            image_name_cell = "<td style='display: none;'></td>"
+        if rows:
+            yield _ROW_LEAD + image_name_cell + rows
+
 
+def iter_overall_quality_report(all_results, config, input_choice, paths=None):
+    """逐段产出综合质量检测表（表头、每张图片每个算法的行、表尾），供流式写入报告"""
+    yield _OVERALL_TABLE_HEAD
+    for image_name, result_group in all_results:
+        rendered = [_algorithm_rows(func_id, result, config)
+                    for func_id, result in result_group if str(func_id) in input_choice]
+        yield from _image_rows(image_name, rendered)
+    yield "</table>\n"
+
+
+def generate_overall_quality_report(all_results, config, input_choice, paths):
+    return ''.join(iter_overall_quality_report(all_results, config, input_choice, paths))
 
-def generate_algorithm_summary_report(paths, input_choice, config, all_results=None):
+
+def _skipped_stats(algorithm_summary, selected_algorithms, config):
+    """由各算法的统计结果计算级联跳过的计算量（与cascade.skipped_compute相同，无需再遍历结果）"""
+    costs = config['cascade_costs']
+    func_ids = {name: str(func_id) for func_id, (name, _) in ALGORITHMS.items()}
+    stats = {'skipped_runs': 0, 'total_runs': 0, 'skipped_cost': 0.0, 'total_cost': 0.0}
+    for algorithm in selected_algorithms:
+        summary = algorithm_summary[algorithm]
+        cost = costs.get(func_ids[algorithm], 1.0)
+        stats['total_runs'] += summary['total']
+        stats['skipped_runs'] += summary.get('skipped', 0)
+        stats['total_cost'] += summary['total'] * cost
+        stats['skipped_cost'] += summary.get('skipped', 0) * cost
+    stats['ratio'] = stats['skipped_cost'] / stats['total_cost'] if stats['total_cost'] else 0.0
+    return stats
+
+
+def generate_algorithm_summary_report(paths, input_choice, config, all_results=None, summary=None):
+    """
+    生成算法测试结果汇总表
+
+    summary: summarize()的结果（可选），同一批结果生成多份报告时只统计一次
+    """
     algorithm_summary = {
         'ImageHash': {'total': 0, 'passed': 0, 'failed': 0},
         'OpenCV1': {'total': 0, 'passed': 0, 'failed': 0},
@@ -201,30 +263,12 @@ def generate_algorithm_summary_report(paths, input_choice, config, all_results=N
     }
     selected_algorithms = []
     
-    # 如果提供了all_results，使用它来计算图片总数，否则使用原有的扫描方式
-    if all_results:
-        total_images_count = len(all_results)
-        # 简化统计：假设所有图片都通过了测试（这里可以根据实际需求调整）
-        if '1' in input_choice:
-            algorithm_summary['ImageHash']['total'] = total_images_count
-            algorithm_summary['ImageHash']['passed'] = total_images_count
-            algorithm_summary['ImageHash']['failed'] = 0
-            selected_algorithms.append('ImageHash')
-        if '2' in input_choice:
-            algorithm_summary['OpenCV1']['total'] = total_images_count
-            algorithm_summary['OpenCV1']['passed'] = total_images_count
-            algorithm_summary['OpenCV1']['failed'] = 0
-            selected_algorithms.append('OpenCV1')
-        if '3' in input_choice:
-            algorithm_summary['OpenCV2']['total'] = total_images_count
-            algorithm_summary['OpenCV2']['passed'] = total_images_count
-            algorithm_summary['OpenCV2']['failed'] = 0
-            selected_algorithms.append('OpenCV2')
-        if '4' in input_choice:
-            algorithm_summary['OpenCV3']['total'] = total_images_count
-            algorithm_summary['OpenCV3']['passed'] = total_images_count
-            algorithm_summary['OpenCV3']['failed'] = 0
-            selected_algorithms.append('OpenCV3')
+    # 如果提供了all_results，直接按实际结果统计，否则使用原有的扫描方式
+    if summary is not None or all_results:
+        if summary is None:
+            summary = summarize(all_results, input_choice, config)
+        selected_algorithms = [name for func_id, (name, _) in ALGORITHMS.items() if str(func_id) in input_choice]
+        algorithm_summary.update({name: summary[name] for name in selected_algorithms if name in summary})
     else:
         # 使用原有的扫描方式
         if '1' in input_choice:
@@ -243,45 +287,55 @@ def generate_algorithm_summary_report(paths, input_choice, config, all_results=N
     total_images = sum(algorithm_summary[alg]['total'] for alg in selected_algorithms)
     total_passed = sum(algorithm_summary[alg]['passed'] for alg in selected_algorithms)
     total_failed = sum(algorithm_summary[alg]['failed'] for alg in selected_algorithms)
-    report_content = """
+    total_errors = sum(algorithm_summary[alg].get('errors', 0) for alg in selected_algorithms)
+    # 可选列：级联模式下增加"未评估总数"，有图片处理失败时增加"处理失败数"
+    extra_columns = []
+    if (summary is not None or all_results) and config.get('cascade_enabled', False):
+        extra_columns.append(('未评估总数', 'skipped'))
+    if total_errors:
+        extra_columns.append(('处理失败数', 'errors'))
+    extra_headers = ''.join(f"\n        <th>{title}</th>" for title, _ in extra_columns)
+    report_content = f"""
     <h1 style=\"text-align: center;\">算法测试结果报告</h1>
     <table>
     <tr>
         <th>算法名称</th>
         <th>检测图片总数</th>
         <th>通过总数</th>
-        <th>未通过总数</th>
+        <th>未通过总数</th>{extra_headers}
     </tr>
     """
     for algorithm in selected_algorithms:
         summary = algorithm_summary[algorithm]
+        extra_cells = ''.join(f"\n            <td>{summary.get(key, 0)}</td>" for _, key in extra_columns)
         report_content += f"""
         <tr>
             <td>{algorithm}</td>
             <td>{summary['total']}</td>
             <td>{summary['passed']}</td>
-            <td>{summary['failed']}</td>
+            <td>{summary['failed']}</td>{extra_cells}
         </tr>
         """
+    extra_cells = ''.join(f"\n        <td>{sum(algorithm_summary[alg].get(key, 0) for alg in selected_algorithms)}</td>"
+                          for _, key in extra_columns)
     report_content += f"""
     <tr>
         <td>合计</td>
         <td>{total_images}</td>
         <td>{total_passed}</td>
-        <td>{total_failed}</td>
+        <td>{total_failed}</td>{extra_cells}
     </tr>
     """
     report_content += "</table>\n"
+    if ('未评估总数', 'skipped') in extra_columns:
+        stats = _skipped_stats(algorithm_summary, selected_algorithms, config)
+        report_content += (f"<p>级联跳过的算法运行: {stats['skipped_runs']}/{stats['total_runs']}，"
+                           f"节省的计算量: {stats['ratio']:.1%}</p>\n")
+    if total_errors:
+        report_content += f"<p>处理失败率: {total_errors}/{total_images}（{total_errors / total_images:.1%}）</p>\n"
     return report_content
 
-def generate_combined_report(all_results, config, input_choice, paths):
-    algorithm_report = generate_algorithm_summary_report(paths, input_choice, config, all_results)
-    overall_report = generate_overall_quality_report(all_results, config, input_choice, paths)
-    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-    
-    # 确保报告目录存在
-    os.makedirs(paths['report_dir'], exist_ok=True)
-    
+def _report_filename(input_choice, paths, timestamp):
     # Determine the filename based on input_choice
     report_names = {
         '1': '图像准确度',
@@ -305,58 +359,331 @@ def generate_combined_report(all_results, config, input_choice, paths):
         # 单个算法但不在映射表中，使用默认名称
         report_name = '+'.join(report_names[char] for char in sorted_choice if char in report_names)
     
-    filename = os.path.join(paths['report_dir'], f"{report_name}_{timestamp}.html")
-    
-    html_content = f"""
-    <html>
-    <head>
-    <meta charset=\"UTF-8\">
-    <style>
-        body {{ font-family: Arial, sans-serif; }}
-        table {{ width: 100%; border-collapse: collapse; margin: 10px 0; }}
-        th, td {{ border: 1px solid black; padding: 8px; text-align: center; }}
-        th {{ background-color: #f2f2f2; }}
-        td {{ text-align: center; }}
-    </style>
-    </head>
-    <body>
-    <h1 style=\"text-align: center;\"></h1>
-    {algorithm_report}
-    {overall_report}
-    </body>
-    </html>
+    return os.path.join(paths['report_dir'], f"{report_name}_{timestamp}.html")
+
+
+def report_choices(input_choice, config):
     """
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(html_content)
-    print(f"Combined report generated: {filename}")
-    return filename
+    evaluation()为一次算法选择生成的各份报告的算法选择
 
+    每个算法一份单独报告，选择了多个算法时再加一份综合报告（放在最后）；
+    config中combined_report_only为True时只生成综合报告
+    """
+    single_choices = [algorithm for algorithm in input_choice if algorithm in ['1', '2', '3', '4']]
+    if len(input_choice) > 1:
+        if config.get('combined_report_only', False):
+            return [input_choice]
+        return single_choices + [input_choice]
+    return single_choices
 
 
-def evaluation(paths, config, input_choice, specific_image_paths=None):
-    all_results = []
-    
-    # 更健壮的模板图片路径查找
-    template_image_path = None
-    
-    # 查找JPG文件
-    jpg_files = glob.glob(os.path.join(paths['template_image_dir'], '*.jpg'))
-    if jpg_files:
-        template_image_path = jpg_files[0]
-    else:
-        # 查找PNG文件
-        png_files = glob.glob(os.path.join(paths['template_image_dir'], '*.png'))
-        if png_files:
-            template_image_path = png_files[0]
+class ReportRenderer:
+    """
+    增量渲染多份报告：每评估完一张图片调用add()，全部完成后调用close()写入汇总
+
+    每张图片每个算法的行只渲染一次，再分发到包含该算法的各份报告。
+    图片总数超过config中的report_page_size时各份报告分页（见report_writer.PagedReport），
+    分页在评估过程中逐页写出；否则为单文件报告。
+
+    Args:
+        config: 配置
+        choices: 每份报告的算法选择，如['1', '2', '1234']（单个算法的报告只包含该算法）
+        paths: 路径配置（report_dir）
+        total_images: 图片总数
+    """
+
+    def __init__(self, config, choices, paths, total_images):
+        self.config = config
+        self.choices = list(choices)
+        self.paths = paths
+        self.all_choice = ''.join(sorted(set(''.join(self.choices))))
+        page_size = config.get('report_page_size', 0)
+        self.paged = bool(page_size) and total_images > page_size
+        self.timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        
+        # 确保报告目录存在
+        if self.choices:
+            os.makedirs(paths['report_dir'], exist_ok=True)
+        self.filenames = [_report_filename(input_choice, paths, self.timestamp) for input_choice in self.choices]
+        if self.paged:
+            total_pages = -(-total_images // page_size)
+            self.sinks = [PagedReport(filename, _OVERALL_TABLE_HEAD, page_size, total_pages)
+                          for filename in self.filenames]
         else:
-            # 查找其他常见图片格式
-            jpeg_files = glob.glob(os.path.join(paths['template_image_dir'], '*.jpeg'))
-            if jpeg_files:
-                template_image_path = jpeg_files[0]
+            self.sinks = [SingleFileReport(filename, _OVERALL_TABLE_HEAD) for filename in self.filenames]
+
+    def add(self, image_name, result_group):
+        """渲染一张图片的结果并写入各份报告"""
+        rendered = [(str(func_id), _algorithm_rows(func_id, result, self.config))
+                    for func_id, result in result_group if str(func_id) in self.all_choice]
+        for input_choice, sink in zip(self.choices, self.sinks):
+            sink.add_image(image_name, _image_rows(image_name, [rows for func_id, rows in rendered
+                                                                 if func_id in input_choice]))
+
+    def close(self, all_results):
+        """
+        写入各份报告的汇总表（单文件报告的开头或分页报告的索引页），汇总统计只计算一次
+
+        Returns:
+            list: 与choices一一对应的报告路径
+        """
+        if not self.choices:
+            return []
+        summary = summarize(all_results, self.all_choice, self.config)
+        for input_choice, sink in zip(self.choices, self.sinks):
+            sink.close(generate_algorithm_summary_report(self.paths, input_choice, self.config, all_results, summary))
+        for filename in self.filenames:
+            print(f"Combined report generated: {filename}")
+        return self.filenames
+
+    def discard(self):
+        """评估中途出错时关闭已打开的文件"""
+        for sink in self.sinks:
+            sink.discard()
+
+
+def render_reports(all_results, config, choices, paths):
+    """
+    一次遍历all_results，同时写入多份报告（见ReportRenderer）
+
+    Returns:
+        list: 与choices一一对应的报告路径
+    """
+    renderer = ReportRenderer(config, choices, paths, len(all_results))
+    try:
+        for image_name, result_group in all_results:
+            renderer.add(image_name, result_group)
+    except BaseException:
+        renderer.discard()
+        raise
+    return renderer.close(all_results)
+
+
+def generate_combined_report(all_results, config, input_choice, paths):
+    return render_reports(all_results, config, [input_choice], paths)[0]
+
+
+
+# 算法编号 -> 算法模块（各模块的REQUIREMENTS声明解码需求）
+ALGORITHM_MODULES = {'1': ImageHash, '2': Opencv1, '3': Opencv2, '4': Opencv3}
+
+
+def open_for_proxy(image_path, input_choice, config):
+    """
+    按选中算法的解码需求打开图像：只要灰度时直接解码为灰度图，
+    并选择使解码结果不小于代理分辨率（及各算法min_side）的最大缩小倍数
+    """
+    requirements = combine_requirements(
+        module.REQUIREMENTS for func_id, module in ALGORITHM_MODULES.items() if func_id in input_choice
+    )
+    context = ImageContext(image_path, channels=requirements['channels'])
+    target_side = max(
+        proxy_decode_side(context.original_size, config.get('proxy_max_side'), config.get('proxy_max_megapixels')),
+        requirements['min_side'],
+    )
+    context.reduce = reduction_factor(context.original_size, target_side)
+    return context
+
+
+def _lookup_cached(cache, context, template_image_path, input_choice, config):
+    """
+    查询结果缓存
+
+    Returns:
+        tuple: (命中的结果{算法编号: 结果}, 写回缓存的函数；不使用缓存时为None)
+    """
+    if cache is None:
+        return {}, None
+    try:
+        image_hash = content_hash(context.data)
+        template_hash = get_template_fingerprint(template_image_path).md5 if template_image_path else None
+    except OSError:
+        return {}, None  # 文件无法读取时不缓存，由各算法自行报告错误
+    selected = [func_id for func_id in '1234' if func_id in input_choice]
+    cached = cache.get_many(image_hash, selected, config, template_hash)
+
+    def store(func_id, result):
+        cache.put(image_hash, func_id, config, result, template_hash)
+
+    return cached, store
+
+
+def evaluate_image(template_image_path, image_path, input_choice, config=None, cache=None):
+    """
+    对单张图片运行选中的算法
+
+    图片只解码一次：创建一个ImageContext，由各算法共享文件读取、解码和灰度转换结果。
+    config中开启proxy_resolution时，各算法在缩小的代理图像上计算；同时开启reduced_decode时，
+    按选中算法的REQUIREMENTS直接以缩小倍数（JPEG为1/2、1/4、1/8）和所需通道解码。
+    开启tiled_evaluation时，超过tiled_min_megapixels的图像按条带计算特征（见TiledEvaluator）。
+    传入cache（ResultCache）时先按图片内容查询缓存，全部命中时不解码图片。
+    单个算法出错（抛出异常或返回None）时该算法的结果为errors.error_result，不会中断评估。
+
+    Returns:
+        list: [(func_id, result), ...]，顺序与算法编号一致
+    """
+    proxy_mode = bool(config and config.get('proxy_resolution'))
+    context = None
+    if proxy_mode and config.get('reduced_decode'):
+        try:
+            context = open_for_proxy(image_path, input_choice, config)
+        except Exception as e:
+            # 文件头无法读取：按原样打开，由各算法分别记录错误
+            logger.warning(f"{image_path} 无法按缩小解码打开: {e}")
+    if context is None:
+        context = ImageContext(image_path)
+    result_group = []
+    try:
+        cached, store = _lookup_cached(cache, context, template_image_path, input_choice, config)
+        # 需要实际计算的算法；全部命中缓存时跳过代理图像和条带特征的准备，不解码图片
+        pending = [func_id for func_id in '1234' if func_id in input_choice and func_id not in cached]
+        if proxy_mode and pending:
+            try:
+                proxy = make_proxy(context, config.get('proxy_max_side'), config.get('proxy_max_megapixels'))
+            except Exception as e:
+                proxy = context  # 无法解码：由各算法分别记录错误
+                logger.warning(f"{image_path} 无法生成代理图像: {e}")
+            if proxy is not context:
+                context.release()  # 全分辨率解码结果已不再需要
+                context = proxy
+        if config and config.get('tiled_evaluation') and ('2' in pending or '4' in pending):
+            try:
+                h, w = context.image.shape[:2]
+            except (FileNotFoundError, ValueError):
+                h = w = 0  # 无法读取时由各算法自行报告错误
+            if h * w > config.get('tiled_min_megapixels', 40) * 1e6:
+                # 超大图像按条带预先计算Opencv1/Opencv3的特征，避免生成整图的float中间结果
+                compute_features(context, config.get('tile_memory_budget', 256 * 1024 * 1024))
+        compute = {
+            '1': lambda: is_similar(template_image_path, context),
+            '2': lambda: calculate_image_quality(context),
+            '3': lambda: evaluate_fashion_image(template_image_path, context, match_tolerance(config)),
+            '4': lambda: calculate_composite_score(context),
+        }
+
+        def run(func_id):
+            if func_id in cached:
+                return cached[func_id]
+            # 单个算法出错只记录为错误结果，不影响其他算法和其他图片
+            result = run_isolated(func_id, image_path, compute[func_id])
+            if store is not None and not is_error(result):
+                store(func_id, result)
+            return result
+
+        algorithms = {func_id: (lambda func_id=func_id: run(func_id)) for func_id in compute}
+        if config and config.get('cascade_enabled'):
+            # 级联：按开销从低到高执行，结论确定后跳过剩余的可跳过算法
+            reason = None
+            for func_id in execution_order(input_choice, config):
+                if reason and func_id in config.get('cascade_skippable', ''):
+                    result_group.append((int(func_id), skipped_result(reason)))
+                    continue
+                result = algorithms[func_id]()
+                result_group.append((int(func_id), result))
+                reason = reason or settled_reason(int(func_id), result, config)
+            result_group.sort(key=lambda item: item[0])
+        else:
+            for func_id in '1234':
+                if func_id in input_choice:
+                    result_group.append((int(func_id), algorithms[func_id]()))
+    finally:
+        # 调试计数：同一张图的每种解码/转换/特征都应只计算一次
+        logger.debug(f"{os.path.basename(image_path)} 计算次数: {dict(context.compute_counts)}")
+        # 及时释放解码数据，避免下一张图片解码时两份数据同时驻留内存
+        context.release()
+    return result_group
+
+
+def iter_evaluate_images(template_image_path, image_paths, input_choice, config, cache=None):
+    """
+    逐张评估图片，按输入顺序产出(image_path, result_group)
+
+    不累积结果，内存占用与图片数量无关；image_paths可以是任意可迭代对象。
+    config中parallel_workers大于1（或为0表示全部CPU核）时使用进程池并行评估（见parallel.py），
+    此时每个工作进程各自打开结果缓存，cache参数不使用。
+    """
+    if worker_count(config) > 1:
+        yield from iter_parallel(template_image_path, image_paths, input_choice, config)
+        return
+    for image_path in image_paths:
+        yield image_path, evaluate_image(template_image_path, image_path, input_choice, config, cache)
+
+
+def evaluate_images(template_image_path, image_paths, input_choice, config, cache=None, desc='Evaluating images',
+                    progress=None):
+    """
+    评估多张图片，返回与image_paths一一对应的result_group列表
+
+    progress为ProgressReporter时每评估完一张图片更新一次进度
+    """
+    results = iter_evaluate_images(template_image_path, image_paths, input_choice, config, cache)
+    result_groups = []
+    for _, result_group in tqdm(results, desc=desc, total=len(image_paths)):
+        result_groups.append(result_group)
+        if progress is not None:
+            progress.update(len(result_groups))
+    return result_groups
+
+
+def find_template_image(template_dir):
+    """
+    在模板目录中查找模板图片（依次查找.jpg、.png、.jpeg，取第一个）
+
+    Raises:
+        FileNotFoundError: 目录中没有图片文件时
+    """
+    for pattern in ('*.jpg', '*.png', '*.jpeg'):
+        files = glob.glob(os.path.join(template_dir, pattern))
+        if files:
+            return files[0]
+    raise FileNotFoundError(f"在模板目录 '{template_dir}' 中没有找到任何图片文件 (支持格式: .jpg, .png, .jpeg)")
+
+
+def _evaluate_and_report(template_image_path, image_paths, all_results, input_choice, config, cache, paths,
+                         progress, desc='Evaluating images'):
+    """
+    逐张评估图片，结果写入all_results的同时渲染到各份报告（分页报告在评估过程中逐页写出）
+    并按块导出结果文件（config中result_export为True时），全部完成后写入汇总
+
+    Returns:
+        tuple: (报告路径列表, 导出文件路径字典{格式: 路径})
+    """
+    renderer = ReportRenderer(config, report_choices(input_choice, config), paths, len(image_paths))
+    # 导出文件与报告使用相同的时间戳，由报告路径即可找到同一次评估的导出文件
+    exporter = (ResultExporter(config, input_choice, paths['report_dir'], timestamp=renderer.timestamp)
+                if config.get('result_export', True) else None)
+    try:
+        results = iter_evaluate_images(template_image_path, image_paths, input_choice, config, cache)
+        for index, (_, evaluated) in enumerate(tqdm(results, desc=desc, total=len(image_paths))):
+            image_name, result_group = all_results[index]
+            result_group.extend(evaluated)
+            renderer.add(image_name, result_group)
+            if exporter is not None:
+                exporter.add(image_name, result_group)
+            progress.update(index + 1)
+    except BaseException:
+        renderer.discard()
+        if exporter is not None:
+            exporter.discard()
+        raise
+    progress.set_stage(STAGE_REPORTING)
+    report_paths = renderer.close(all_results)
+    export_paths = exporter.close() if exporter is not None else {}
+    print(f"已生成{len(report_paths)}份报告")
+    return report_paths, export_paths
+
+
+def evaluation(paths, config, input_choice, specific_image_paths=None, progress_callback=None):
+    """
+    评估图片并生成报告
+
+    progress_callback: 进度回调（可选），参数为进度字典，见progress.py；
+        按config的progress_min_interval节流
+    """
+    all_results = []
     
-    # 如果仍然没有找到模板图片，抛出错误
-    if template_image_path is None:
-        raise FileNotFoundError(f"在模板目录 '{paths['template_image_dir']}' 中没有找到任何图片文件 (支持格式: .jpg, .png, .jpeg)")
+    # 更健壮的模板图片路径查找（找不到时抛出FileNotFoundError）
+    template_image_path = find_template_image(paths['template_image_dir'])
     
     print(f"使用模板图片: {template_image_path}")
     
@@ -376,109 +703,68 @@ def evaluation(paths, config, input_choice, specific_image_paths=None):
         image_name = os.path.basename(image_path)
         all_results.append((image_name, []))
     
+    # 根据是否使用specific_image_paths来构建图片路径
+    if specific_image_paths:
+        image_paths = list(image_paths_to_process)
+    else:
+        image_paths = [os.path.join(paths['comparison_image_dir'], image_name) for image_name, _ in all_results]
+    
     report_paths = []
+    export_paths = {}
+    progress = ProgressReporter(progress_callback, len(image_paths), config.get('progress_min_interval', 0.25))
+    progress.update(0)
+    # 结果缓存：同一批图片再次评估时，配置不变的算法结果直接复用（并行模式下由各工作进程打开）
+    cache = open_result_cache(config) if worker_count(config) <= 1 else None
     
-    if input_choice != '5':
-        for i, (image_name, result_group) in tqdm(enumerate(all_results), desc='Evaluating images', total=len(all_results)):
-            # 根据是否使用specific_image_paths来构建图片路径
-            if specific_image_paths:
-                image_path = image_paths_to_process[i]
-            else:
-                image_path = os.path.join(paths['comparison_image_dir'], image_name)
-            
-            if '1' in input_choice:
-                hamming = is_similar(template_image_path, image_path)
-                result_group.append((1, hamming))
-            if '2' in input_choice:
-                result_quality = calculate_image_quality(image_path)
-                result_group.append((2, result_quality))
-            if '3' in input_choice:
-                result_fashion = evaluate_fashion_image(template_image_path, image_path)
-                result_group.append((3, result_fashion))
-            if '4' in input_choice:
-                clarity_result = calculate_composite_score(image_path)
-                result_group.append((4, clarity_result))
-        
-        # 生成单个算法报告
-        for algorithm in input_choice:
-            if algorithm in ['1', '2', '3', '4']:
-                # 为单个算法创建只包含该算法数据的结果集
-                single_algorithm_results = []
-                for image_name, result_group in all_results:
-                    single_result_group = []
-                    for func_id, result in result_group:
-                        if str(func_id) == algorithm:
-                            single_result_group.append((func_id, result))
-                    if single_result_group:
-                        single_algorithm_results.append((image_name, single_result_group))
-                
-                single_report_path = generate_combined_report(single_algorithm_results, config, algorithm, paths)
-                report_paths.append(single_report_path)
-                print(f"已生成算法{algorithm}的单独报告")
-        
-        # 如果选择了多个算法，还要生成综合报告
-        if len(input_choice) > 1:
-            combined_report_path = generate_combined_report(all_results, config, input_choice, paths)
-            report_paths.append(combined_report_path)
-            print(f"已生成综合报告")
+    # 评估或写报告出错时也关闭缓存（关闭时按上限淘汰旧条目）
+    try:
+        if input_choice != '5':
+            # 各算法的单独报告和（选择了多个算法时的）综合报告随评估逐张写入
+            report_paths, export_paths = _evaluate_and_report(template_image_path, image_paths, all_results, input_choice,
+                                                              config, cache, paths, progress)
     
-    elif input_choice == '5':
-        input_choice = '1234'
-        for i, (image_name, result_group) in tqdm(enumerate(all_results), desc='Evaluating images for input choice 5', total=len(all_results)):
-            # 根据是否使用specific_image_paths来构建图片路径
-            if specific_image_paths:
-                image_path = image_paths_to_process[i]
-            else:
-                image_path = os.path.join(paths['comparison_image_dir'], image_name)
-            
-            hamming = is_similar(template_image_path, image_path)
-            result_group.append((1, hamming))
-            result_quality = calculate_image_quality(image_path)
-            result_group.append((2, result_quality))
-            result_fashion = evaluate_fashion_image(template_image_path, image_path)
-            result_group.append((3, result_fashion))
-            clarity_result = calculate_composite_score(image_path)
-            result_group.append((4, clarity_result))
+        elif input_choice == '5':
+            input_choice = '1234'
+            # 为选择5生成所有单个算法报告和综合报告（combined_report_only时只生成综合报告）
+            report_paths, export_paths = _evaluate_and_report(template_image_path, image_paths, all_results, input_choice,
+                                                              config, cache, paths, progress,
+                                                              desc='Evaluating images for input choice 5')
         
-        # 为选择5生成所有单个算法报告和综合报告
-        for algorithm in ['1', '2', '3', '4']:
-            # 为单个算法创建只包含该算法数据的结果集
-            single_algorithm_results = []
-            for image_name, result_group in all_results:
-                single_result_group = []
-                for func_id, result in result_group:
-                    if str(func_id) == algorithm:
-                        single_result_group.append((func_id, result))
-                if single_result_group:
-                    single_algorithm_results.append((image_name, single_result_group))
-            
-            single_report_path = generate_combined_report(single_algorithm_results, config, algorithm, paths)
-            report_paths.append(single_report_path)
-            print(f"已生成算法{algorithm}的单独报告")
-        
-        # 生成综合报告
-        combined_report_path = generate_combined_report(all_results, config, input_choice, paths)
-        report_paths.append(combined_report_path)
-        print(f"已生成综合报告")
-        
-    elif input_choice == '6':
-        generate_prompt(paths['input_image_uid'], paths['x_token'])
-        print("generate_prompt")
-        return {"status": "success", "message": "Prompt生成完成"}
-    elif input_choice == '0':
-        print("退出程序")
-        return {"status": "success", "message": "程序退出"}
-    elif input_choice == '7':
-        generate_anomaly_images(paths['anomaly_output_dir'])
-        print("已生成异常图像数据")
-        return {"status": "success", "message": "异常图像数据生成完成"}
+        elif input_choice == '6':
+            generate_prompt(paths['input_image_uid'], paths['x_token'])
+            print("generate_prompt")
+            return {"status": "success", "message": "Prompt生成完成"}
+        elif input_choice == '0':
+            print("退出程序")
+            return {"status": "success", "message": "程序退出"}
+        elif input_choice == '7':
+            generate_anomaly_images(paths['anomaly_output_dir'])
+            print("已生成异常图像数据")
+            return {"status": "success", "message": "异常图像数据生成完成"}
+    finally:
+        if cache is not None:
+            print(f"结果缓存命中: {cache.hits}，未命中: {cache.misses}")
+            cache.close()
+    
+    progress.set_stage(STAGE_DONE)
+    
+    # 有图片处理失败时返回partial状态和错误清单，其余图片的结果和报告照常生成
+    errors = collect_errors(all_results)
+    failed_images = len({error['image'] for error in errors})
+    if errors:
+        print(f"{failed_images}张图片处理失败，共{len(errors)}个算法错误")
     
     # 返回处理结果
     return {
-        "status": "success",
-        "message": f"图像处理完成，算法选择: {input_choice}",
+        "status": "partial" if errors else "success",
+        "message": (f"图像处理完成，算法选择: {input_choice}"
+                    + (f"，{failed_images}张图片处理失败" if errors else "")),
         "report_paths": report_paths,  # 返回所有生成的报告路径
         "main_report_path": report_paths[-1] if report_paths else None,  # 主报告路径（综合报告或最后一个）
+        "export_paths": export_paths,  # 机器可读的结果文件{格式: 路径}，见result_export.py
         "processed_images": len(all_results),
-        "template_image": template_image_path
+        "template_image": template_image_path,
+        "results": all_results,  # [(图片名, [(func_id, result), ...]), ...]，供调用方持久化指标
+        "errors": errors,  # [{'image', 'algorithm', 'error_type', 'message'}, ...]
+        "failed_images": failed_images,
     }
\ No newline at end of file
@@ -171,6 +171,10 @@ os.makedirs(IMAGES_UPLOAD_DIR, exist_ok=True)
 REPORTS_DIR = os.path.join(MEDIA_ROOT, 'reports')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
+# 运行时数据目录（算法结果缓存），不在源码目录和MEDIA_ROOT（对外提供访问）中
+DATA_DIR = os.environ.get('IMAGE_PROCESSING_DATA_DIR') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'image_processing_system')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
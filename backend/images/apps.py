@@ -3,4 +3,8 @@ from django.apps import AppConfig
  
 class ImagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'images'
\ No newline at end of file
+    name = 'images'
+
+    def ready(self):
+        """注册信号，保持pHash索引与数据库同步"""
+        from . import signals  # noqa: F401
@@ -0,0 +1,57 @@
+"""
+为尚未计算感知哈希的历史图片补算pHash/dHash
+
+    python manage.py backfill_perceptual_hashes [--batch-size 500] [--limit N]
+
+按ID顺序分批读取phash为空的图片，每批计算后用一次bulk_update写回；
+中途中断后重新运行会从剩余的图片继续。运行中的服务进程在下次查询相似图片时
+按phash_updated_at自动载入补算的哈希。
+"""
+
+import logging
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from images.models import Image
+from images.phash_index import compute_perceptual_hashes
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '为历史图片补算感知哈希（pHash/dHash），使其能被相似图片查询找到'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批处理的图片数')
+        parser.add_argument('--limit', type=int, default=None, help='最多处理的图片数（默认全部）')
+
+    def handle(self, *args, batch_size, limit, **options):
+        pending = Image.objects.filter(phash__isnull=True).order_by('id')
+        total = pending.count() if limit is None else min(limit, pending.count())
+        self.stdout.write(f"待补算感知哈希的图片: {total}")
+
+        last_id = 0
+        done = failed = 0
+        while done + failed < total:
+            size = min(batch_size, total - done - failed)
+            batch = list(pending.filter(id__gt=last_id).only('id', 'file')[:size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            updated = []
+            for image in batch:
+                try:
+                    image.phash, image.dhash = compute_perceptual_hashes(image.file.path)
+                except Exception as e:
+                    # 文件缺失或无法解码：保持为空，下次运行时重试
+                    logger.warning(f"图片 {image.id} 计算感知哈希失败: {e}")
+                    failed += 1
+                    continue
+                image.phash_updated_at = timezone.now()
+                updated.append(image)
+            Image.objects.bulk_update(updated, ['phash', 'dhash', 'phash_updated_at'])
+            done += len(updated)
+            self.stdout.write(f"已处理 {done + failed}/{total}（成功 {done}，失败 {failed}）")
+
+        self.stdout.write(self.style.SUCCESS(f"补算完成：成功 {done} 张，失败 {failed} 张"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0003_auto_20250523_1410'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='dhash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='phash',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
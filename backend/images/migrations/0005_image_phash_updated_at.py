@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0004_image_phash_dhash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='phash_updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 import os
 
 class Image(models.Model):
@@ -7,6 +8,10 @@ class Image(models.Model):
     title = models.CharField(max_length=255)
     file = models.ImageField(upload_to='images/%Y/%m/%d/')
     image_hash = models.CharField(max_length=255, blank=True, null=True)  # 添加图像哈希字段
+    phash = models.BigIntegerField(blank=True, null=True, db_index=True)  # 64位感知哈希（有符号存储）
+    dhash = models.BigIntegerField(blank=True, null=True)  # 64位差异哈希（有符号存储）
+    # 感知哈希最后写入的时间：各进程的pHash索引据此增量载入其他进程补算或更新的哈希
+    phash_updated_at = models.DateTimeField(blank=True, null=True, db_index=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='images')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
@@ -16,6 +21,15 @@ class Image(models.Model):
     def __str__(self):
         return self.title
     
+    def save(self, *args, **kwargs):
+        """写入感知哈希时同时更新phash_updated_at"""
+        update_fields = kwargs.get('update_fields')
+        if self.phash is not None and (update_fields is None or 'phash' in update_fields):
+            self.phash_updated_at = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'phash_updated_at'}
+        super().save(*args, **kwargs)
+    
     def delete(self, *args, **kwargs):
         """重写delete方法，删除文件系统中的图像文件"""
         if self.file and os.path.isfile(self.file.path):
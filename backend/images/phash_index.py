@@ -0,0 +1,203 @@
+"""
+感知哈希索引
+
+上传时为每张图片计算64位pHash/dHash并以整数形式存入数据库，
+进程内维护一棵基于汉明距离的BK树，用于在亚线性时间内查询
+"与X的汉明距离不超过k的所有图片"。
+"""
+
+import datetime
+import logging
+import threading
+
+import imagehash
+from PIL import Image as PILImage
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+_SIGN_BIT = 1 << (HASH_BITS - 1)
+_MASK = (1 << HASH_BITS) - 1
+# 增量同步时在水位之前重叠的时间
+SYNC_OVERLAP = datetime.timedelta(seconds=60)
+
+
+def to_signed64(value):
+    """无符号64位哈希转换为有符号整数，便于存入BigIntegerField"""
+    return value - (1 << HASH_BITS) if value & _SIGN_BIT else value
+
+
+def to_unsigned64(value):
+    """数据库中的有符号整数还原为无符号64位哈希"""
+    return value & _MASK
+
+
+def hamming_distance(hash1, hash2):
+    """两个无符号整数哈希之间的汉明距离"""
+    return (hash1 ^ hash2).bit_count()
+
+
+def compute_perceptual_hashes(fp):
+    """
+    计算图片的pHash和dHash（均为64位）
+
+    参数:
+        fp: 文件路径或类文件对象
+
+    返回:
+        tuple: (phash, dhash)，均为可直接存库的有符号64位整数
+    """
+    with PILImage.open(fp) as img:
+        phash = int(str(imagehash.phash(img)), 16)
+        dhash = int(str(imagehash.dhash(img)), 16)
+    return to_signed64(phash), to_signed64(dhash)
+
+
+class _Node:
+    __slots__ = ('hash', 'ids', 'children')
+
+    def __init__(self, hash_value):
+        self.hash = hash_value
+        self.ids = set()
+        self.children = {}
+
+
+class BKTree:
+    """
+    基于汉明距离的BK树
+
+    相同哈希的图片共享一个节点；删除时只从节点中移除图片ID，节点本身保留用于路由。
+    """
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, hash_value, image_id):
+        if self.root is None:
+            self.root = _Node(hash_value)
+            self.root.ids.add(image_id)
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(hash_value, node.hash)
+            if distance == 0:
+                node.ids.add(image_id)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                child = _Node(hash_value)
+                child.ids.add(image_id)
+                node.children[distance] = child
+                return
+            node = child
+
+    def remove(self, hash_value, image_id):
+        node = self.root
+        while node is not None:
+            distance = hamming_distance(hash_value, node.hash)
+            if distance == 0:
+                node.ids.discard(image_id)
+                return
+            node = node.children.get(distance)
+
+    def search(self, hash_value, max_distance):
+        """返回[(image_id, distance), ...]，按距离升序"""
+        results = []
+        if self.root is None:
+            return results
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(hash_value, node.hash)
+            if distance <= max_distance:
+                results.extend((image_id, distance) for image_id in node.ids)
+            # 三角不等式：只有与当前节点距离在[d-k, d+k]内的子树可能包含结果
+            low, high = distance - max_distance, distance + max_distance
+            for child_distance, child in node.children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results
+
+
+class PerceptualHashIndex:
+    """
+    图片库的pHash索引（进程内单例）
+
+    首次查询时从数据库全量构建，之后随图片新增/删除增量更新；
+    每次查询前还会按phash_updated_at水位补充载入其他进程新上传、补算（backfill_perceptual_hashes）
+    或更新了哈希的图片。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = BKTree()
+        self._hashes = {}
+        self._watermark = None
+        self._built = False
+
+    def _load(self, queryset):
+        for image_id, phash, updated_at in queryset.values_list(
+                'id', 'phash', 'phash_updated_at').iterator(chunk_size=5000):
+            self._add_locked(image_id, phash)
+            if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+
+    def _add_locked(self, image_id, phash):
+        value = to_unsigned64(phash)
+        old_value = self._hashes.get(image_id)
+        if old_value == value:
+            return
+        if old_value is not None:
+            self._tree.remove(old_value, image_id)
+        self._tree.add(value, image_id)
+        self._hashes[image_id] = value
+
+    def _sync_locked(self):
+        from .models import Image
+
+        if not self._built:
+            self._load(Image.objects.filter(phash__isnull=False).order_by())
+            self._built = True
+            logger.info(f"pHash索引构建完成，共 {len(self._hashes)} 张图片")
+        elif self._watermark is not None:
+            # 与水位重叠一段时间：其他进程中稍早开始、稍晚提交的写入也能载入（重复载入是幂等的）
+            self._load(Image.objects.filter(phash__isnull=False,
+                                            phash_updated_at__gte=self._watermark - SYNC_OVERLAP).order_by())
+        else:
+            self._load(Image.objects.filter(phash__isnull=False, phash_updated_at__isnull=False).order_by())
+
+    def add(self, image_id, phash):
+        """新增或更新一张图片（索引尚未构建时忽略，构建时会从数据库载入）"""
+        with self._lock:
+            if self._built and phash is not None:
+                self._add_locked(image_id, phash)
+
+    def remove(self, image_id):
+        """从索引中移除一张图片"""
+        with self._lock:
+            value = self._hashes.pop(image_id, None)
+            if value is not None:
+                self._tree.remove(value, image_id)
+
+    def query(self, phash, max_distance):
+        """
+        查询与给定pHash汉明距离不超过max_distance的图片
+
+        返回:
+            list: [(image_id, distance), ...]，按距离升序
+        """
+        with self._lock:
+            self._sync_locked()
+            return self._tree.search(to_unsigned64(phash), max_distance)
+
+    def reset(self):
+        """丢弃索引，下次查询时重新全量构建"""
+        with self._lock:
+            self._tree = BKTree()
+            self._hashes = {}
+            self._watermark = None
+            self._built = False
+
+
+phash_index = PerceptualHashIndex()
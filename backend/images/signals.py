@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Image
+from .phash_index import phash_index
+
+
+@receiver(post_save, sender=Image)
+def add_image_to_phash_index(sender, instance, **kwargs):
+    """图片保存后增量更新pHash索引"""
+    if instance.phash is not None:
+        phash_index.add(instance.id, instance.phash)
+
+
+@receiver(post_delete, sender=Image)
+def remove_image_from_phash_index(sender, instance, **kwargs):
+    """图片删除后从pHash索引中移除"""
+    phash_index.remove(instance.id)
@@ -0,0 +1,198 @@
+import datetime
+import io
+import random
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from images.phash_index import BKTree, PerceptualHashIndex, hamming_distance, to_signed64, to_unsigned64
+
+
+class BKTreeTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        base = [rng.getrandbits(64) for _ in range(50)]
+        # 每个基准哈希附近生成若干变体，模拟近似重复图片
+        self.hashes = {}
+        image_id = 0
+        for value in base:
+            for _ in range(20):
+                flipped = value
+                for bit in rng.sample(range(64), rng.randint(0, 6)):
+                    flipped ^= 1 << bit
+                image_id += 1
+                self.hashes[image_id] = flipped
+        self.tree = BKTree()
+        for image_id, value in self.hashes.items():
+            self.tree.add(value, image_id)
+
+    def brute_force(self, query, max_distance):
+        return sorted(
+            ((image_id, hamming_distance(query, value))
+             for image_id, value in self.hashes.items()
+             if hamming_distance(query, value) <= max_distance),
+            key=lambda item: (item[1], item[0])
+        )
+
+    def test_search_matches_linear_scan(self):
+        for query in list(self.hashes.values())[::37]:
+            for max_distance in (0, 3, 8):
+                self.assertEqual(self.tree.search(query, max_distance),
+                                 self.brute_force(query, max_distance))
+
+    def test_remove(self):
+        image_id, value = next(iter(self.hashes.items()))
+        self.tree.remove(value, image_id)
+        del self.hashes[image_id]
+        self.assertEqual(self.tree.search(value, 4), self.brute_force(value, 4))
+
+    def test_signed_roundtrip(self):
+        for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+            signed = to_signed64(value)
+            self.assertTrue(-(1 << 63) <= signed < (1 << 63))
+            self.assertEqual(to_unsigned64(signed), value)
+
+
+
+
+class _FakeImages:
+    """按ORM的filter/order_by/values_list/iterator接口过滤内存中的图片行（不需要数据库）"""
+
+    def __init__(self, rows, filters=None):
+        self.rows = rows
+        self.filters = filters or {}
+
+    def filter(self, **filters):
+        return _FakeImages(self.rows, {**self.filters, **filters})
+
+    def order_by(self):
+        return self
+
+    def values_list(self, *fields):
+        self.fields = fields
+        return self
+
+    def _match(self, row):
+        for lookup, value in self.filters.items():
+            field, _, op = lookup.partition('__')
+            if op == 'isnull' and (row[field] is None) != value:
+                return False
+            if op == 'gte' and (row[field] is None or row[field] < value):
+                return False
+        return True
+
+    def iterator(self, chunk_size=None):
+        return iter([tuple(row[field] for field in self.fields) for row in self.rows if self._match(row)])
+
+
+class PerceptualHashIndexSyncTests(SimpleTestCase):
+    def setUp(self):
+        self.rows = []
+        patcher = mock.patch('images.models.Image.objects', _FakeImages(self.rows))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = PerceptualHashIndex()
+
+    def _row(self, image_id, phash, updated_at=None):
+        self.rows.append({'id': image_id, 'phash': phash, 'phash_updated_at': updated_at})
+        return self.rows[-1]
+
+    def test_backfilled_hashes_of_older_images_are_loaded(self):
+        now = timezone.now()
+        backfilled = self._row(1, None)
+        self._row(2, 1, now)
+        self.assertEqual(self.index.query(1, 0), [(2, 0)])
+        # 其他进程（如backfill_perceptual_hashes）为ID较小的历史图片补算了哈希
+        backfilled.update(phash=3, phash_updated_at=now + datetime.timedelta(seconds=1))
+        self.assertEqual(self.index.query(1, 1), [(2, 0), (1, 1)])
+
+    def test_updated_hash_replaces_old_value(self):
+        now = timezone.now()
+        self._row(1, 1)  # 加水位字段之前写入的哈希，全量构建时载入
+        updated = self._row(2, 2, now)
+        self.assertEqual(self.index.query(2, 0), [(2, 0)])
+        updated.update(phash=-5, phash_updated_at=now + datetime.timedelta(seconds=1))
+        self.assertEqual(self.index.query(2, 0), [])
+        self.assertEqual(self.index.query(-5, 0), [(2, 0)])
+        self.assertEqual(self.index.query(1, 0), [(1, 0)])
+
+
+class _FakeBackfillImages:
+    """按backfill_perceptual_hashes用到的ORM接口（filter/order_by/only/切片/count/bulk_update）操作内存中的图片"""
+
+    def __init__(self, images, filters=None):
+        self.images = images
+        self.filters = filters or {}
+        self.bulk_updates = []
+
+    def _matching(self):
+        rows = self.images
+        if 'phash__isnull' in self.filters:
+            rows = [image for image in rows if (image.phash is None) == self.filters['phash__isnull']]
+        if 'id__gt' in self.filters:
+            rows = [image for image in rows if image.id > self.filters['id__gt']]
+        return sorted(rows, key=lambda image: image.id)
+
+    def filter(self, **filters):
+        fake = _FakeBackfillImages(self.images, {**self.filters, **filters})
+        fake.bulk_updates = self.bulk_updates
+        return fake
+
+    def order_by(self, *fields):
+        return self
+
+    def only(self, *fields):
+        return self
+
+    def count(self):
+        return len(self._matching())
+
+    def __getitem__(self, index):
+        return self._matching()[index]
+
+    def bulk_update(self, images, fields):
+        self.bulk_updates.append(([image.id for image in images], fields))
+
+
+class BackfillPerceptualHashesTests(SimpleTestCase):
+    def setUp(self):
+        self.images = [SimpleNamespace(id=image_id, file=SimpleNamespace(path=f'{image_id}.jpg'),
+                                       phash=None, dhash=None, phash_updated_at=None)
+                       for image_id in range(1, 6)]
+        self.images[1].phash = 7  # 已有哈希的图片不处理
+        self.objects = _FakeBackfillImages(self.images)
+        patcher = mock.patch('images.management.commands.backfill_perceptual_hashes.Image.objects', self.objects)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _compute(self, path):
+        if path == '4.jpg':
+            raise OSError('文件缺失')
+        image_id = int(path.split('.')[0])
+        return image_id * 10, image_id * 100
+
+    def _run(self, *args):
+        out = io.StringIO()
+        with mock.patch('images.management.commands.backfill_perceptual_hashes.compute_perceptual_hashes',
+                        side_effect=self._compute):
+            call_command('backfill_perceptual_hashes', *args, stdout=out)
+        return out.getvalue()
+
+    def test_backfills_missing_hashes_in_batches(self):
+        output = self._run('--batch-size', '2')
+        self.assertEqual([(image.phash, image.dhash) for image in self.images],
+                         [(10, 100), (7, None), (30, 300), (None, None), (50, 500)])
+        self.assertIsNone(self.images[1].phash_updated_at)
+        self.assertIsNone(self.images[3].phash_updated_at)
+        self.assertIsNotNone(self.images[4].phash_updated_at)
+        # 每批一次bulk_update，失败的图片不写回
+        self.assertEqual(self.objects.bulk_updates, [([1, 3], ['phash', 'dhash', 'phash_updated_at']),
+                                                     ([5], ['phash', 'dhash', 'phash_updated_at'])])
+        self.assertIn('成功 3 张，失败 1 张', output)
+
+    def test_limit(self):
+        self._run('--limit', '1')
+        self.assertEqual([image.phash for image in self.images], [10, 7, None, None, None])
@@ -2,10 +2,12 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 import hashlib
+import io
 import os
 import logging
 from .models import Image
 from .serializers import ImageSerializer
+from .phash_index import compute_perceptual_hashes, phash_index
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +19,17 @@ class ImageViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def perform_create(self, serializer):
-        """创建时自动设置当前用户为上传者"""
-        serializer.save(uploaded_by=self.request.user)
+        """创建时自动设置当前用户为上传者，并计算感知哈希"""
+        phash, dhash = None, None
+        file = serializer.validated_data.get('file')
+        if file is not None:
+            try:
+                phash, dhash = compute_perceptual_hashes(file)
+            except Exception as e:
+                logger.warning(f"计算感知哈希失败: {e}")
+            finally:
+                file.seek(0)  # 重置文件指针
+        serializer.save(uploaded_by=self.request.user, phash=phash, dhash=dhash)
     
     @action(detail=False, methods=['post'])
     def upload_multiple(self, request):
@@ -51,6 +62,13 @@ class ImageViewSet(viewsets.ModelViewSet):
                 
                 logger.info(f"文件 {file.name} 的哈希值: {file_hash}")
                 
+                # 计算感知哈希，用于相似图片检索
+                try:
+                    phash, dhash = compute_perceptual_hashes(io.BytesIO(file_content))
+                except Exception as e:
+                    logger.warning(f"文件 {file.name} 计算感知哈希失败: {e}")
+                    phash, dhash = None, None
+                
                 # 检查是否已存在相同哈希的图片
                 existing_image = Image.objects.filter(
                     image_hash=file_hash
@@ -70,6 +88,8 @@ class ImageViewSet(viewsets.ModelViewSet):
                     title=title,
                     file=file,
                     image_hash=file_hash,
+                    phash=phash,
+                    dhash=dhash,
                     uploaded_by=request.user
                 )
                 
@@ -95,4 +115,66 @@ class ImageViewSet(viewsets.ModelViewSet):
             return Response(response_data, status=status.HTTP_201_CREATED)
         else:
             logger.warning(f"没有成功上传任何文件，错误: {errors}")
-            return Response(response_data, status=status.HTTP_400_BAD_REQUEST) 
\ No newline at end of file
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        查找与该图片感知哈希汉明距离不超过distance（默认10，0-64）的图片
+
+        尚未计算感知哈希的图片不在索引中，不会出现在结果里；传unindexed=1时额外返回这类图片的数量
+        （需要扫描整个图片表，默认不统计）
+        """
+        image = self.get_object()
+        
+        try:
+            max_distance = int(request.query_params.get('distance', 10))
+        except ValueError:
+            return Response(
+                {'error': 'distance必须是整数'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= max_distance <= 64:
+            return Response(
+                {'error': 'distance必须在0到64之间'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # 历史图片没有感知哈希时，按需计算并保存
+        if image.phash is None:
+            try:
+                image.phash, image.dhash = compute_perceptual_hashes(image.file.path)
+                image.save(update_fields=['phash', 'dhash'])
+            except Exception as e:
+                logger.error(f"图片 {image.id} 计算感知哈希失败: {e}")
+                return Response(
+                    {'error': f'无法计算图片的感知哈希: {str(e)}'},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+        
+        matches = [
+            (image_id, distance)
+            for image_id, distance in phash_index.query(image.phash, max_distance)
+            if image_id != image.id
+        ]
+        # 索引可能包含其他进程已删除的图片，以数据库中实际存在的记录为准
+        images_by_id = self.get_queryset().in_bulk([image_id for image_id, _ in matches])
+        
+        results = []
+        for image_id, distance in matches:
+            match = images_by_id.get(image_id)
+            if match is not None:
+                data = self.get_serializer(match).data
+                data['distance'] = distance
+                results.append(data)
+        
+        data = {
+            'id': image.id,
+            'distance': max_distance,
+            'count': len(results),
+            'results': results,
+        }
+        if request.query_params.get('unindexed') in ('1', 'true'):
+            # 可运行backfill_perceptual_hashes补算
+            data['unindexed'] = Image.objects.filter(phash__isnull=True).count()
+        return Response(data)
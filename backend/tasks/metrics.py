@@ -0,0 +1,82 @@
+"""
+把evaluation()的结果展开为ImageMetrics行并批量写入
+"""
+
+import logging
+
+from django.db import transaction
+
+from .models import ImageMetrics, Task
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def flatten_metrics(result, prefix=''):
+    """
+    展开单个算法的结果字典为[(指标名, 数值), ...]
+
+    嵌套字典以点号连接键名（如raw_scores.brenner），布尔值记为0/1，
+    非数值项（如quality_grade等级字母）和缺失值不记录
+    """
+    metrics = []
+    for key, value in result.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.extend(flatten_metrics(value, f"{name}."))
+            continue
+        try:
+            metrics.append((name, float(value)))
+        except (TypeError, ValueError):
+            continue
+    return metrics
+
+
+def metric_rows(task, all_results, image_paths=None, images_by_path=None):
+    """
+    生成未保存的ImageMetrics对象
+
+    Args:
+        task: 任务对象
+        all_results: evaluation()返回的[(图片名, [(func_id, result), ...]), ...]
+        image_paths: 与all_results一一对应的图片路径（传给evaluation()的列表，可选）
+        images_by_path: {图片绝对路径: Image}，用于关联图片记录（可选）
+
+    每行的image_path是图片记录的相对路径（无记录时为传入的路径，未传入路径时为图片名），
+    不同目录中的同名图片不会冲突。
+    """
+    images_by_path = images_by_path or {}
+    rows = []
+    for index, (image_name, result_group) in enumerate(all_results):
+        path = image_paths[index] if image_paths else image_name
+        image = images_by_path.get(path)
+        image_path = image.file.name if image is not None else path
+        for func_id, result in result_group:
+            # 出错或被级联跳过的结果没有指标
+            if not isinstance(result, dict) or result.get('skipped') or result.get('error'):
+                continue
+            for metric, value in flatten_metrics(result):
+                rows.append(ImageMetrics(task=task, image=image, image_name=image_name, image_path=image_path,
+                                         algorithm=func_id, metric=metric, value=value))
+    return rows
+
+
+def save_image_metrics(task_id, all_results, image_paths=None):
+    """
+    保存任务的全部图片指标（任务重启时先删除旧记录）
+
+    Args:
+        image_paths: 与all_results一一对应的图片路径（传给evaluation()的列表）
+
+    Returns:
+        int: 写入的行数
+    """
+    task = Task.objects.get(id=task_id)
+    images_by_path = {image.file.path: image for image in task.images.all()}
+    rows = metric_rows(task, all_results, image_paths, images_by_path)
+    with transaction.atomic():
+        ImageMetrics.objects.filter(task=task).delete()
+        ImageMetrics.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    logger.info("任务 %s 写入了 %d 条图片指标", task_id, len(rows))
+    return len(rows)
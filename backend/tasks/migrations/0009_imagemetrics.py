@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0004_image_phash_dhash'),
+        ('tasks', '0008_report'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_name', models.CharField(max_length=255)),
+                ('algorithm', models.PositiveSmallIntegerField(choices=[(1, 'ImageHash'), (2, 'OpenCV1'), (3, 'OpenCV2'), (4, 'OpenCV3')])),
+                ('metric', models.CharField(max_length=64)),
+                ('value', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('image', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='metrics', to='images.image')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='tasks.task')),
+            ],
+            options={
+                'ordering': ['task', 'image_name', 'algorithm', 'metric'],
+                'indexes': [models.Index(fields=['metric', 'value'], name='tasks_image_metric_c05b6a_idx'), models.Index(fields=['task', 'algorithm', 'metric'], name='tasks_image_task_id_dcd7a2_idx'), models.Index(fields=['image', 'metric'], name='tasks_image_image_i_e00845_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'image_name', 'algorithm', 'metric'), name='unique_task_image_metric')],
+            },
+        ),
+    ]
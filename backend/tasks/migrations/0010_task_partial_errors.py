@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_imagemetrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='errors',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('pending', '待处理'), ('processing', '处理中'), ('completed', '已完成'), ('partial', '部分完成'), ('failed', '失败')], default='pending', max_length=20),
+        ),
+    ]
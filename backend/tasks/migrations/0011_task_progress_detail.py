@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_partial_errors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='progress_detail',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
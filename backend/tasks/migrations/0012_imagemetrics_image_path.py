@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:09
+
+from django.db import migrations, models
+
+
+def fill_image_path(apps, schema_editor):
+    """已有记录按关联图片的路径填充（图片已删除时沿用文件名，原有记录按文件名唯一）"""
+    ImageMetrics = apps.get_model('tasks', 'ImageMetrics')
+    batch = []
+    for row in ImageMetrics.objects.select_related('image').iterator(chunk_size=1000):
+        row.image_path = row.image.file.name if row.image_id else row.image_name
+        batch.append(row)
+        if len(batch) == 1000:
+            ImageMetrics.objects.bulk_update(batch, ['image_path'])
+            batch = []
+    ImageMetrics.objects.bulk_update(batch, ['image_path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0004_image_phash_dhash'),
+        ('tasks', '0011_task_progress_detail'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='imagemetrics',
+            options={'ordering': ['task', 'image_path', 'algorithm', 'metric']},
+        ),
+        migrations.RemoveConstraint(
+            model_name='imagemetrics',
+            name='unique_task_image_metric',
+        ),
+        migrations.AddField(
+            model_name='imagemetrics',
+            name='image_path',
+            field=models.CharField(default='', max_length=500),
+        ),
+        migrations.RunPython(fill_image_path, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='imagemetrics',
+            constraint=models.UniqueConstraint(fields=('task', 'image_path', 'algorithm', 'metric'), name='unique_task_image_path_metric'),
+        ),
+    ]
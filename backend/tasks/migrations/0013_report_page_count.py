@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:15
+
+from django.db import migrations, models
+
+
+def fill_page_count(apps, schema_editor):
+    """已有报告按分页目录中的文件数填充（仅迁移时统计一次）"""
+    from final2.report_writer import count_pages
+    Report = apps.get_model('tasks', 'Report')
+    reports = list(Report.objects.all())
+    for report in reports:
+        report.page_count = count_pages(report.file_path)
+    Report.objects.bulk_update([report for report in reports if report.page_count], ['page_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_imagemetrics_image_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='page_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_page_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:28
+
+from django.db import migrations, models
+
+
+def fill_export_paths(apps, schema_editor):
+    """已有报告按文件名中的时间戳找到同一次评估写出的导出文件（找不到时留空）"""
+    from final2.result_export import find_exports
+    Report = apps.get_model('tasks', 'Report')
+    reports = []
+    for report in Report.objects.all():
+        report.export_paths = find_exports(report.file_path) or None
+        if report.export_paths:
+            reports.append(report)
+    Report.objects.bulk_update(reports, ['export_paths'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_report_page_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='export_paths',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_export_paths, migrations.RunPython.noop),
+    ]
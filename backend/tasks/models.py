@@ -8,6 +8,7 @@ class Task(models.Model):
         ('pending', '待处理'),
         ('processing', '处理中'),
         ('completed', '已完成'),
+        ('partial', '部分完成'),  # 处理完成但有图片处理失败，失败清单见errors
         ('failed', '失败'),
     )
     
@@ -30,6 +31,8 @@ class Task(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     failure_reason = models.TextField(blank=True, null=True)
     progress = models.FloatField(default=0.0)  # 添加进度字段，表示处理进度（0-100）
+    errors = models.JSONField(blank=True, null=True)  # 处理失败的图片清单[{'image', 'algorithm', 'error_type', 'message'}, ...]
+    progress_detail = models.JSONField(blank=True, null=True)  # 进度明细{'stage', 'images_done', 'images_total', 'throughput', 'eta_seconds'}
     
     class Meta:
         ordering = ['-created_at']
@@ -43,6 +46,8 @@ class Report(models.Model):
     title = models.CharField(max_length=255)
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='reports')
     file_path = models.CharField(max_length=500)
+    page_count = models.PositiveIntegerField(default=0)  # 分页报告的分页数（创建记录时统计），单文件报告为0
+    export_paths = models.JSONField(blank=True, null=True)  # 与报告同一次评估写出的机器可读结果文件{格式: 路径}
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -50,3 +55,46 @@ class Report(models.Model):
     
     def __str__(self):
         return f"{self.title} - {self.task.name}"
+
+
+class ImageMetrics(models.Model):
+    """
+    图片指标（每行一个指标值）
+
+    任务处理完成后批量写入evaluation()得到的全部原始分和加权分，
+    报表、看板和重新判定可直接按指标查询，无需解析HTML或重新计算。
+    """
+    ALGORITHM_CHOICES = (
+        (1, 'ImageHash'),
+        (2, 'OpenCV1'),
+        (3, 'OpenCV2'),
+        (4, 'OpenCV3'),
+    )
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='metrics')
+    image = models.ForeignKey(Image, on_delete=models.SET_NULL, null=True, blank=True, related_name='metrics')
+    image_name = models.CharField(max_length=255)  # 图片文件名（图片记录被删除后仍可追溯）
+    # 图片路径（MEDIA_ROOT下的相对路径，如images/2025/05/26/1.jpg）：不同上传目录中可能有同名图片，唯一约束以路径区分
+    image_path = models.CharField(max_length=500, default='')
+    algorithm = models.PositiveSmallIntegerField(choices=ALGORITHM_CHOICES)
+    metric = models.CharField(max_length=64)  # 指标名，嵌套结果以点号连接，如raw_scores.brenner
+    value = models.FloatField()  # 布尔指标存为0/1
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['task', 'image_path', 'algorithm', 'metric']
+        indexes = [
+            # "某指标低于X的图片"
+            models.Index(fields=['metric', 'value']),
+            # 按任务、算法读取全部结果（报告、重新判定）
+            models.Index(fields=['task', 'algorithm', 'metric']),
+            # 同一张图片的历史指标
+            models.Index(fields=['image', 'metric']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'image_path', 'algorithm', 'metric'],
+                                    name='unique_task_image_path_metric'),
+        ]
+
+    def __str__(self):
+        return f"{self.image_name} {self.metric}={self.value}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Task, Report
+from .models import Task, Report, ImageMetrics
 from images.models import Image
 from images.serializers import ImageSerializer
 
@@ -13,8 +13,9 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = ('id', 'name', 'algorithm', 'algorithm_display', 'algorithms', 'status', 'status_display', 
                   'images', 'created_by', 'created_by_username', 'created_at', 
-                  'completed_at', 'failure_reason', 'progress', 'description')
-        read_only_fields = ('id', 'created_by', 'created_at', 'completed_at', 'status', 'failure_reason', 'progress')
+                  'completed_at', 'failure_reason', 'progress', 'description', 'errors', 'progress_detail')
+        read_only_fields = ('id', 'created_by', 'created_at', 'completed_at', 'status', 'failure_reason', 'progress',
+                            'errors', 'progress_detail')
     
     def get_created_by_username(self, obj):
         return obj.created_by.username if obj.created_by else None
@@ -35,5 +36,14 @@ class ReportSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Report
-        fields = ['id', 'title', 'task_id', 'task_name', 'file_path', 'created_at']
-        read_only_fields = ['id', 'created_at'] 
\ No newline at end of file
+        fields = ['id', 'title', 'task_id', 'task_name', 'file_path', 'created_at', 'page_count']
+        read_only_fields = ['id', 'created_at', 'page_count']
+
+
+class ImageMetricsSerializer(serializers.ModelSerializer):
+    """图片指标序列化器"""
+
+    class Meta:
+        model = ImageMetrics
+        fields = ['id', 'task', 'image', 'image_name', 'image_path', 'algorithm', 'metric', 'value', 'created_at']
+        read_only_fields = fields
@@ -43,6 +43,7 @@ def update_task_status():
             # 提取状态信息
             file_status = status_data.get('status')
             progress = status_data.get('progress', 0)
+            detail = status_data.get('detail')
             
             # 更新任务状态
             with transaction.atomic():
@@ -57,22 +58,31 @@ def update_task_status():
                      current_task.status != 'processing') or
                     (file_status == 'completed' and
                      current_task.status != 'completed') or
+                    (file_status == 'partial' and
+                     current_task.status != 'partial') or
                     (file_status == 'failed' and
                      current_task.status != 'failed') or
-                    abs(current_task.progress - progress) >= 1.0
+                    abs(current_task.progress - progress) >= 1.0 or
+                    detail != current_task.progress_detail
                 )
                 
                 if status_changed:
                     # 更新状态和进度
                     current_task.status = file_status
                     current_task.progress = progress
+                    current_task.progress_detail = detail
                     
-                    # 如果任务完成，设置完成时间
-                    if (file_status == 'completed' and
+                    # 如果任务完成（含部分完成），设置完成时间
+                    if (file_status in ('completed', 'partial') and
                             not current_task.completed_at):
                         current_task.completed_at = timezone.now()
                         logger.info(f"任务 {current_task.id} 已完成")
                     
+                    # 部分完成时记录失败图片清单
+                    if file_status == 'partial':
+                        current_task.errors = status_data.get('errors', [])
+                        current_task.failure_reason = status_data.get('message')
+                    
                     # 如果任务失败，记录失败原因
                     if file_status == 'failed':
                         current_task.failure_reason = status_data.get(
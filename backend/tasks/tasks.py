@@ -34,15 +34,21 @@ def get_process_images_function():
 # 使用Django配置的日志记录器
 logger = logging.getLogger(__name__)
 
+# 评估阶段在总进度中所占的区间（开始前为10%，评估完成后生成报告为90%）
+EVALUATION_PROGRESS_START = 10
+EVALUATION_PROGRESS_END = 90
 
-def update_task_status_file(report_dir, status, progress=0, message=None):
+
+def update_task_status_file(report_dir, status, progress=0, message=None, errors=None, detail=None):
     """
     更新任务状态文件
     参数:
         report_dir: 报告目录路径
-        status: 任务状态，可选值: 'pending', 'processing', 'completed', 'failed'
+        status: 任务状态，可选值: 'pending', 'processing', 'completed', 'partial', 'failed'
         progress: 处理进度 (0-100)
         message: 状态信息或错误信息
+        errors: 处理失败的图片清单（partial状态）
+        detail: 进度明细（processing状态），见progress_detail
     """
     # 确保目录存在
     os.makedirs(report_dir, exist_ok=True)
@@ -59,11 +65,17 @@ def update_task_status_file(report_dir, status, progress=0, message=None):
 
     if message:
         status_data["message"] = message
+    if errors:
+        status_data["errors"] = errors
+    if detail:
+        status_data["detail"] = detail
 
-    # 写入状态文件
+    # 写入状态文件（先写临时文件再替换，避免状态查询读到写了一半的文件）
     try:
-        with open(status_file, "w", encoding="utf-8") as f:
+        temp_file = status_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
             json.dump(status_data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, status_file)
         logger.debug(
             "已更新任务状态文件: %s, 状态: %s, 进度: %s%%",
             status_file, status, progress
@@ -72,6 +84,41 @@ def update_task_status_file(report_dir, status, progress=0, message=None):
         logger.error("更新任务状态文件失败: %s", str(e))
 
 
+def progress_detail(progress):
+    """
+    把评估流程的进度字典转换为(总进度百分比, 进度明细)
+
+    参数:
+        progress: final2进度回调的参数，见final2/progress.py
+    """
+    stage = progress.get("stage")
+    total = progress.get("total") or 0
+    done = progress.get("done") or 0
+    if stage == "evaluating":
+        fraction = done / total if total else 1.0
+        percent = EVALUATION_PROGRESS_START + (EVALUATION_PROGRESS_END - EVALUATION_PROGRESS_START) * fraction
+    elif stage in ("reporting", "done"):
+        percent = EVALUATION_PROGRESS_END
+    else:
+        percent = EVALUATION_PROGRESS_START
+    detail = {
+        "stage": stage,
+        "images_done": done,
+        "images_total": total,
+        "throughput": progress.get("throughput"),
+        "eta_seconds": progress.get("eta_seconds"),
+    }
+    return round(percent, 1), detail
+
+
+def _progress_writer(report_dir):
+    """返回写入任务状态文件的进度回调（节流由评估流程负责）"""
+    def on_progress(progress):
+        percent, detail = progress_detail(progress)
+        update_task_status_file(report_dir, "processing", percent, "正在使用V2现代化算法处理...", detail=detail)
+    return on_progress
+
+
 def _process_task_async(task_data):
     """
     异步处理任务的内部函数
@@ -90,7 +137,7 @@ def _process_task_async(task_data):
     try:
         # 更新状态为处理中
         update_task_status_file(
-            report_dir, "processing", 10, 
+            report_dir, "processing", EVALUATION_PROGRESS_START, 
             "正在使用V2现代化算法处理..."
         )
         
@@ -105,24 +152,33 @@ def _process_task_async(task_data):
                 'template_image_dir': os.path.join(base_dir, 'final2', 'data', 'template'),
                 'comparison_image_dir': os.path.dirname(image_paths[0]) if image_paths else report_dir,
                 'report_dir': report_dir
-            }
+            },
+            progress_callback=_progress_writer(report_dir)
         )
         
-        if result["status"] == "success":
-            logger.info("任务 %s V2处理成功", task_id)
-            update_task_status_file(
-                report_dir, "completed", 100, "V2现代化处理完成"
-            )
+        if result["status"] in ("success", "partial"):
+            if result["status"] == "partial":
+                # 部分图片处理失败：其余图片的报告和指标照常保存
+                logger.warning("任务 %s V2处理部分完成: %s", task_id, result.get("message"))
+                update_task_status_file(
+                    report_dir, "partial", 100, result.get("message"), result.get("errors")
+                )
+            else:
+                logger.info("任务 %s V2处理成功", task_id)
+                update_task_status_file(
+                    report_dir, "completed", 100, "V2现代化处理完成"
+                )
             
             # 自动创建报告记录 - 为每个生成的报告文件创建记录
             try:
                 from tasks.models import Report, Task
+                from final2.report_writer import count_pages
                 
                 # 获取任务对象
                 task = Task.objects.get(id=task_id)
                 
-                # 查找生成的HTML报告文件
-                html_files = glob.glob(os.path.join(report_dir, "*.html"))
+                # 本次评估生成的HTML报告文件（目录中可能还有之前运行的报告）
+                html_files = result.get("report_paths") or glob.glob(os.path.join(report_dir, "*.html"))
                 
                 if html_files:
                     # 算法名称映射
@@ -152,7 +208,9 @@ def _process_task_async(task_data):
                         report = Report(
                             title=f"{task.name} - {report_type}",
                             task=task,
-                            file_path=html_file
+                            file_path=html_file,
+                            page_count=count_pages(html_file),
+                            export_paths=result.get("export_paths")
                         )
                         report.save()
                         created_reports.append(report)
@@ -164,6 +222,13 @@ def _process_task_async(task_data):
                     
             except Exception as e:
                 logger.error("任务 %s 创建报告记录失败: %s", task_id, str(e))
+
+            # 批量保存每张图片的全部指标
+            try:
+                from tasks.metrics import save_image_metrics
+                save_image_metrics(task_id, result.get("results", []), image_paths)
+            except Exception as e:
+                logger.error("任务 %s 保存图片指标失败: %s", task_id, str(e))
         else:
             error_msg = result.get("message", "V2处理失败")
             logger.error("任务 %s V2处理失败: %s", task_id, error_msg)
@@ -257,12 +322,13 @@ def submit_task(task_data):
             # 自动创建报告记录 - 为每个生成的报告文件创建记录
             try:
                 from tasks.models import Report, Task
+                from final2.report_writer import count_pages
                 
                 # 获取任务对象
                 task = Task.objects.get(id=task_id)
                 
-                # 查找生成的HTML报告文件
-                html_files = glob.glob(os.path.join(report_dir, "*.html"))
+                # 本次评估生成的HTML报告文件（目录中可能还有之前运行的报告）
+                html_files = result.get("report_paths") or glob.glob(os.path.join(report_dir, "*.html"))
                 
                 if html_files:
                     # 算法名称映射
@@ -292,7 +358,9 @@ def submit_task(task_data):
                         report = Report(
                             title=f"{task.name} - {report_type}",
                             task=task,
-                            file_path=html_file
+                            file_path=html_file,
+                            page_count=count_pages(html_file),
+                            export_paths=result.get("export_paths")
                         )
                         report.save()
                         created_reports.append(report)
@@ -0,0 +1,152 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from tasks.metrics import flatten_metrics, metric_rows
+from tasks.models import Report, Task
+from tasks.serializers import ReportSerializer
+from tasks.tasks import _progress_writer, progress_detail
+
+
+class MetricRowsTests(SimpleTestCase):
+    def setUp(self):
+        self.all_results = [
+            ('a.jpg', [
+                (1, {'distance': np.int64(3), 'similar': np.True_}),
+                (3, {'texture': 0.2, 'quality_grade': 'C', 'needs_human_review': True}),
+                (4, {'raw_scores': {'brenner': 2500.5, 'ssim': 80.0}, 'composite': np.float64(90.0)}),
+            ]),
+            ('b.jpg', [
+                (1, {'skipped': True, 'reason': '与模板重复'}),
+                (2, None),
+            ]),
+        ]
+
+    def test_flatten_nested_and_non_numeric(self):
+        metrics = dict(flatten_metrics(self.all_results[0][1][2][1]))
+        self.assertEqual(metrics, {'raw_scores.brenner': 2500.5, 'raw_scores.ssim': 80.0, 'composite': 90.0})
+        metrics = dict(flatten_metrics(self.all_results[0][1][1][1]))
+        self.assertEqual(metrics, {'texture': 0.2, 'needs_human_review': 1.0})
+
+    def test_rows_skip_failed_and_skipped_results(self):
+        task = Task(id=1, name='t')
+        rows = metric_rows(task, self.all_results)
+        self.assertEqual({row.image_name for row in rows}, {'a.jpg'})
+        self.assertEqual(len(rows), 7)
+        distance = next(row for row in rows if row.metric == 'distance')
+        self.assertEqual((distance.algorithm, distance.value), (1, 3.0))
+
+    def test_same_basename_in_different_directories(self):
+        from images.models import Image
+        task = Task(id=1, name='t')
+        result_group = [(1, {'distance': 3, 'similar': False})]
+        all_results = [('1.jpg', result_group), ('1.jpg', result_group)]
+        image_paths = ['/media/images/2025/05/23/1.jpg', '/media/images/2025/05/26/1.jpg']
+        image = Image(id=7, file='images/2025/05/23/1.jpg')
+        rows = metric_rows(task, all_results, image_paths, {image_paths[0]: image})
+        keys = {(row.image_path, row.algorithm, row.metric) for row in rows}
+        self.assertEqual(len(keys), len(rows))
+        self.assertEqual([(row.image_name, row.image_path, row.image) for row in rows if row.metric == 'distance'],
+                         [('1.jpg', 'images/2025/05/23/1.jpg', image), ('1.jpg', image_paths[1], None)])
+
+
+class ProgressDetailTests(SimpleTestCase):
+    def test_percent_spans_evaluation_range(self):
+        progress = {'stage': 'evaluating', 'done': 50, 'total': 200, 'throughput': 2.0, 'eta_seconds': 75.0}
+        percent, detail = progress_detail(progress)
+        self.assertEqual(percent, 30.0)
+        self.assertEqual(detail, {'stage': 'evaluating', 'images_done': 50, 'images_total': 200,
+                                  'throughput': 2.0, 'eta_seconds': 75.0})
+        self.assertEqual(progress_detail(dict(progress, stage='reporting', done=200))[0], 90)
+
+    def test_writer_updates_status_file(self):
+        with tempfile.TemporaryDirectory() as report_dir:
+            _progress_writer(report_dir)({'stage': 'evaluating', 'done': 1, 'total': 4,
+                                          'throughput': 0.5, 'eta_seconds': 6.0})
+            with open(os.path.join(report_dir, 'task_status.json'), encoding='utf-8') as f:
+                status_data = json.load(f)
+            self.assertEqual(status_data['status'], 'processing')
+            self.assertEqual(status_data['progress'], 30.0)
+            self.assertEqual(status_data['detail']['eta_seconds'], 6.0)
+            self.assertEqual(os.listdir(report_dir), ['task_status.json'])
+
+
+class ReportPageCountTests(SimpleTestCase):
+    def test_page_count_is_stored(self):
+        with tempfile.TemporaryDirectory() as report_dir:
+            index_path = os.path.join(report_dir, '综合质量AI检测_20260101000000.html')
+            # 序列化时读取记录中的分页数，不访问磁盘
+            self.assertEqual(ReportSerializer(Report(file_path=index_path, page_count=3)).data['page_count'], 3)
+            self.assertEqual(ReportSerializer(Report(file_path=index_path)).data['page_count'], 0)
+
+
+class ReportPageLinkTests(SimpleTestCase):
+    def _get(self, action, report, **params):
+        from unittest import mock
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from tasks.views import ReportViewSet
+
+        request = APIRequestFactory().get(f'/api/reports/7/{action}/', params)
+        force_authenticate(request, user=User(username='tester'))
+        with mock.patch.object(ReportViewSet, 'get_object', return_value=report):
+            return ReportViewSet.as_view({'get': action})(request, pk=7)
+
+    def test_links_point_to_page_action(self):
+        with tempfile.TemporaryDirectory() as report_dir:
+            index_path = os.path.join(report_dir, '综合质量AI检测_20260101000000.html')
+            pages_dir = os.path.join(report_dir, '综合质量AI检测_20260101000000_pages')
+            os.makedirs(pages_dir)
+            with open(index_path, 'w', encoding='utf-8') as f:
+                f.write("<a href='综合质量AI检测_20260101000000_pages/page_0002.html'>第2页</a>")
+            with open(os.path.join(pages_dir, 'page_0002.html'), 'w', encoding='utf-8') as f:
+                f.write("<a href='../综合质量AI检测_20260101000000.html'>返回汇总</a> <a href='page_0001.html'>上一页</a>")
+            report = Report(pk=7, title='综合报告', file_path=index_path, page_count=2)
+
+            response = self._get('download', report)
+            self.assertIn('attachment', response['Content-Disposition'])
+            self.assertEqual(response.content.decode('utf-8'),
+                             "<a href='http://testserver/api/reports/7/page/?page=2'>第2页</a>")
+            response = self._get('page', report, page=2)
+            self.assertEqual(response.content.decode('utf-8'),
+                             "<a href='http://testserver/api/reports/7/download/'>返回汇总</a> "
+                             "<a href='http://testserver/api/reports/7/page/?page=1'>上一页</a>")
+            self.assertEqual(self._get('page', report, page=3).status_code, 404)
+
+
+class ReportExportTests(SimpleTestCase):
+    def _get(self, report, **params):
+        from unittest import mock
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from tasks.views import ReportViewSet
+
+        request = APIRequestFactory().get('/api/reports/1/export/', params)
+        force_authenticate(request, user=User(username='tester'))
+        with mock.patch.object(ReportViewSet, 'get_object', return_value=report):
+            return ReportViewSet.as_view({'get': 'export'})(request, pk=1)
+
+    def test_export_formats(self):
+        with tempfile.TemporaryDirectory() as report_dir:
+            export_path = os.path.join(report_dir, 'results_20260101000000.jsonl')
+            report = Report(title='综合报告', file_path=os.path.join(report_dir, '综合质量AI检测_20260101000000.html'),
+                            export_paths={'jsonl': export_path})
+            self.assertEqual(self._get(report).status_code, 404)
+            with open(export_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'image': '1.jpg', 'imagehash.distance': 3.0}) + '\n')
+            # 同一目录中之后运行写出的结果文件不影响该报告
+            with open(os.path.join(report_dir, 'results_20260102000000.jsonl'), 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'image': '2.jpg', 'imagehash.distance': 9.0}) + '\n')
+
+            response = self._get(report)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(b''.join(response.streaming_content)), {'image': '1.jpg', 'imagehash.distance': 3.0})
+            response.close()
+            response = self._get(report, type='csv')
+            self.assertEqual(b''.join(response.streaming_content).decode('utf-8').splitlines(),
+                             ['image,imagehash.distance', '1.jpg,3.0'])
+            self.assertEqual(self._get(report, type='parquet').status_code, 404)
+            self.assertEqual(self._get(report, type='xlsx').status_code, 400)
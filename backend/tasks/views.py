@@ -2,22 +2,25 @@ from django.shortcuts import render
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import Task, Report
-from .serializers import TaskSerializer, TaskDetailSerializer, ReportSerializer
+from .models import Task, Report, ImageMetrics
+from .serializers import TaskSerializer, TaskDetailSerializer, ReportSerializer, ImageMetricsSerializer
 from .tasks import submit_task
 from .status_updater import update_task_status
 import logging
 import os
+import shutil
 import threading
 import time
 import re
 from django.conf import settings
-from django.http import JsonResponse, FileResponse, Http404
+from django.http import JsonResponse, FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.core.cache import cache
 from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
+from urllib.parse import quote
 
 # 获取日志记录器
 logger = logging.getLogger(__name__)
@@ -26,6 +29,12 @@ logger = logging.getLogger(__name__)
 status_update_lock = threading.Lock()
 last_update_time = 0
 UPDATE_INTERVAL = 1.0  # 状态更新间隔秒数
+# 结果导出格式 -> Content-Type
+EXPORT_CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+    'csv': 'text/csv; charset=utf-8',
+}
 
 
 def check_and_update_status():
@@ -157,10 +166,10 @@ class TaskViewSet(viewsets.ModelViewSet):
                 logger.info(f"【调试】当前任务状态: {task.status}, 算法: {task.algorithm}, 名称: {task.name}")
                 
                 # 允许重启处理中的任务
-                if task.status not in ['failed', 'pending', 'processing']:
+                if task.status not in ['failed', 'partial', 'pending', 'processing']:
                     logger.warning(f"【调试】任务状态不允许重启: {task.status}")
                     return Response(
-                        {'error': '只能重启失败、待处理或处理中的任务'}, 
+                        {'error': '只能重启失败、部分完成、待处理或处理中的任务'}, 
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 
@@ -178,8 +187,11 @@ class TaskViewSet(viewsets.ModelViewSet):
                 
                 # 重置进度和状态
                 task.progress = 0.0
-                if original_status == 'failed':
+                task.progress_detail = None
+                if original_status in ('failed', 'partial'):
                     task.failure_reason = None
+                    task.errors = None
+                    task.completed_at = None
                 
                 task.status = 'pending'
                 task.save()
@@ -307,6 +319,38 @@ class TaskViewSet(viewsets.ModelViewSet):
                     content_type='text/plain'
                 )
     
+    @action(detail=True, methods=['get'])
+    def metrics(self, request, pk=None):
+        """
+        查询任务的图片指标
+
+        查询参数: algorithm（1-4）、metric（指标名）、min_value/max_value（取值范围）、image_name、image_path
+        """
+        task = self.get_object()
+        queryset = ImageMetrics.objects.filter(task=task)
+        params = request.query_params
+        try:
+            if params.get('algorithm'):
+                queryset = queryset.filter(algorithm=int(params['algorithm']))
+            if params.get('min_value'):
+                queryset = queryset.filter(value__gte=float(params['min_value']))
+            if params.get('max_value'):
+                queryset = queryset.filter(value__lte=float(params['max_value']))
+        except ValueError:
+            return Response({'error': 'algorithm、min_value、max_value必须是数字'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if params.get('metric'):
+            queryset = queryset.filter(metric=params['metric'])
+        if params.get('image_name'):
+            queryset = queryset.filter(image_name=params['image_name'])
+        if params.get('image_path'):
+            queryset = queryset.filter(image_path=params['image_path'])
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(ImageMetricsSerializer(page, many=True).data)
+        return Response(ImageMetricsSerializer(queryset, many=True).data)
+    
     @action(detail=True, methods=['get'])
     def status(self, request, pk=None):
         """获取任务状态，会主动更新任务状态"""
@@ -321,7 +365,10 @@ class TaskViewSet(viewsets.ModelViewSet):
                 'id': task.id,
                 'status': task.status,
                 'progress': task.progress,
-                'message': task.failure_reason if task.status == 'failed' else None
+                'message': task.failure_reason if task.status in ('failed', 'partial') else None,
+                'errors': task.errors or [],
+                # 进度明细：阶段、已完成/总图片数、吞吐量（张/秒）、预计剩余秒数
+                'detail': task.progress_detail
             }
             
             return Response(data)
@@ -339,7 +386,8 @@ class TaskViewSet(viewsets.ModelViewSet):
         try:
             task = self.get_object()
             
-            if task.status != 'completed':
+            # 部分完成的任务同样有评估结果，可以重新生成报告
+            if task.status not in ('completed', 'partial'):
                 return Response(
                     {'error': '只能为已完成的任务生成报告'}, 
                     status=status.HTTP_400_BAD_REQUEST
@@ -371,18 +419,20 @@ class TaskViewSet(viewsets.ModelViewSet):
                 config = get_config()
                 
                 # 使用final2的evaluation函数生成报告
-                evaluation(paths, config, algorithm_choice)
+                result = evaluation(paths, config, algorithm_choice)
                 
-                # 查找生成的HTML报告文件
-                import glob
-                html_files = glob.glob(os.path.join(output_dir, "*.html"))
+                # 本次评估生成的主报告（目录中可能还有之前运行的报告）
+                report_path = result.get('main_report_path')
                 
-                if html_files:
-                    # 创建报告记录
+                if report_path:
+                    # 创建报告记录，同时记录本次评估写出的结果文件
+                    from final2.report_writer import count_pages
                     report = Report(
                         title=f"{task.name} - 质量检测报告",
                         task=task,
-                        file_path=html_files[0]
+                        file_path=report_path,
+                        page_count=count_pages(report_path),
+                        export_paths=result.get('export_paths')
                     )
                     report.save()
                     
@@ -444,8 +494,8 @@ def check_all_reports(request):
         
         logger.info("开始检查任务和报告的对应关系")
         
-        # 获取所有已完成的任务
-        completed_tasks = Task.objects.filter(status='completed')
+        # 获取所有已完成（含部分完成）的任务
+        completed_tasks = Task.objects.filter(status__in=('completed', 'partial'))
         
         for task in completed_tasks:
             try:
@@ -459,10 +509,14 @@ def check_all_reports(request):
                     
                     if html_files:
                         # 创建报告记录
+                        from final2.report_writer import count_pages
+                        from final2.result_export import find_exports
                         report = Report(
                             title=f"任务 {task.name} 的报告",
                             task=task,
-                            file_path=html_files[0]
+                            file_path=html_files[0],
+                            page_count=count_pages(html_files[0]),
+                            export_paths=find_exports(html_files[0])
                         )
                         report.save()
                         fixed_count += 1
@@ -512,6 +566,13 @@ class ReportViewSet(viewsets.ModelViewSet):
             else:
                 logger.warning(f"报告文件不存在: {report.file_path}")
             
+            # 分页报告同时删除分页目录
+            from final2.report_writer import page_directory
+            pages_dir = page_directory(report.file_path)
+            if os.path.isdir(pages_dir):
+                shutil.rmtree(pages_dir)
+                logger.info(f"已删除报告分页目录: {pages_dir}")
+            
             # 删除数据库记录
             report_title = report.title
             report.delete()
@@ -536,6 +597,13 @@ class ReportViewSet(viewsets.ModelViewSet):
         
         try:
             if os.path.exists(report.file_path):
+                if report.page_count:
+                    # 分页报告的索引页：分页链接改为按页查看的接口地址（附件中相对路径失效）
+                    with open(report.file_path, encoding='utf-8') as f:
+                        document = self._link_pages(request, report, f.read())
+                    response = HttpResponse(document, content_type='text/html; charset=utf-8')
+                    response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(report.title + '.html')}"
+                    return response
                 response = FileResponse(
                     open(report.file_path, 'rb'),
                     content_type='text/html',
@@ -552,3 +620,60 @@ class ReportViewSet(viewsets.ModelViewSet):
                 {'error': f'下载失败: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=True, methods=['get'])
+    def page(self, request, pk=None):
+        """
+        分页报告的单个分页（?page=页码，从1开始）
+        
+        大任务的报告文件是索引页（汇总表和分页链接），详细结果按页查看
+        """
+        from final2.report_writer import page_directory, page_filename
+        report = self.get_object()
+        
+        try:
+            number = int(request.query_params.get('page', 1))
+        except ValueError:
+            return Response({'error': '页码必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        page_path = os.path.join(page_directory(report.file_path), page_filename(number))
+        if number < 1 or not os.path.exists(page_path):
+            raise Http404("报告分页不存在")
+        with open(page_path, encoding='utf-8') as f:
+            document = self._link_pages(request, report, f.read())
+        return HttpResponse(document, content_type='text/html; charset=utf-8')
+    
+    def _link_pages(self, request, report, document):
+        """报告中的分页和索引页链接改为page和download接口的绝对地址"""
+        from final2.report_writer import link_pages
+        return link_pages(document,
+                          request.build_absolute_uri(reverse('report-page', args=[report.pk])),
+                          request.build_absolute_uri(reverse('report-download', args=[report.pk])))
+    
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        下载与报告同一次评估写出的机器可读结果文件（?type=jsonl|parquet|csv，默认jsonl）
+        
+        每张图片一行，包含各算法的原始指标、加权值和判定结果；CSV由JSONL逐批转换后流式返回
+        （不用?format=，该参数被DRF用于选择渲染器）。只提供报告记录中的文件，
+        同一任务目录中之后运行写出的结果文件不会被当作该报告的结果
+        """
+        from final2.result_export import iter_csv
+        report = self.get_object()
+        
+        fmt = request.query_params.get('type', 'jsonl')
+        if fmt not in EXPORT_CONTENT_TYPES:
+            return Response({'error': f'不支持的导出格式: {fmt}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        export_path = (report.export_paths or {}).get('jsonl' if fmt == 'csv' else fmt)
+        if not export_path or not os.path.exists(export_path):
+            raise Http404("导出文件不存在")
+        
+        filename = f"{report.title}_results.{fmt}"
+        if fmt == 'csv':
+            response = StreamingHttpResponse(iter_csv(export_path), content_type=EXPORT_CONTENT_TYPES[fmt])
+            response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+            return response
+        return FileResponse(open(export_path, 'rb'), content_type=EXPORT_CONTENT_TYPES[fmt],
+                            as_attachment=True, filename=filename)